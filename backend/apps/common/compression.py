@@ -0,0 +1,102 @@
+"""
+文本压缩工具 - 默认使用标准库 zlib，安装 zstandard 后可选 zstd
+"""
+import gzip
+import logging
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard 为可选依赖
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+CODEC_NONE = 'none'
+
+_warned_missing_zstd = False
+
+
+def resolve_codec(codec):
+    """
+    解析配置的压缩算法，zstd 不可用时回退到 zlib
+
+    Returns:
+        'zlib' / 'zstd' / 'none'
+    """
+    global _warned_missing_zstd
+
+    codec = (codec or CODEC_NONE).lower()
+    if codec == CODEC_ZSTD and zstandard is None:
+        if not _warned_missing_zstd:
+            logger.warning("已配置 zstd 压缩但未安装 zstandard 库，回退到 zlib")
+            _warned_missing_zstd = True
+        return CODEC_ZLIB
+    if codec not in (CODEC_ZLIB, CODEC_ZSTD):
+        return CODEC_NONE
+    return codec
+
+
+def compress_text(text, codec):
+    """
+    压缩文本
+
+    Args:
+        text: 待压缩文本
+        codec: 压缩算法（见 resolve_codec）
+
+    Returns:
+        (codec, bytes)，不压缩时返回 ('none', None)
+    """
+    codec = resolve_codec(codec)
+    data = text.encode('utf-8')
+    if codec == CODEC_ZLIB:
+        return codec, zlib.compress(data, 6)
+    if codec == CODEC_ZSTD:
+        return codec, zstandard.ZstdCompressor(level=3).compress(data)
+    return CODEC_NONE, None
+
+
+def decompress_text(codec, data):
+    """
+    解压 compress_text 的结果
+
+    Raises:
+        ValueError: 未知的压缩算法，或 zstd 数据但未安装 zstandard
+    """
+    data = bytes(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data).decode('utf-8')
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("数据使用 zstd 压缩，需要安装 zstandard 库")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    raise ValueError(f"未知的压缩算法: {codec}")
+
+
+ARCHIVE_SUFFIXES = {
+    CODEC_ZLIB: '.jsonl.gz',
+    CODEC_ZSTD: '.jsonl.zst',
+    CODEC_NONE: '.jsonl',
+}
+
+
+def compress_archive_chunk(data, codec):
+    """
+    压缩追加到归档文件的数据块：gzip member 与 zstd frame 可直接拼接，zcat/zstdcat 可读取整个文件
+
+    Args:
+        data: 待写入的字节
+        codec: 压缩算法（见 resolve_codec），zlib 使用 gzip 格式
+
+    Returns:
+        (文件后缀, bytes)
+    """
+    codec = resolve_codec(codec)
+    if codec == CODEC_ZLIB:
+        return ARCHIVE_SUFFIXES[codec], gzip.compress(data, 6)
+    if codec == CODEC_ZSTD:
+        return ARCHIVE_SUFFIXES[codec], zstandard.ZstdCompressor(level=3).compress(data)
+    return ARCHIVE_SUFFIXES[codec], data
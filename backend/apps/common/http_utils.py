@@ -0,0 +1,68 @@
+"""
+HTTP 连接池工具 - 通知渠道共享的 requests.Session，按主机复用 keep-alive 连接，避免每次发送重新握手
+"""
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_retry():
+    """
+    重试策略：只重试连接失败与明确表示未处理的 429/503 响应
+
+    读超时等请求可能已送达的错误不重试，避免重复推送通知
+    """
+    retries = getattr(settings, 'HTTP_MAX_RETRIES', 2)
+    return Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset(['GET', 'POST']),
+        backoff_factor=getattr(settings, 'HTTP_RETRY_BACKOFF', 0.5),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def get_http_session():
+    """
+    获取进程内共享的 HTTP 会话
+
+    Returns:
+        requests.Session 实例，连接池大小由 HTTP_POOL_CONNECTIONS / HTTP_POOL_MAXSIZE 配置
+    """
+    global _session
+
+    if _session is not None:
+        return _session
+
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(
+                pool_connections=getattr(settings, 'HTTP_POOL_CONNECTIONS', 10),
+                pool_maxsize=getattr(settings, 'HTTP_POOL_MAXSIZE', 10),
+                max_retries=_build_retry(),
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def reset_http_session():
+    """重置会话（fork 出子进程后调用，避免共享连接）"""
+    global _session
+    with _session_lock:
+        _session = None
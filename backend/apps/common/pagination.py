@@ -0,0 +1,79 @@
+"""
+Keyset 分页工具 - 按 (created_at, id) 倒序翻页，深分页与首页代价相同
+
+游标为 base64 编码的 [created_at, id]，对客户端不透明
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    解析游标
+
+    Returns:
+        (created_at, id)
+
+    Raises:
+        ValueError: 游标无效
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError, UnicodeError) as exc:
+        raise ValueError(f"无效的分页游标: {token}") from exc
+
+
+def keyset_page(queryset, cursor, limit):
+    """
+    读取游标之后的一页
+
+    Args:
+        queryset: 已过滤的 queryset
+        cursor: 上一页返回的 next_cursor，首页为 None
+        limit: 每页数量
+
+    Returns:
+        (items, next_cursor)，没有下一页时 next_cursor 为 None
+
+    Raises:
+        ValueError: 游标无效
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        # created_at__lte 让数据库按索引直接定位到游标位置，OR 条件只处理同一时间戳的记录
+        queryset = queryset.filter(created_at__lte=created_at).filter(
+            Q(created_at__lt=created_at) | Q(id__lt=pk)
+        )
+
+    items = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return items, next_cursor
+
+
+def bounded_count(queryset, limit=None):
+    """
+    计数，超过上限（PAGINATION_COUNT_LIMIT）时停止扫描
+
+    Returns:
+        (count, exact)：超过上限时 count 为上限值，exact 为 False
+    """
+    limit = limit or getattr(settings, 'PAGINATION_COUNT_LIMIT', 10000)
+    count = queryset.order_by()[:limit + 1].count()
+    if count > limit:
+        return limit, False
+    return count, True
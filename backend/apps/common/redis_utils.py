@@ -0,0 +1,62 @@
+"""
+Redis 连接工具 - Redis 为可选依赖，不可用时返回 None，由调用方回退到数据库实现
+"""
+import logging
+import threading
+
+from django.conf import settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis 为可选依赖
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+_client_checked = False
+
+
+def get_redis_client():
+    """
+    获取进程内共享的 Redis 客户端
+
+    Returns:
+        redis.Redis 实例，未配置或连接失败时返回 None
+    """
+    global _client, _client_checked
+
+    if _client_checked:
+        return _client
+
+    with _client_lock:
+        if _client_checked:
+            return _client
+
+        redis_url = getattr(settings, 'REDIS_URL', '')
+        if not redis_url or redis is None:
+            if redis_url and redis is None:
+                logger.warning("已配置 REDIS_URL 但未安装 redis 库，回退到数据库实现")
+            _client_checked = True
+            return None
+
+        try:
+            client = redis.Redis.from_url(redis_url, socket_connect_timeout=2, socket_timeout=5)
+            client.ping()
+            _client = client
+            logger.info(f"Redis 连接成功: {redis_url}")
+        except Exception as e:
+            logger.warning(f"Redis 连接失败，回退到数据库实现: {e}")
+            _client = None
+
+        _client_checked = True
+        return _client
+
+
+def reset_redis_client():
+    """重置客户端缓存（fork 出子进程后调用，避免共享连接）"""
+    global _client, _client_checked
+    with _client_lock:
+        _client = None
+        _client_checked = False
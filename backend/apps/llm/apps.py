@@ -5,3 +5,7 @@ class LlmConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.llm'
     verbose_name = 'LLM Integration'
+
+    def ready(self):
+        # 注册配置与规则变更信号，使激活配置缓存与规则索引失效
+        from . import config_cache, rule_index  # noqa: F401
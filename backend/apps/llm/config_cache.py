@@ -0,0 +1,158 @@
+"""
+Active Config Cache
+进程内缓存当前激活的 LLM/GitLab/Claude CLI 配置，避免每次审查重复查询
+
+配置变更（post_save/post_delete 信号、激活操作）在事务提交后递增版本戳；
+版本戳以数据库（ConfigVersion）为准，Redis 只缓存数据库中的版本号（缺失时从数据库回填，只增不减），
+Redis 重启后版本不会回退；各进程按 CONFIG_CACHE_CHECK_INTERVAL 间隔比对版本，
+多个 gunicorn/worker 进程在一个检查间隔内保持一致
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+
+from apps.common.redis_utils import get_redis_client
+from .models import ClaudeCliConfig, ConfigVersion, GitLabConfig, LLMConfig
+
+logger = logging.getLogger(__name__)
+
+VERSION_NAME = 'active_configs'
+VERSION_KEY_PREFIX = 'code_review:config_version'
+
+CACHED_MODELS = (LLMConfig, GitLabConfig, ClaudeCliConfig)
+
+# 仅当新版本更大时写入，并发变更时 Redis 中的版本不会被较旧的值覆盖
+_SET_MAX_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local version = tonumber(ARGV[1])
+if version > current then
+    redis.call('SET', KEYS[1], version)
+    return version
+end
+return current
+"""
+
+_lock = threading.Lock()
+_entries = {}
+# 版本戳名称 -> (版本, 上次检查时间)
+_versions = {}
+
+
+def get_active_config(model):
+    """
+    获取指定模型当前激活的配置（缓存的实例只读，修改请重新查询数据库）
+
+    Args:
+        model: LLMConfig / GitLabConfig / ClaudeCliConfig
+
+    Returns:
+        模型实例，未配置时返回 None
+    """
+    label = model._meta.label
+    version = current_version(VERSION_NAME)
+
+    with _lock:
+        entry = _entries.get(label)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    instance = model.objects.filter(is_active=True).first()
+    with _lock:
+        _entries[label] = (version, instance)
+    return instance
+
+
+def get_active_llm_config():
+    return get_active_config(LLMConfig)
+
+
+def get_active_gitlab_config():
+    return get_active_config(GitLabConfig)
+
+
+def get_active_claude_cli_config():
+    return get_active_config(ClaudeCliConfig)
+
+
+def invalidate_config_cache():
+    """
+    配置变更后调用：事务提交后递增版本戳并清空本进程缓存
+    """
+    bump_version(VERSION_NAME)
+
+
+def bump_version(name):
+    """事务提交后递增指定名称的版本戳，本进程立即可见"""
+    transaction.on_commit(lambda: _bump_version(name))
+
+
+def current_version(name):
+    """
+    读取指定名称的版本戳，检查间隔（CONFIG_CACHE_CHECK_INTERVAL）内直接返回上次读取的值
+
+    Returns:
+        可比较相等性的版本值
+    """
+    now = time.monotonic()
+    interval = getattr(settings, 'CONFIG_CACHE_CHECK_INTERVAL', 5)
+    cached = _versions.get(name)
+    if cached is not None and now - cached[1] < interval:
+        return cached[0]
+
+    version = _read_version(name)
+    with _lock:
+        _versions[name] = (version, now)
+    return version
+
+
+def _bump_version(name):
+    updated = ConfigVersion.objects.filter(name=name).update(version=F('version') + 1)
+    if not updated:
+        ConfigVersion.objects.get_or_create(name=name, defaults={'version': 1})
+    version = _read_database_version(name)
+
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.eval(_SET_MAX_SCRIPT, 1, f"{VERSION_KEY_PREFIX}:{name}", version)
+        except Exception as e:
+            logger.warning(f"Redis 配置版本戳更新失败: {e}")
+
+    with _lock:
+        _versions.pop(name, None)
+    logger.info(f"配置已变更，本地缓存已失效 - {name}")
+
+
+def _read_version(name):
+    client = get_redis_client()
+    if client is not None:
+        key = f"{VERSION_KEY_PREFIX}:{name}"
+        try:
+            value = client.get(key)
+            if value is not None:
+                return int(value)
+            # Redis 重启或键被淘汰：从数据库回填，不从 0 重新计数
+            version = _read_database_version(name)
+            return int(client.eval(_SET_MAX_SCRIPT, 1, key, version))
+        except Exception as e:
+            logger.warning(f"Redis 配置版本戳读取失败，回退到数据库: {e}")
+
+    return _read_database_version(name)
+
+
+def _read_database_version(name):
+    return ConfigVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+
+def _on_config_changed(sender, **kwargs):
+    invalidate_config_cache()
+
+
+for _model in CACHED_MODELS:
+    post_save.connect(_on_config_changed, sender=_model, dispatch_uid=f'config_cache_save_{_model.__name__}')
+    post_delete.connect(_on_config_changed, sender=_model, dispatch_uid=f'config_cache_delete_{_model.__name__}')
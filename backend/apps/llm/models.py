@@ -1,6 +1,9 @@
 from django.db import models
 from django.utils import timezone
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class LLMConfig(models.Model):
@@ -170,6 +173,7 @@ class WebhookEventRule(models.Model):
     def matches_payload(self, payload: dict) -> bool:
         """
         检查给定的 webhook payload 是否匹配此规则
+        支持 $in/$regex/$glob/$exists 等操作符，见 apps.llm.rule_matching
 
         Args:
             payload: GitLab webhook payload 字典
@@ -180,34 +184,36 @@ class WebhookEventRule(models.Model):
         if not self.is_active or not payload:
             return False
 
-        rules = self.match_rules_dict
-        if not rules:
+        matcher = self.compiled_matcher
+        if matcher is None:
             return False
 
-        return self._deep_match(rules, payload)
+        return matcher(payload)
 
-    def _deep_match(self, rules: dict, data: dict) -> bool:
+    @property
+    def compiled_matcher(self):
         """
-        深度匹配规则和数据
-
-        Args:
-            rules: 匹配规则
-            data: 要匹配的数据
+        编译后的匹配函数，按 match_rules 原文缓存在实例上
 
         Returns:
-            bool: 是否匹配
+            callable(payload) -> bool，规则为空或无法编译时返回 None
         """
-        for key, value in rules.items():
-            if key not in data:
-                return False
+        from .rule_matching import RuleCompileError, compile_rules
 
-            if isinstance(value, dict) and isinstance(data[key], dict):
-                if not self._deep_match(value, data[key]):
-                    return False
-            elif data[key] != value:
-                return False
+        cached = getattr(self, '_compiled_matcher', None)
+        if cached is not None and cached[0] == self.match_rules:
+            return cached[1]
 
-        return True
+        rules = self.match_rules_dict
+        matcher = None
+        if rules:
+            try:
+                matcher = compile_rules(rules)
+            except RuleCompileError as exc:
+                logger.warning(f"Webhook 规则 {self.id} 编译失败: {exc}")
+
+        self._compiled_matcher = (self.match_rules, matcher)
+        return matcher
 
 
 class NotificationChannel(models.Model):
@@ -294,3 +300,20 @@ class ClaudeCliConfig(models.Model):
 
     def __str__(self):
         return f"Claude CLI Config - {self.cli_path}"
+
+
+class ConfigVersion(models.Model):
+    """
+    配置版本戳
+    LLM/GitLab/Claude CLI 配置变更时递增，各进程据此判断本地配置缓存是否失效
+    """
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'config_versions'
+
+    def __str__(self):
+        return f"{self.name} - v{self.version}"
@@ -0,0 +1,203 @@
+"""
+Webhook Event Rule Index
+启用的 WebhookEventRule 只解析、编译一次，按 object_kind 与 object_attributes.action 建立索引，
+匹配时先按 payload 的判别字段取候选规则，再检查编译后的剩余条件
+判别字段可以是普通值或 {"$in": [...]}，后者会登记到多个索引桶
+
+规则变更（post_save/post_delete 信号）递增 webhook_event_rules 版本戳，各进程据此重建索引
+"""
+import logging
+import threading
+from collections import namedtuple
+
+from django.db.models.signals import post_delete, post_save
+
+from .config_cache import bump_version, current_version
+from .models import WebhookEventRule
+from .rule_matching import RuleCompileError, compile_rules
+
+logger = logging.getLogger(__name__)
+
+VERSION_NAME = 'webhook_event_rules'
+
+# 规则未限定该判别字段（匹配任意值）
+ANY = object()
+# payload 缺少该判别字段，或值不可哈希
+MISSING = object()
+
+CompiledRule = namedtuple('CompiledRule', ['position', 'rule', 'matcher'])
+
+
+def _is_discriminator(value):
+    """标量且可哈希的值才能作为索引键"""
+    if isinstance(value, (dict, list)):
+        return False
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _discriminator_values(value):
+    """
+    规则条件可作为索引键时返回键列表：普通值或仅含 $in 的操作符
+
+    Returns:
+        list，不能作为索引键时返回 None
+    """
+    if _is_discriminator(value):
+        return [value]
+    if isinstance(value, dict) and list(value) == ['$in'] and isinstance(value['$in'], list) \
+            and value['$in'] and all(_is_discriminator(item) for item in value['$in']):
+        return list(dict.fromkeys(value['$in']))
+    return None
+
+
+def compile_rule(rules):
+    """
+    拆分规则为判别字段与剩余条件
+
+    Returns:
+        (object_kinds, actions, residual)，未限定的判别字段为 [ANY]
+    """
+    residual = dict(rules)
+
+    object_kinds = [ANY]
+    if 'object_kind' in residual:
+        values = _discriminator_values(residual['object_kind'])
+        if values is not None:
+            object_kinds = values
+            residual.pop('object_kind')
+
+    actions = [ANY]
+    attributes = residual.get('object_attributes')
+    if isinstance(attributes, dict) and 'action' in attributes:
+        values = _discriminator_values(attributes['action'])
+        if values is not None:
+            actions = values
+            attributes = dict(attributes)
+            attributes.pop('action')
+            # 命中 action 索引说明 payload 的 object_attributes 是字典，空条件无需再检查
+            if attributes:
+                residual['object_attributes'] = attributes
+            else:
+                residual.pop('object_attributes')
+
+    return object_kinds, actions, residual
+
+
+def payload_discriminators(payload):
+    """提取 payload 的判别字段，缺失或不可哈希时为 MISSING"""
+    object_kind = payload.get('object_kind', MISSING)
+    if object_kind is not MISSING and not _is_discriminator(object_kind):
+        object_kind = MISSING
+
+    action = MISSING
+    attributes = payload.get('object_attributes')
+    if isinstance(attributes, dict) and 'action' in attributes and _is_discriminator(attributes['action']):
+        action = attributes['action']
+
+    return object_kind, action
+
+
+class WebhookRuleIndex:
+    """
+    启用规则的编译索引
+    """
+
+    def __init__(self, rules):
+        """
+        Args:
+            rules: 按匹配优先级排序的 WebhookEventRule 实例
+        """
+        self.buckets = {}
+        self.size = 0
+        for position, rule in enumerate(rules):
+            rules_dict = rule.match_rules_dict
+            if not rules_dict:
+                continue
+            object_kinds, actions, residual = compile_rule(rules_dict)
+            try:
+                compiled = CompiledRule(position, rule, compile_rules(residual))
+            except RuleCompileError as exc:
+                logger.warning(f"Webhook 规则 {rule.name} (ID: {rule.id}) 编译失败，已跳过: {exc}")
+                continue
+
+            # 同一规则的多个判别值组合互不相同，payload 只会命中其中一个桶
+            for object_kind in object_kinds:
+                for action in actions:
+                    self.buckets.setdefault((object_kind, action), []).append(compiled)
+            self.size += 1
+
+    def match_all(self, payload, rule_ids=None):
+        """
+        按优先级返回所有匹配的规则
+
+        Args:
+            payload: GitLab webhook payload
+            rule_ids: 只在这些规则 ID 中匹配（可选）
+
+        Returns:
+            list[WebhookEventRule]
+        """
+        return list(self._iter_matches(payload, rule_ids))
+
+    def match(self, payload, rule_ids=None):
+        """返回优先级最高的匹配规则，没有时返回 None"""
+        return next(self._iter_matches(payload, rule_ids), None)
+
+    def _iter_matches(self, payload, rule_ids):
+        if not payload:
+            return
+
+        object_kind, action = payload_discriminators(payload)
+        candidates = []
+        for key in ((object_kind, action), (object_kind, ANY), (ANY, action), (ANY, ANY)):
+            candidates.extend(self.buckets.get(key, ()))
+        candidates.sort(key=lambda compiled: compiled.position)
+
+        for compiled in candidates:
+            if (rule_ids is None or compiled.rule.id in rule_ids) and compiled.matcher(payload):
+                yield compiled.rule
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def get_rule_index():
+    """
+    获取当前版本的规则索引，版本戳变化时重建
+
+    Returns:
+        WebhookRuleIndex
+    """
+    global _index, _index_version
+
+    version = current_version(VERSION_NAME)
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _lock:
+        if _index is None or _index_version != version:
+            # 与原先逐条匹配的顺序一致（模型默认按 name 排序）
+            rules = list(WebhookEventRule.objects.filter(is_active=True).order_by('name', 'id'))
+            _index = WebhookRuleIndex(rules)
+            _index_version = version
+            logger.info(f"Webhook 规则索引已重建 - 规则数:{_index.size}, 索引桶:{len(_index.buckets)}")
+        return _index
+
+
+def invalidate_rule_index():
+    """规则变更后调用：事务提交后递增版本戳"""
+    bump_version(VERSION_NAME)
+
+
+def _on_rule_changed(sender, **kwargs):
+    invalidate_rule_index()
+
+
+post_save.connect(_on_rule_changed, sender=WebhookEventRule, dispatch_uid='rule_index_save')
+post_delete.connect(_on_rule_changed, sender=WebhookEventRule, dispatch_uid='rule_index_delete')
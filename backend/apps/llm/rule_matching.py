@@ -0,0 +1,185 @@
+"""
+Webhook Rule Matching
+将 match_rules 编译为匹配函数：正则、glob 与集合在编译时构造一次，匹配时单次遍历 payload
+
+规则语义：
+    - 普通值：payload 对应字段必须相等
+    - 字典：递归匹配子字段
+    - 仅包含 $ 开头键的字典为操作符，多个操作符需同时满足：
+        $eq / $ne            相等 / 不相等（字段缺失视为不相等）
+        $in / $nin           值在 / 不在列表中；字段为列表时任一元素在列表中即视为命中
+        $regex               正则搜索（re.search），字段必须是字符串
+        $glob                通配符匹配整个字符串，如 "release/*"
+        $exists              true 要求字段存在，false 要求字段不存在
+        $gt/$gte/$lt/$lte    数值比较
+        $contains            字段为列表时任一元素匹配给定规则（可为值、字典或操作符），
+                             字段为字符串时包含给定子串
+
+示例：
+    {"object_kind": "merge_request",
+     "object_attributes": {"action": {"$in": ["open", "update"]},
+                           "target_branch": {"$glob": "release/*"},
+                           "title": {"$regex": "^(?!WIP)"}},
+     "labels": {"$contains": {"title": "needs-review"}}}
+"""
+import fnmatch
+import numbers
+import re
+
+OPERATORS = frozenset([
+    '$eq', '$ne', '$in', '$nin', '$regex', '$glob', '$exists',
+    '$gt', '$gte', '$lt', '$lte', '$contains',
+])
+
+_MISSING = object()
+
+
+class RuleCompileError(ValueError):
+    """match_rules 中的操作符无法编译"""
+
+
+def is_operator_spec(value):
+    """仅包含 $ 开头键的非空字典视为操作符"""
+    return isinstance(value, dict) and bool(value) and all(
+        isinstance(key, str) and key.startswith('$') for key in value
+    )
+
+
+def compile_rules(rules):
+    """
+    编译规则字典
+
+    Args:
+        rules: match_rules 字典
+
+    Returns:
+        callable(data) -> bool
+
+    Raises:
+        RuleCompileError: 未知操作符或参数不合法
+    """
+    checks = [(key, _compile_value(value, path=key)) for key, value in rules.items()]
+
+    def match(data):
+        if not isinstance(data, dict):
+            return False
+        for key, check in checks:
+            if not check(data.get(key, _MISSING)):
+                return False
+        return True
+
+    return match
+
+
+def _compile_value(value, path):
+    """编译单个字段的条件，返回 callable(field_value) -> bool，字段缺失时传入 _MISSING"""
+    if is_operator_spec(value):
+        return _compile_operators(value, path)
+
+    if isinstance(value, dict):
+        nested = compile_rules(value)
+        return lambda field: field is not _MISSING and nested(field)
+
+    return lambda field: field is not _MISSING and field == value
+
+
+def _compile_operators(spec, path):
+    checks = []
+    for operator, argument in spec.items():
+        if operator not in OPERATORS:
+            raise RuleCompileError(f"{path}: 不支持的操作符 {operator}")
+        checks.append(_compile_operator(operator, argument, path))
+
+    if len(checks) == 1:
+        return checks[0]
+    return lambda field: all(check(field) for check in checks)
+
+
+def _compile_operator(operator, argument, path):
+    if operator == '$eq':
+        return lambda field: field is not _MISSING and field == argument
+
+    if operator == '$ne':
+        return lambda field: field is _MISSING or field != argument
+
+    if operator in ('$in', '$nin'):
+        if not isinstance(argument, list):
+            raise RuleCompileError(f"{path}: {operator} 的参数必须是列表")
+        contains = _compile_membership(argument)
+        if operator == '$in':
+            return lambda field: field is not _MISSING and contains(field)
+        return lambda field: field is _MISSING or not contains(field)
+
+    if operator == '$regex':
+        if not isinstance(argument, str):
+            raise RuleCompileError(f"{path}: $regex 的参数必须是字符串")
+        try:
+            pattern = re.compile(argument)
+        except re.error as exc:
+            raise RuleCompileError(f"{path}: 无效的正则表达式 {argument!r}: {exc}") from exc
+        return lambda field: isinstance(field, str) and pattern.search(field) is not None
+
+    if operator == '$glob':
+        if not isinstance(argument, str):
+            raise RuleCompileError(f"{path}: $glob 的参数必须是字符串")
+        pattern = re.compile(fnmatch.translate(argument))
+        return lambda field: isinstance(field, str) and pattern.match(field) is not None
+
+    if operator == '$exists':
+        if not isinstance(argument, bool):
+            raise RuleCompileError(f"{path}: $exists 的参数必须是 true 或 false")
+        return lambda field: (field is not _MISSING) == argument
+
+    if operator in ('$gt', '$gte', '$lt', '$lte'):
+        if not _is_number(argument):
+            raise RuleCompileError(f"{path}: {operator} 的参数必须是数字")
+        compare = {
+            '$gt': lambda a, b: a > b,
+            '$gte': lambda a, b: a >= b,
+            '$lt': lambda a, b: a < b,
+            '$lte': lambda a, b: a <= b,
+        }[operator]
+        return lambda field: _is_number(field) and compare(field, argument)
+
+    # $contains
+    element_check = _compile_value(argument, path=f"{path}[]")
+
+    def contains(field):
+        if isinstance(field, list):
+            return any(element_check(element) for element in field)
+        if isinstance(field, str) and isinstance(argument, str):
+            return argument in field
+        return False
+
+    return contains
+
+
+def _compile_membership(values):
+    """可哈希的值放入 frozenset，其余逐个比较"""
+    hashable = set()
+    others = []
+    for item in values:
+        try:
+            hashable.add(item)
+        except TypeError:
+            others.append(item)
+    hashable = frozenset(hashable)
+
+    def member(item):
+        try:
+            if item in hashable:
+                return True
+        except TypeError:
+            pass
+        return any(item == other for other in others)
+
+    def contains(field):
+        if isinstance(field, list):
+            return any(member(item) for item in field)
+        return member(field)
+
+    return contains
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
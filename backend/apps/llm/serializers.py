@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import LLMConfig, GitLabConfig, NotificationConfig, NotificationChannel, WebhookEventRule, ClaudeCliConfig
+from .config_cache import invalidate_config_cache
+from .rule_matching import RuleCompileError, compile_rules
 
 
 class LLMConfigSerializer(serializers.ModelSerializer):
@@ -12,12 +14,14 @@ class LLMConfigSerializer(serializers.ModelSerializer):
         # 如果创建新的激活配置，先禁用其他配置
         if validated_data.get('is_active', True):
             LLMConfig.objects.filter(is_active=True).update(is_active=False)
+            invalidate_config_cache()
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
         # 如果设置为激活状态，先禁用其他配置
         if validated_data.get('is_active', False) and not instance.is_active:
             LLMConfig.objects.filter(is_active=True).update(is_active=False)
+            invalidate_config_cache()
         return super().update(instance, validated_data)
 
 
@@ -38,12 +42,14 @@ class GitLabConfigSerializer(serializers.ModelSerializer):
         # 如果创建新的激活配置，先禁用其他配置
         if validated_data.get('is_active', True):
             GitLabConfig.objects.filter(is_active=True).update(is_active=False)
+            invalidate_config_cache()
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
         # 如果设置为激活状态，先禁用其他配置
         if validated_data.get('is_active', False) and not instance.is_active:
             GitLabConfig.objects.filter(is_active=True).update(is_active=False)
+            invalidate_config_cache()
         return super().update(instance, validated_data)
 
 
@@ -246,6 +252,11 @@ class WebhookEventRuleSerializer(serializers.ModelSerializer):
         if not value:
             raise serializers.ValidationError("匹配规则不能为空")
 
+        try:
+            compile_rules(value)
+        except RuleCompileError as exc:
+            raise serializers.ValidationError(str(exc))
+
         return value
 
     def to_representation(self, instance):
@@ -276,12 +287,14 @@ class ClaudeCliConfigSerializer(serializers.ModelSerializer):
         """如果创建新的激活配置，先禁用其他配置"""
         if validated_data.get('is_active', True):
             ClaudeCliConfig.objects.filter(is_active=True).update(is_active=False)
+            invalidate_config_cache()
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
         """如果设置为激活状态，先禁用其他配置"""
         if validated_data.get('is_active', False) and not instance.is_active:
             ClaudeCliConfig.objects.filter(is_active=True).update(is_active=False)
+            invalidate_config_cache()
         return super().update(instance, validated_data)
 
 
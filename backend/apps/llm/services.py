@@ -25,11 +25,11 @@ class LLMService:
         从数据库加载 LLM 配置，如缺失则抛出 ImproperlyConfigured
         """
         try:
-            from .models import LLMConfig
+            from .config_cache import get_active_llm_config
         except ImportError as exc:
             raise ImproperlyConfigured("无法导入 LLMConfig 模型，请确认 apps.llm 已正确安装") from exc
 
-        llm_config = LLMConfig.objects.filter(is_active=True).first()
+        llm_config = get_active_llm_config()
 
         if not llm_config:
             raise ImproperlyConfigured("未检测到有效的 LLM 配置，请在后台管理或接口中创建并启用一条 LLM 配置")
@@ -136,18 +136,7 @@ class LLMService:
                 return error_msg
 
             # 构建最终使用的 prompt
-            # 优先级：外部传入的 custom_prompt > 基于 mr_info 构建的默认 prompt
-            final_prompt = None
-            if custom_prompt:
-                # 如果外部提供了自定义 prompt，直接使用
-                logger.info(f"[{self.request_id}] 使用外部传入的自定义 Prompt (长度: {len(custom_prompt)})")
-                final_prompt = custom_prompt
-            elif mr_info:
-                # 否则使用系统默认构建逻辑
-                logger.info(f"[{self.request_id}] 使用系统默认 Prompt 构建逻辑")
-                final_prompt = self._build_claude_cli_prompt(mr_info)
-            else:
-                logger.info(f"[{self.request_id}] 未提供任何 Prompt，使用 Claude CLI 默认行为")
+            final_prompt = self.build_review_prompt(mr_info, custom_prompt)
 
             # 执行代码审查
             success, result_data, error = cli_service.review_code(
@@ -180,6 +169,36 @@ class LLMService:
             logger.error(f"[{self.request_id}] 代码审查异常 - 耗时:{elapsed_time:.2f}秒, 错误:{e}", exc_info=True)
             return f"代码审查失败: {str(e)}"
 
+    def build_review_prompt(self, mr_info=None, custom_prompt=None):
+        """
+        构建最终发送给 Claude CLI 的 prompt
+        优先级：外部传入的 custom_prompt > 基于 mr_info 构建的默认 prompt
+
+        Returns:
+            prompt 文本，两者都未提供时返回 None（使用 Claude CLI 默认行为）
+        """
+        if custom_prompt:
+            # 如果外部提供了自定义 prompt，直接使用
+            logger.info(f"[{self.request_id}] 使用外部传入的自定义 Prompt (长度: {len(custom_prompt)})")
+            return custom_prompt
+        if mr_info:
+            # 否则使用系统默认构建逻辑
+            logger.info(f"[{self.request_id}] 使用系统默认 Prompt 构建逻辑")
+            return self._build_claude_cli_prompt(mr_info)
+        logger.info(f"[{self.request_id}] 未提供任何 Prompt，使用 Claude CLI 默认行为")
+        return None
+
+    def get_config_fingerprint(self):
+        """
+        影响审查结果的配置指纹（提供商、模型与 Claude CLI 配置），用于审查结果缓存键
+        """
+        from .config_cache import get_active_claude_cli_config
+
+        cli_config = get_active_claude_cli_config()
+        cli_path = cli_config.cli_path if cli_config else getattr(settings, 'CLAUDE_CLI_PATH', 'claude')
+        cli_base_url = (cli_config.anthropic_base_url or '') if cli_config else ''
+        return '|'.join([self.provider or '', self.model or '', self.api_base or '', cli_path or '', cli_base_url])
+
     def _build_claude_cli_prompt(self, mr_info):
         """
         构建 Claude CLI 的审查提示
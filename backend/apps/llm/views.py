@@ -9,6 +9,13 @@ import os
 import tempfile
 import subprocess
 from .models import LLMConfig, GitLabConfig, NotificationConfig, NotificationChannel, WebhookEventRule, ClaudeCliConfig
+from .config_cache import (
+    get_active_llm_config,
+    get_active_gitlab_config,
+    get_active_claude_cli_config,
+    invalidate_config_cache
+)
+from .rule_index import get_rule_index
 from .serializers import (
     LLMConfigSerializer,
     GitLabConfigSerializer,
@@ -18,6 +25,8 @@ from .serializers import (
     ConfigSummarySerializer,
     ClaudeCliConfigSerializer
 )
+from apps.common.http_utils import get_http_session
+from apps.response.services import get_channel_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +42,7 @@ class LLMConfigViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def active(self, request):
         """获取当前激活的LLM配置"""
-        config = LLMConfig.objects.filter(is_active=True).first()
+        config = get_active_llm_config()
         if config:
             serializer = self.get_serializer(config)
             return Response(serializer.data)
@@ -48,6 +57,8 @@ class LLMConfigViewSet(viewsets.ModelViewSet):
         # 激活当前配置
         config.is_active = True
         config.save()
+        # 批量禁用不触发信号，显式使配置缓存失效
+        invalidate_config_cache()
         return Response({'message': 'LLM config activated successfully'})
 
 
@@ -62,7 +73,7 @@ class GitLabConfigViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def active(self, request):
         """获取当前激活的GitLab配置"""
-        config = GitLabConfig.objects.filter(is_active=True).first()
+        config = get_active_gitlab_config()
         if config:
             serializer = self.get_serializer(config)
             return Response(serializer.data)
@@ -77,6 +88,8 @@ class GitLabConfigViewSet(viewsets.ModelViewSet):
         # 激活当前配置
         config.is_active = True
         config.save()
+        # 批量禁用不触发信号，显式使配置缓存失效
+        invalidate_config_cache()
         return Response({'message': 'GitLab config activated successfully'})
 
 
@@ -191,7 +204,9 @@ class NotificationChannelViewSet(viewsets.ModelViewSet):
 ---
 *Code Review GPT 自动发送*"""
 
-            service = DingTalkService(webhook_url=webhook_url, secret=secret, request_id=f"test-{test_id}")
+            service = DingTalkService(
+                webhook_url=webhook_url, secret=secret, request_id=f"test-{test_id}", timeout=get_channel_timeout(channel)
+            )
             result = service.send_markdown("通知渠道测试", test_message)
 
             if result.get('success'):
@@ -218,8 +233,6 @@ class NotificationChannelViewSet(viewsets.ModelViewSet):
     def _test_slack(self, channel, test_id, timestamp):
         """测试Slack通知渠道"""
         try:
-            import requests
-
             config_dict = channel.config_dict
             webhook_url = config_dict.get('webhook_url') or config_dict.get('webhook')
 
@@ -274,7 +287,7 @@ class NotificationChannelViewSet(viewsets.ModelViewSet):
                 ]
             }
 
-            response = requests.post(webhook_url, json=payload, timeout=30)
+            response = get_http_session().post(webhook_url, json=payload, timeout=get_channel_timeout(channel))
 
             if response.status_code == 200:
                 return Response({
@@ -300,8 +313,6 @@ class NotificationChannelViewSet(viewsets.ModelViewSet):
     def _test_feishu(self, channel, test_id, timestamp):
         """测试飞书通知渠道"""
         try:
-            import requests
-
             config_dict = channel.config_dict
             webhook_url = config_dict.get('webhook_url') or config_dict.get('webhook')
 
@@ -323,7 +334,7 @@ class NotificationChannelViewSet(viewsets.ModelViewSet):
 
             logger.info(f"飞书测试请求 - URL: {webhook_url[:50]}...")
             logger.info(f"飞书测试请求 - Payload: {payload}")
-            response = requests.post(webhook_url, json=payload, timeout=30)
+            response = get_http_session().post(webhook_url, json=payload, timeout=get_channel_timeout(channel))
             result = response.json()
 
             logger.info(f"飞书测试API响应 - 状态码:{response.status_code}, 响应内容:{response.text}")
@@ -354,8 +365,6 @@ class NotificationChannelViewSet(viewsets.ModelViewSet):
     def _test_wechat(self, channel, test_id, timestamp):
         """测试企业微信通知渠道"""
         try:
-            import requests
-
             config_dict = channel.config_dict
             webhook_url = config_dict.get('webhook_url') or config_dict.get('webhook')
 
@@ -382,7 +391,7 @@ class NotificationChannelViewSet(viewsets.ModelViewSet):
                 }
             }
 
-            response = requests.post(webhook_url, json=payload, timeout=30)
+            response = get_http_session().post(webhook_url, json=payload, timeout=get_channel_timeout(channel))
             result = response.json()
 
             if result.get('errcode') == 0:
@@ -732,17 +741,15 @@ class WebhookEventRuleViewSet(viewsets.ModelViewSet):
         if not payload:
             return Response({'error': 'Payload is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        active_rules = WebhookEventRule.objects.filter(is_active=True)
         matched_rules = []
 
-        for rule in active_rules:
-            if rule.matches_payload(payload):
-                matched_rules.append({
-                    'id': rule.id,
-                    'name': rule.name,
-                    'event_type': rule.event_type,
-                    'description': rule.description
-                })
+        for rule in get_rule_index().match_all(payload):
+            matched_rules.append({
+                'id': rule.id,
+                'name': rule.name,
+                'event_type': rule.event_type,
+                'description': rule.description
+            })
 
         return Response({
             'payload': payload,
@@ -758,9 +765,9 @@ class ConfigViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """获取所有配置的摘要信息"""
-        active_llm_config = LLMConfig.objects.filter(is_active=True).first()
-        active_gitlab_config = GitLabConfig.objects.filter(is_active=True).first()
-        active_claude_cli_config = ClaudeCliConfig.objects.filter(is_active=True).first()
+        active_llm_config = get_active_llm_config()
+        active_gitlab_config = get_active_gitlab_config()
+        active_claude_cli_config = get_active_claude_cli_config()
         notification_configs = NotificationConfig.objects.filter(is_active=True)
         notification_channels = NotificationChannel.objects.all()
         webhook_events = WebhookEventRule.objects.all()
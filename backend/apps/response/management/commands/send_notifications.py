@@ -0,0 +1,40 @@
+"""
+投递通知发件箱中到期的通知
+
+使用方法:
+    python manage.py send_notifications
+    python manage.py send_notifications --requeue-dead
+    python manage.py send_notifications --requeue-dead --review-id 123
+"""
+from django.core.management.base import BaseCommand
+
+from apps.response.outbox import NotificationOutboxSender
+
+
+class Command(BaseCommand):
+    help = '投递通知发件箱中到期的通知（review worker 进程池会周期执行），可将死信重新入队'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requeue-dead',
+            action='store_true',
+            help='投递前将死信通知重新放回队列',
+        )
+        parser.add_argument(
+            '--review-id',
+            type=int,
+            default=None,
+            help='只重新入队指定审查的死信通知',
+        )
+
+    def handle(self, *args, **options):
+        sender = NotificationOutboxSender(request_id='send_notifications')
+
+        if options['requeue_dead']:
+            requeued = sender.requeue_dead(review_id=options['review_id'])
+            self.stdout.write(f"重新入队死信通知 {requeued} 条")
+
+        result = sender.drain()
+        self.stdout.write(self.style.SUCCESS(
+            f"发送成功 {result['sent']} 条，待重试 {result['retried']} 条，转入死信 {result['dead']} 条"
+        ))
@@ -0,0 +1,57 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('webhook', '0015_project_daily_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('project_id', models.IntegerField(blank=True, null=True)),
+                ('channel_type', models.CharField(max_length=50)),
+                ('channel_id', models.IntegerField(blank=True, null=True)),
+                ('channel_name', models.CharField(blank=True, default='', max_length=255)),
+                ('report_data', models.TextField(default='{}')),
+                ('mr_info', models.TextField(default='{}')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('dead', 'Dead')], db_index=True, default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=6)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('last_result', models.TextField(blank=True, default='{}')),
+                ('request_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='webhook.mergerequestreview')),
+            ],
+            options={
+                'db_table': 'notification_outbox',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['status', 'available_at'], name='notificatio_status_e56244_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['status', 'locked_until'], name='notificatio_status_3e9954_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['channel_id', 'sent_at'], name='notificatio_channel_96b288_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('response', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationChannelBucket',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('channel_id', models.IntegerField(unique=True)),
+                ('tokens', models.FloatField(default=0)),
+                ('refilled_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'notification_channel_buckets',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='notificationoutbox',
+            name='notificatio_channel_96b288_idx',
+        ),
+    ]
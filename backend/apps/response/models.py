@@ -1,3 +1,101 @@
 from django.db import models
+from django.utils import timezone
+import json
 
-# Response models can be added here if needed
+
+class NotificationOutbox(models.Model):
+    """
+    通知发件箱
+    审查完成时与审查结果在同一事务中写入（每个渠道一条），由后台发送器投递，
+    失败后按指数退避重试，超过最大尝试次数后转入死信（dead）
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    review = models.ForeignKey(
+        'webhook.MergeRequestReview',
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    project_id = models.IntegerField(null=True, blank=True)
+
+    # 目标渠道：GitLab 评论没有 NotificationChannel，channel_id 为空
+    channel_type = models.CharField(max_length=50)
+    channel_id = models.IntegerField(null=True, blank=True)
+    channel_name = models.CharField(max_length=255, blank=True, default='')
+
+    # 通知内容 - SQLite兼容的JSON字段
+    report_data = models.TextField(default='{}')
+    mr_info = models.TextField(default='{}')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=6)
+
+    # 调度与租约
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    # 最近一次发送结果
+    last_error = models.TextField(null=True, blank=True)
+    last_result = models.TextField(default='{}', blank=True)
+
+    request_id = models.CharField(max_length=100, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'notification_outbox'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['status', 'locked_until']),
+        ]
+
+    def __str__(self):
+        return f"Notification#{self.id} - Review {self.review_id} -> {self.channel_type} ({self.channel_name}) - {self.status}"
+
+    # JSON字段的getter和setter方法
+    @property
+    def report_data_dict(self):
+        try:
+            return json.loads(self.report_data)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+
+    @property
+    def mr_info_dict(self):
+        try:
+            return json.loads(self.mr_info)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+
+    @property
+    def last_result_dict(self):
+        try:
+            return json.loads(self.last_result)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+
+
+class NotificationChannelBucket(models.Model):
+    """
+    通知渠道的令牌桶状态
+    每次发送消耗一个令牌，按渠道速率持续补充；多个发送进程通过条件更新共享同一个桶
+    """
+    id = models.AutoField(primary_key=True)
+    channel_id = models.IntegerField(unique=True)
+    tokens = models.FloatField(default=0)
+    refilled_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'notification_channel_buckets'
+
+    def __str__(self):
+        return f"Channel {self.channel_id} - {self.tokens:.2f} tokens"
@@ -1,11 +1,17 @@
 """
 通知分发器 - 负责管理和分发到各个通知渠道
 """
+import json
 import logging
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Dict, Any, Optional
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from apps.common.http_utils import get_http_session
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -22,86 +28,41 @@ class NotificationDispatcher:
     def dispatch(self, report_data: Dict[str, Any], mr_info: Dict[str, Any], project_id: Optional[int] = None) -> Dict[str, Any]:
         """
         分发通知到各个渠道
+
+        各渠道并发发送：单个渠道超过自身时限（渠道配置 timeout 或 NOTIFICATION_CHANNEL_TIMEOUT）
+        或整体超过 NOTIFICATION_DISPATCH_TIMEOUT 时记为超时，不再等待
         """
+        dispatch_start = time.time()
         try:
             project_id = project_id or mr_info.get('project_id')
             notification_channels, gitlab_enabled = self._get_notification_targets(project_id)
 
-            total_targets = len(notification_channels) + (1 if gitlab_enabled else 0)
+            # (渠道类型, 渠道配置, 报告, MR 信息)，GitLab 评论没有渠道配置
+            targets = [(channel.notification_type, channel, report_data, mr_info) for channel in notification_channels]
+            if gitlab_enabled:
+                targets.append(('gitlab', None, report_data, mr_info))
 
-            if total_targets == 0:
+            if not targets:
                 logger.warning(f"[{self.request_id}] 未找到启用的通知渠道")
                 return {'success': True, 'channels': [], 'message': '无启用的通知渠道'}
 
-            logger.info(f"[{self.request_id}] 开始分发通知到 {total_targets} 个渠道")
+            logger.info(f"[{self.request_id}] 开始并发分发通知到 {len(targets)} 个渠道")
 
-            results = []
-            failed_channels = []
-
-            # 先处理第三方渠道
-            for channel in notification_channels:
-                channel_type = channel.notification_type
-                logger.info(f"[{self.request_id}] 开始发送到渠道: {channel_type} ({channel.name})")
+            results = self._dispatch_parallel(targets, dispatch_start)
 
-                try:
-                    # 调用对应的服务发送通知
-                    result = self._send_to_channel(channel_type, channel, report_data, mr_info)
-
-                    results.append({
-                        'channel': channel_type,
-                        'success': result.get('success', False),
-                        'message': result.get('message', ''),
-                        'response_time': result.get('response_time', 0),
-                        'details': result.get('details', {}),
-                        'channel_id': channel.id,
-                        'channel_name': channel.name,
-                    })
-
-                    if result.get('success', False):
-                        logger.info(f"[{self.request_id}] 渠道 {channel_type} ({channel.name}) 发送成功 - 耗时:{result.get('response_time', 0):.2f}秒")
-                    else:
-                        error_details = result.get('details', {})
-                        logger.error(f"[{self.request_id}] 渠道 {channel_type} ({channel.name}) 发送失败 - 错误信息:{result.get('message', '')}, 响应时间:{result.get('response_time', 0):.2f}秒, 详细信息:{error_details}")
-                        failed_channels.append(f"{channel_type}:{channel.id}")
-
-                except Exception as e:
-                    error_msg = f"渠道 {channel_type} ({channel.name}) 发送异常: {str(e)}"
-                    logger.error(f"[{self.request_id}] {error_msg}", exc_info=True)
-                    failed_channels.append(f"{channel_type}:{channel.id}")
-                    results.append({
-                        'channel': channel_type,
-                        'success': False,
-                        'message': error_msg,
-                        'response_time': 0,
-                        'details': {'error': str(e)},
-                        'channel_id': channel.id,
-                        'channel_name': channel.name,
-                    })
-
-            # GitLab 评论通知单独处理
-            if gitlab_enabled:
-                gitlab_start = time.time()
-                gitlab_result = self._send_to_gitlab(None, report_data, mr_info, gitlab_start)
-
-                if gitlab_result:
-                    results.append({
-                        'channel': 'gitlab',
-                        'success': gitlab_result.get('success', False),
-                        'message': gitlab_result.get('message', ''),
-                        'response_time': gitlab_result.get('response_time', 0),
-                        'details': gitlab_result.get('details', {}),
-                        'channel_name': 'GitLab 评论',
-                    })
-
-                    if gitlab_result.get('success', False):
-                        logger.info(f"[{self.request_id}] GitLab 评论发送成功")
-                    else:
-                        logger.error(f"[{self.request_id}] GitLab 评论发送失败: {gitlab_result.get('message', '')}")
-                        failed_channels.append('gitlab')
+            failed_channels = []
+            for result in results:
+                label = result['channel_name']
+                if result['success']:
+                    logger.info(f"[{self.request_id}] 渠道 {result['channel']} ({label}) 发送成功 - 耗时:{result['response_time']:.2f}秒")
+                    continue
+                logger.error(f"[{self.request_id}] 渠道 {result['channel']} ({label}) 发送失败 - 错误信息:{result['message']}, 响应时间:{result['response_time']:.2f}秒, 详细信息:{result['details']}")
+                failed_channels.append(f"{result['channel']}:{result['channel_id']}" if result.get('channel_id') else result['channel'])
 
             # 汇总结果
             success_count = len([r for r in results if r['success']])
             total_count = len(results)
+            elapsed_time = time.time() - dispatch_start
 
             summary = {
                 'success': success_count > 0,  # 只要有一个成功就算整体成功
@@ -109,16 +70,18 @@ class NotificationDispatcher:
                 'success_channels': success_count,
                 'failed_channels': len(failed_channels),
                 'failed_channel_list': failed_channels,
+                'timed_out_channels': len([r for r in results if r.get('timed_out')]),
                 'results': results,
+                'elapsed_time': elapsed_time,
                 'dispatch_time': datetime.now().isoformat()
             }
 
-            logger.info(f"[{self.request_id}] 通知分发完成 - 成功:{success_count}/{total_count}, 失败渠道:{failed_channels}")
+            logger.info(f"[{self.request_id}] 通知分发完成 - 成功:{success_count}/{total_count}, 失败渠道:{failed_channels}, 总耗时:{elapsed_time:.2f}秒")
 
             return summary
 
         except ImproperlyConfigured as config_error:
-            elapsed_time = time.time() - start_time
+            elapsed_time = time.time() - dispatch_start
             error_msg = f'GitLab配置缺失: {config_error}'
             logger.error(f"[{self.request_id}] {error_msg}")
             return {
@@ -136,6 +99,143 @@ class NotificationDispatcher:
                 'dispatch_time': datetime.now().isoformat()
             }
 
+    def _channel_timeout(self, channel) -> float:
+        """渠道发送时限：渠道配置的 timeout 优先，否则使用 NOTIFICATION_CHANNEL_TIMEOUT"""
+        from .services import get_channel_timeout
+        return get_channel_timeout(channel)
+
+    def enqueue(self, review, report_data: Dict[str, Any], mr_info: Dict[str, Any], project_id: Optional[int] = None):
+        """
+        将通知写入发件箱（每个目标渠道一条），由 NotificationOutboxSender 异步投递
+
+        调用方应与审查结果的保存放在同一事务中，审查完成与待发通知同时提交
+
+        Returns:
+            list: 创建的 NotificationOutbox 记录
+        """
+        from .models import NotificationOutbox
+
+        project_id = project_id or mr_info.get('project_id')
+        notification_channels, gitlab_enabled = self._get_notification_targets(project_id)
+
+        targets = [(channel.notification_type, channel.id, channel.name) for channel in notification_channels]
+        if gitlab_enabled:
+            targets.append(('gitlab', None, 'GitLab 评论'))
+
+        report_json = json.dumps(report_data, ensure_ascii=False, cls=DjangoJSONEncoder)
+        mr_info_json = json.dumps(mr_info, ensure_ascii=False, cls=DjangoJSONEncoder)
+        entries = NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(
+                review=review,
+                project_id=project_id,
+                channel_type=channel_type,
+                channel_id=channel_id,
+                channel_name=channel_name,
+                report_data=report_json,
+                mr_info=mr_info_json,
+                max_attempts=getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 6),
+                request_id=self.request_id,
+            )
+            for channel_type, channel_id, channel_name in targets
+        ])
+
+        logger.info(f"[{self.request_id}] 通知已写入发件箱 - 审查:{review.id}, 渠道数:{len(entries)}")
+        return entries
+
+    def send_targets(self, targets):
+        """
+        并发发送一组通知（发件箱投递使用）
+
+        Args:
+            targets: [(渠道类型, 渠道配置, 报告, MR 信息), ...]，GitLab 评论的渠道配置为 None
+
+        Returns:
+            list: 各渠道结果，顺序与 targets 一致
+        """
+        return self._dispatch_parallel(targets, time.time())
+
+    def _dispatch_parallel(self, targets, dispatch_start: float):
+        """
+        并发发送到所有目标渠道
+
+        Returns:
+            list: 各渠道结果，顺序与 targets 一致
+        """
+        dispatch_deadline = dispatch_start + getattr(settings, 'NOTIFICATION_DISPATCH_TIMEOUT', 30)
+        executor = ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix='notify')
+        try:
+            futures = {}
+            for index, (channel_type, channel, report_data, mr_info) in enumerate(targets):
+                timeout = self._channel_timeout(channel)
+                future = executor.submit(self._send_target, channel_type, channel, report_data, mr_info, timeout)
+                futures[future] = (index, channel_type, channel, timeout, min(time.time() + timeout, dispatch_deadline))
+
+            results = [None] * len(targets)
+            pending = set(futures)
+            while pending:
+                next_deadline = min(futures[future][4] for future in pending)
+                done, pending = wait(pending, timeout=max(next_deadline - time.time(), 0), return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, channel_type, channel, _, _ = futures[future]
+                    results[index] = self._build_result(channel_type, channel, future.result())
+
+                # 超过时限的渠道不再等待，后台线程在 HTTP 超时后自行结束
+                now = time.time()
+                for future in [f for f in pending if futures[f][4] <= now]:
+                    pending.discard(future)
+                    future.cancel()
+                    index, channel_type, channel, timeout, deadline = futures[future]
+                    limit = '整体分发' if deadline >= dispatch_deadline else '渠道'
+                    results[index] = self._build_result(channel_type, channel, {
+                        'success': False,
+                        'message': f'发送超时（超过{limit}时限）',
+                        'response_time': now - dispatch_start,
+                        'details': {'channel_timeout': timeout},
+                    }, timed_out=True)
+            return results
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _send_target(self, channel_type: str, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """在线程池中发送单个渠道，返回结果并记录实际耗时"""
+        start_time = time.time()
+        try:
+            if channel is None:
+                result = self._send_to_gitlab(None, report_data, mr_info, start_time, timeout)
+            else:
+                logger.info(f"[{self.request_id}] 开始发送到渠道: {channel_type} ({channel.name})")
+                result = self._send_to_channel(channel_type, channel, report_data, mr_info, timeout=timeout)
+        except Exception as e:
+            logger.error(f"[{self.request_id}] 渠道 {channel_type} 发送异常: {e}", exc_info=True)
+            result = {
+                'success': False,
+                'message': f"渠道 {channel_type} 发送异常: {str(e)}",
+                'details': {'error': str(e)},
+            }
+        finally:
+            # 线程池线程的数据库连接不会被请求周期回收
+            connection.close()
+        result = result or {}
+        result['response_time'] = time.time() - start_time
+        return result
+
+    @staticmethod
+    def _build_result(channel_type: str, channel, result: Dict[str, Any], timed_out: bool = False) -> Dict[str, Any]:
+        entry = {
+            'channel': channel_type,
+            'success': result.get('success', False),
+            'message': result.get('message', ''),
+            'response_time': result.get('response_time', 0),
+            'details': result.get('details', {}),
+            'timed_out': timed_out,
+        }
+        if channel is None:
+            entry['channel_name'] = 'GitLab 评论'
+        else:
+            entry['channel_id'] = channel.id
+            entry['channel_name'] = channel.name
+        return entry
+
     def _get_notification_targets(self, project_id: int | None):
         """获取项目可用的通知渠道以及GitLab通知配置"""
         try:
@@ -189,25 +289,29 @@ class NotificationDispatcher:
             logger.error(f"[{self.request_id}] 获取通知渠道失败: {e}", exc_info=True)
             return [], False
 
-    def _send_to_channel(self, channel_type: str, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any]) -> Dict[str, Any]:
+    def _send_to_channel(self, channel_type: str, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         发送通知到指定渠道
+
+        Args:
+            timeout: HTTP/SMTP 请求超时（秒），默认 NOTIFICATION_CHANNEL_TIMEOUT
         """
         start_time = time.time()
+        timeout = timeout or self._channel_timeout(channel)
 
         try:
             if channel_type == 'dingtalk':
-                return self._send_to_dingtalk(channel, report_data, mr_info, start_time)
+                return self._send_to_dingtalk(channel, report_data, mr_info, start_time, timeout)
             elif channel_type == 'gitlab':
-                return self._send_to_gitlab(channel, report_data, mr_info, start_time)
+                return self._send_to_gitlab(channel, report_data, mr_info, start_time, timeout)
             elif channel_type == 'slack':
-                return self._send_to_slack(channel, report_data, mr_info, start_time)
+                return self._send_to_slack(channel, report_data, mr_info, start_time, timeout)
             elif channel_type == 'feishu':
-                return self._send_to_feishu(channel, report_data, mr_info, start_time)
+                return self._send_to_feishu(channel, report_data, mr_info, start_time, timeout)
             elif channel_type == 'wechat':
-                return self._send_to_wechat(channel, report_data, mr_info, start_time)
+                return self._send_to_wechat(channel, report_data, mr_info, start_time, timeout)
             elif channel_type == 'email':
-                return self._send_to_email(channel, report_data, mr_info, start_time)
+                return self._send_to_email(channel, report_data, mr_info, start_time, timeout)
             else:
                 return {
                     'success': False,
@@ -224,7 +328,7 @@ class NotificationDispatcher:
                 'details': {'error': str(e)}
             }
 
-    def _send_to_dingtalk(self, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    def _send_to_dingtalk(self, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float, timeout: float = 30) -> Dict[str, Any]:
         """
         发送到钉钉
         """
@@ -267,7 +371,7 @@ class NotificationDispatcher:
 ---
 """
 
-            service = DingTalkService(webhook_url=webhook_url, secret=secret)
+            service = DingTalkService(webhook_url=webhook_url, secret=secret, timeout=timeout)
             result = service.send_markdown(f"AI代码审查报告 - {mr_title}", message)
 
             elapsed_time = time.time() - start_time
@@ -284,9 +388,9 @@ class NotificationDispatcher:
                 'response_time': elapsed_time
             }
 
-    def _send_to_gitlab(self, config, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    def _send_to_gitlab(self, config, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float, timeout: Optional[float] = None) -> Dict[str, Any]:
         """
-        发送到GitLab（MR评论）
+        发送到GitLab（MR评论），API 请求超时不超过渠道发送时限
         """
         try:
             from apps.review.services import GitlabService
@@ -308,7 +412,7 @@ class NotificationDispatcher:
             logger.info(f"[{self.request_id}] 开始发送GitLab MR评论 - project_id:{project_id}, mr_iid:{mr_iid}, content_length:{len(content)}")
 
             service = GitlabService(request_id=self.request_id)
-            result = service.post_merge_request_comment(project_id, mr_iid, content)
+            result = service.post_merge_request_comment(project_id, mr_iid, content, timeout=timeout or self._channel_timeout(config))
 
             elapsed_time = time.time() - start_time
 
@@ -348,13 +452,11 @@ class NotificationDispatcher:
                 'details': {'error': str(e), 'project_id': mr_info.get('project_id'), 'mr_iid': mr_info.get('mr_iid')}
             }
 
-    def _send_to_slack(self, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    def _send_to_slack(self, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float, timeout: float = 30) -> Dict[str, Any]:
         """
         发送到Slack
         """
         try:
-            import requests
-
             config_dict = channel.config_dict
             webhook_url = config_dict.get('webhook_url') or config_dict.get('webhook')
 
@@ -414,7 +516,7 @@ class NotificationDispatcher:
                 ]
             }
 
-            response = requests.post(webhook_url, json=payload, timeout=30)
+            response = get_http_session().post(webhook_url, json=payload, timeout=timeout)
             elapsed_time = time.time() - start_time
 
             if response.status_code == 200:
@@ -443,13 +545,11 @@ class NotificationDispatcher:
                 'response_time': elapsed_time
             }
 
-    def _send_to_feishu(self, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    def _send_to_feishu(self, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float, timeout: float = 30) -> Dict[str, Any]:
         """
         发送到飞书（使用简单文本格式，不使用签名）
         """
         try:
-            import requests
-
             config_dict = channel.config_dict
             webhook_url = config_dict.get('webhook_url') or config_dict.get('webhook')
 
@@ -480,7 +580,7 @@ class NotificationDispatcher:
             }
 
             logger.debug(f"[{self.request_id}] 飞书请求payload: {payload}")
-            response = requests.post(webhook_url, json=payload, timeout=30)
+            response = get_http_session().post(webhook_url, json=payload, timeout=timeout)
             elapsed_time = time.time() - start_time
 
             logger.info(f"[{self.request_id}] 飞书API响应 - 状态码:{response.status_code}, 响应内容:{response.text}")
@@ -521,13 +621,11 @@ class NotificationDispatcher:
                 'response_time': elapsed_time
             }
 
-    def _send_to_wechat(self, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    def _send_to_wechat(self, channel, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float, timeout: float = 30) -> Dict[str, Any]:
         """
         发送到企业微信
         """
         try:
-            import requests
-
             config_dict = channel.config_dict
             webhook_url = config_dict.get('webhook_url') or config_dict.get('webhook')
 
@@ -563,7 +661,7 @@ MR: {mr_title}
                 }
             }
 
-            response = requests.post(webhook_url, json=payload, timeout=30)
+            response = get_http_session().post(webhook_url, json=payload, timeout=timeout)
             elapsed_time = time.time() - start_time
 
             result = response.json()
@@ -593,12 +691,12 @@ MR: {mr_title}
                 'response_time': elapsed_time
             }
 
-    def _send_to_email(self, config, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    def _send_to_email(self, config, report_data: Dict[str, Any], mr_info: Dict[str, Any], start_time: float, timeout: float = 30) -> Dict[str, Any]:
         """
         发送邮件
         """
         try:
-            from django.core.mail import send_mail
+            from django.core.mail import get_connection, send_mail
             from django.conf import settings
 
             config_dict = config.config_dict
@@ -641,7 +739,8 @@ MR: {mr_title}
                 from_email=getattr(settings, 'EMAIL_FROM', 'noreply@example.com'),
                 recipient_list=recipient_list,
                 html_message=html_content,
-                fail_silently=False
+                fail_silently=False,
+                connection=get_connection(timeout=timeout)
             )
 
             elapsed_time = time.time() - start_time
@@ -0,0 +1,314 @@
+"""
+Notification Outbox
+后台投递发件箱中的通知：认领到期记录并加租约，并发发送后按结果标记为已发送、
+指数退避后重试或转入死信；每个渠道按令牌桶限流（见 rate_limit），令牌不足时积压的通知合并为摘要
+
+投递语义为至少一次：发送超时的请求可能已送达，重试时渠道可能收到重复消息
+"""
+import json
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import NotificationOutbox
+from .notification_dispatcher import NotificationDispatcher
+from .rate_limit import ChannelRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationOutboxSender:
+    """
+    发件箱发送器，由 review worker 进程池周期执行（也可通过 send_notifications 命令执行）
+    """
+
+    def __init__(self, request_id=None, batch_size=None):
+        self.request_id = request_id
+        self.batch_size = batch_size or getattr(settings, 'NOTIFICATION_OUTBOX_BATCH_SIZE', 20)
+        self.dispatcher = NotificationDispatcher(request_id=request_id)
+        self.rate_limiter = ChannelRateLimiter(request_id=request_id)
+
+    def drain(self, max_batches=10):
+        """
+        投递到期的通知，直到没有可发送的记录
+
+        Returns:
+            dict: {'sent': 数量, 'retried': 数量, 'dead': 数量}
+        """
+        totals = {'sent': 0, 'retried': 0, 'dead': 0}
+        for _ in range(max_batches):
+            batches = self.claim(self.batch_size)
+            if not batches:
+                break
+            for key, count in self.deliver(batches).items():
+                totals[key] += count
+
+        if any(totals.values()):
+            logger.info(
+                f"[{self.request_id}] 发件箱投递完成 - 成功:{totals['sent']}, 待重试:{totals['retried']}, 死信:{totals['dead']}"
+            )
+        return totals
+
+    def requeue_dead(self, review_id=None):
+        """
+        将死信重新放回队列（渠道恢复后手动重发）
+
+        Returns:
+            int: 重新入队的数量
+        """
+        dead = NotificationOutbox.objects.filter(status='dead')
+        if review_id is not None:
+            dead = dead.filter(review_id=review_id)
+        review_ids = set(dead.values_list('review_id', flat=True))
+        requeued = dead.update(status='pending', attempts=0, available_at=timezone.now(), locked_until=None)
+        self._refresh_reviews(review_ids)
+        if requeued:
+            logger.info(f"[{self.request_id}] {requeued} 条死信通知已重新入队")
+        return requeued
+
+    def claim(self, limit):
+        """
+        认领到期的通知：待发送且到达 available_at，或租约已过期（发送进程中断）
+
+        每个渠道按令牌桶取得发送额度：额度足够时逐条发送；不足时前面的通知逐条发送，
+        其余合并为一条摘要消息（消耗一个令牌）；没有令牌时留在队列中等待补充，不计入尝试次数
+
+        Returns:
+            list: 发送批次，每个批次为一组通知，多于一条时合并为摘要发送
+        """
+        from apps.llm.models import NotificationChannel
+
+        now = timezone.now()
+        candidates = list(
+            NotificationOutbox.objects.filter(
+                Q(status='pending', available_at__lte=now) |
+                Q(status='sending', locked_until__lt=now)
+            ).order_by('available_at', 'id')[:limit * 5]
+        )
+
+        groups = defaultdict(list)
+        for entry in candidates:
+            groups[entry.channel_id].append(entry)
+        channels = NotificationChannel.objects.in_bulk([channel_id for channel_id in groups if channel_id])
+
+        batches = []
+        for channel_id, group in groups.items():
+            if len(batches) >= limit:
+                break
+            channel = channels.get(channel_id)
+            if channel_id is None or channel is None:
+                # GitLab 评论逐条发送；渠道已删除的通知在投递时转入死信
+                batches.extend([entry] for entry in group)
+                continue
+
+            granted = self.rate_limiter.acquire(channel, len(group))
+            if granted >= len(group):
+                batches.extend([entry] for entry in group)
+            elif granted > 0:
+                batches.extend([entry] for entry in group[:granted - 1])
+                batches.append(group[granted - 1:])
+                logger.info(
+                    f"[{self.request_id}] 渠道 {channel.name} 令牌不足，{len(group) - granted + 1} 条通知合并为摘要发送"
+                )
+
+        claimed = []
+        for batch in batches:
+            batch = [entry for entry in batch if self._lease(entry, now)]
+            if batch:
+                claimed.append(batch)
+        return claimed
+
+    def _lease(self, entry, now):
+        """以认领前的状态为条件更新，多个发送器并发时只有一个成功"""
+        lease = getattr(settings, 'NOTIFICATION_DISPATCH_TIMEOUT', 30) + 30
+        updated = NotificationOutbox.objects.filter(
+            pk=entry.pk, status=entry.status, locked_until=entry.locked_until
+        ).update(
+            status='sending',
+            locked_until=now + timedelta(seconds=lease),
+            attempts=F('attempts') + 1,
+        )
+        if updated:
+            entry.status = 'sending'
+            entry.attempts += 1
+        return bool(updated)
+
+    def deliver(self, batches):
+        """并发发送已认领的通知批次并记录结果"""
+        from apps.llm.models import NotificationChannel
+
+        channels = NotificationChannel.objects.in_bulk(
+            [batch[0].channel_id for batch in batches if batch[0].channel_id]
+        )
+
+        counts = {'sent': 0, 'retried': 0, 'dead': 0}
+        targets = []
+        sendable = []
+        for batch in batches:
+            head = batch[0]
+            channel = channels.get(head.channel_id) if head.channel_id else None
+            if head.channel_type != 'gitlab' and (channel is None or not channel.is_active):
+                # 渠道已删除或停用，重试无意义
+                for entry in batch:
+                    self._mark_dead(entry, {'success': False, 'message': '通知渠道已删除或停用'})
+                counts['dead'] += len(batch)
+                continue
+            if len(batch) == 1:
+                targets.append((head.channel_type, channel, head.report_data_dict, head.mr_info_dict))
+            else:
+                targets.append((head.channel_type, channel, *build_digest(batch)))
+            sendable.append(batch)
+
+        if targets:
+            results = self.dispatcher.send_targets(targets)
+            for batch, result in zip(sendable, results):
+                if len(batch) > 1:
+                    result['details'] = {**(result.get('details') or {}), 'digest_size': len(batch)}
+                for entry in batch:
+                    counts[self._record(entry, result)] += 1
+
+        self._refresh_reviews({entry.review_id for batch in batches for entry in batch})
+        return counts
+
+    def _retry_delay(self, attempts):
+        """指数退避：NOTIFICATION_RETRY_BASE_DELAY * 2^(n-1)，最长 NOTIFICATION_RETRY_MAX_DELAY"""
+        base = getattr(settings, 'NOTIFICATION_RETRY_BASE_DELAY', 30)
+        return min(base * (2 ** max(attempts - 1, 0)), getattr(settings, 'NOTIFICATION_RETRY_MAX_DELAY', 3600))
+
+    def _record(self, entry, result):
+        now = timezone.now()
+        base = NotificationOutbox.objects.filter(pk=entry.pk, status='sending')
+        if result.get('success'):
+            base.update(status='sent', sent_at=now, locked_until=None, last_error=None,
+                        last_result=self._result_json(entry, result))
+            return 'sent'
+
+        if entry.attempts >= entry.max_attempts:
+            self._mark_dead(entry, result)
+            return 'dead'
+
+        delay = self._retry_delay(entry.attempts)
+        base.update(
+            status='pending',
+            available_at=now + timedelta(seconds=delay),
+            locked_until=None,
+            last_error=result.get('message', ''),
+            last_result=self._result_json(entry, result),
+        )
+        logger.warning(
+            f"[{self.request_id}] 通知发送失败，{delay}秒后重试 - 渠道:{entry.channel_type} ({entry.channel_name}), "
+            f"第{entry.attempts}/{entry.max_attempts}次, 错误:{result.get('message', '')}"
+        )
+        return 'retried'
+
+    def _mark_dead(self, entry, result):
+        NotificationOutbox.objects.filter(pk=entry.pk, status='sending').update(
+            status='dead',
+            locked_until=None,
+            last_error=result.get('message', ''),
+            last_result=self._result_json(entry, result),
+        )
+        logger.error(
+            f"[{self.request_id}] 通知转入死信 - 审查:{entry.review_id}, 渠道:{entry.channel_type} ({entry.channel_name}), "
+            f"尝试次数:{entry.attempts}, 错误:{result.get('message', '')}"
+        )
+
+    @staticmethod
+    def _result_json(entry, result):
+        return json.dumps({
+            'channel': entry.channel_type,
+            'channel_id': entry.channel_id,
+            'channel_name': entry.channel_name,
+            'success': result.get('success', False),
+            'message': result.get('message', ''),
+            'response_time': result.get('response_time', 0),
+            'timed_out': result.get('timed_out', False),
+            'details': result.get('details', {}),
+        }, ensure_ascii=False, default=str)
+
+    def _refresh_reviews(self, review_ids):
+        """按发件箱记录更新审查的 notification_sent / notification_result"""
+        from apps.webhook.models import MergeRequestReview
+
+        for review_id in review_ids:
+            summary = summarize_review_notifications(review_id)
+            MergeRequestReview.objects.filter(pk=review_id).update(
+                notification_sent=summary['success'],
+                notification_result=json.dumps(summary, ensure_ascii=False),
+            )
+
+
+def summarize_review_notifications(review_id):
+    """
+    汇总审查的通知投递状态（notification_result 的格式）
+
+    Returns:
+        dict: success / total_channels / success_channels / failed_channels / pending_channels / results
+    """
+    entries = list(NotificationOutbox.objects.filter(review_id=review_id).order_by('id'))
+    by_status = defaultdict(int)
+    results = []
+    failed = []
+    for entry in entries:
+        by_status[entry.status] += 1
+        result = entry.last_result_dict or {
+            'channel': entry.channel_type,
+            'channel_id': entry.channel_id,
+            'channel_name': entry.channel_name,
+            'success': False,
+            'message': '',
+        }
+        result.update({'status': entry.status, 'attempts': entry.attempts})
+        if entry.status == 'pending' and entry.attempts:
+            result['next_attempt_at'] = entry.available_at.isoformat()
+        results.append(result)
+        if entry.status == 'dead':
+            failed.append(f"{entry.channel_type}:{entry.channel_id}" if entry.channel_id else entry.channel_type)
+
+    return {
+        'success': by_status['sent'] > 0,  # 只要有一个成功就算整体成功
+        'total_channels': len(entries),
+        'success_channels': by_status['sent'],
+        'failed_channels': by_status['dead'],
+        'failed_channel_list': failed,
+        'pending_channels': by_status['pending'] + by_status['sending'],
+        'results': results,
+        'dispatch_time': timezone.now().isoformat(),
+    }
+
+
+def build_digest(entries):
+    """
+    将同一渠道积压的多条通知合并为一条摘要（如 "5 个 MR 在项目 X 中完成审查"）
+
+    Returns:
+        (report_data, mr_info)，格式与单条通知相同，各渠道发送方法直接使用
+    """
+    project_names = []
+    lines = []
+    for entry in entries:
+        info = entry.mr_info_dict
+        score = (entry.report_data_dict.get('metadata') or {}).get('score')
+        project_name = info.get('project_name', '未知项目')
+        if project_name not in project_names:
+            project_names.append(project_name)
+
+        line = f"- {project_name} !{info.get('mr_iid', '?')} {info.get('title', '')}"
+        if score is not None:
+            line += f"（评分: {score}）"
+        if info.get('url'):
+            line += f" {info['url']}"
+        lines.append(line)
+
+    project_label = project_names[0] if len(project_names) == 1 else f"{len(project_names)} 个项目"
+    content = (
+        f"{len(entries)} 个 MR 在 {project_label} 中完成审查（渠道发送频率受限，已合并为摘要，完整报告请在系统中查看）\n\n"
+        + '\n'.join(lines)
+    )
+    report_data = {'content': content, 'metadata': {'digest': True, 'digest_size': len(entries)}}
+    mr_info = {'project_name': project_label, 'title': f"{len(entries)} 个 MR 审查完成"}
+    return report_data, mr_info
@@ -0,0 +1,85 @@
+"""
+通知渠道令牌桶限流
+
+钉钉、飞书、企业微信机器人按分钟限制消息数（钉钉 20 条/分钟），每个 NotificationChannel 一个令牌桶：
+容量为 NOTIFICATION_CHANNEL_BURST，按 NOTIFICATION_CHANNEL_RATE_LIMIT（条/分钟）补充；
+渠道配置中的 rate_limit / rate_burst 优先。桶状态保存在数据库，多个发送进程共享
+"""
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import NotificationChannelBucket
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelRateLimiter:
+    """
+    按渠道获取发送令牌
+    """
+
+    # 并发更新冲突时的重试次数
+    MAX_CONFLICT_RETRIES = 5
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+
+    @staticmethod
+    def get_limits(channel):
+        """
+        渠道的补充速率（条/分钟）与桶容量，速率为 0 表示不限流
+
+        Returns:
+            (rate_per_minute, capacity)
+        """
+        config = channel.config_dict
+        try:
+            rate = float(config.get('rate_limit', getattr(settings, 'NOTIFICATION_CHANNEL_RATE_LIMIT', 15)))
+            capacity = float(config.get('rate_burst', getattr(settings, 'NOTIFICATION_CHANNEL_BURST', 5)))
+        except (TypeError, ValueError):
+            rate = getattr(settings, 'NOTIFICATION_CHANNEL_RATE_LIMIT', 15)
+            capacity = getattr(settings, 'NOTIFICATION_CHANNEL_BURST', 5)
+        return rate, max(capacity, 1)
+
+    def acquire(self, channel, count=1):
+        """
+        从渠道的令牌桶中取出最多 count 个令牌
+
+        Returns:
+            int: 取得的令牌数（0 ~ count），渠道不限流时返回 count
+        """
+        rate, capacity = self.get_limits(channel)
+        if rate <= 0:
+            return count
+
+        for _ in range(self.MAX_CONFLICT_RETRIES):
+            bucket = self._get_bucket(channel.id, capacity)
+            now = timezone.now()
+            elapsed = max((now - bucket.refilled_at).total_seconds(), 0)
+            tokens = min(capacity, bucket.tokens + elapsed * rate / 60)
+            granted = min(count, int(tokens))
+
+            # 以读取时的补充时间为条件更新，并发修改时重新读取
+            if NotificationChannelBucket.objects.filter(pk=bucket.pk, refilled_at=bucket.refilled_at).update(
+                tokens=tokens - granted,
+                refilled_at=now
+            ):
+                return granted
+
+        logger.warning(f"[{self.request_id}] 渠道 {channel.id} 令牌桶更新冲突，本轮不发送")
+        return 0
+
+    @staticmethod
+    def _get_bucket(channel_id, capacity):
+        bucket = NotificationChannelBucket.objects.filter(channel_id=channel_id).first()
+        if bucket is not None:
+            return bucket
+        try:
+            # 保存点：并发创建失败时不影响外层事务
+            with transaction.atomic():
+                return NotificationChannelBucket.objects.create(channel_id=channel_id, tokens=capacity)
+        except IntegrityError:
+            return NotificationChannelBucket.objects.get(channel_id=channel_id)
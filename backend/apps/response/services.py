@@ -7,18 +7,33 @@ import hmac
 import hashlib
 import base64
 import urllib.parse
-import requests
+
+from django.conf import settings
+
+from apps.common.http_utils import get_http_session
 
 logger = logging.getLogger(__name__)
 
 
+def get_channel_timeout(channel=None):
+    """通知渠道发送时限（秒）：渠道配置的 timeout 优先，否则使用 NOTIFICATION_CHANNEL_TIMEOUT"""
+    default = getattr(settings, 'NOTIFICATION_CHANNEL_TIMEOUT', 15)
+    if channel is None:
+        return default
+    try:
+        return float(channel.config_dict.get('timeout') or default)
+    except (TypeError, ValueError):
+        return default
+
+
 class DingTalkService:
     """
     Service for sending DingTalk notifications
     """
 
-    def __init__(self, webhook_url=None, secret=None, request_id=None):
+    def __init__(self, webhook_url=None, secret=None, request_id=None, timeout=None):
         self.request_id = request_id
+        self.timeout = timeout or get_channel_timeout()
         # 优先使用传入的参数，否则从数据库或环境变量加载
         if webhook_url and secret:
             self.webhook_url = webhook_url
@@ -91,7 +106,7 @@ class DingTalkService:
             logger.debug(f"[{self.request_id}] 钉钉消息内容: {payload}")
 
             # Send request
-            response = requests.post(url, json=payload, timeout=30)
+            response = get_http_session().post(url, json=payload, timeout=self.timeout)
             elapsed_time = time.time() - start_time
 
             # 记录详细的响应信息
@@ -152,8 +167,9 @@ class SlackService:
     Service for sending Slack notifications
     """
 
-    def __init__(self, webhook_url=None, request_id=None):
+    def __init__(self, webhook_url=None, request_id=None, timeout=None):
         self.request_id = request_id
+        self.timeout = timeout or get_channel_timeout()
         # 优先使用传入的参数，否则从数据库或环境变量加载
         if webhook_url:
             self.webhook_url = webhook_url
@@ -200,7 +216,7 @@ class SlackService:
             if blocks:
                 payload["blocks"] = blocks
 
-            response = requests.post(self.webhook_url, json=payload, timeout=30)
+            response = get_http_session().post(self.webhook_url, json=payload, timeout=self.timeout)
             elapsed_time = time.time() - start_time
 
             if response.status_code == 200:
@@ -234,8 +250,9 @@ class FeishuService:
     Service for sending Feishu notifications
     """
 
-    def __init__(self, webhook_url=None, secret=None, request_id=None):
+    def __init__(self, webhook_url=None, secret=None, request_id=None, timeout=None):
         self.request_id = request_id
+        self.timeout = timeout or get_channel_timeout()
         # 优先使用传入的参数，否则从数据库或环境变量加载
         if webhook_url and secret:
             self.webhook_url = webhook_url
@@ -296,7 +313,7 @@ class FeishuService:
             }
 
             logger.debug(f"[{self.request_id}] 飞书请求payload: {payload}")
-            response = requests.post(self.webhook_url, json=payload, timeout=30)
+            response = get_http_session().post(self.webhook_url, json=payload, timeout=self.timeout)
             elapsed_time = time.time() - start_time
 
             logger.info(f"[{self.request_id}] 飞书API响应 - 状态码:{response.status_code}, 响应内容:{response.text}")
@@ -350,8 +367,9 @@ class WechatWorkService:
     Service for sending WeChat Work notifications
     """
 
-    def __init__(self, webhook_url=None, request_id=None):
+    def __init__(self, webhook_url=None, request_id=None, timeout=None):
         self.request_id = request_id
+        self.timeout = timeout or get_channel_timeout()
         # 优先使用传入的参数，否则从数据库或环境变量加载
         if webhook_url:
             self.webhook_url = webhook_url
@@ -401,7 +419,7 @@ class WechatWorkService:
                 }
             }
 
-            response = requests.post(self.webhook_url, json=payload, timeout=30)
+            response = get_http_session().post(self.webhook_url, json=payload, timeout=self.timeout)
             elapsed_time = time.time() - start_time
 
             result = response.json()
@@ -5,11 +5,17 @@ Handles Claude CLI command execution and output parsing
 import os
 import json
 import logging
+import signal
 import subprocess
+import threading
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# 正在执行的 Claude CLI 进程，按 request_id 索引，供取消审查时终止
+_active_processes = {}
+_active_processes_lock = threading.Lock()
+
 
 class ClaudeCliService:
     """
@@ -40,15 +46,14 @@ class ClaudeCliService:
         从数据库加载 Claude CLI 配置
 
         关键特性：
-        1. 每次初始化都重新查询数据库 → 实时获取最新配置
+        1. 读取进程内配置缓存，配置变更后通过版本戳失效 → 及时获取最新配置
         2. 配置保存在实例变量中 → 不污染全局环境
         3. 配置优先级：数据库 > 环境变量 > 默认值
         """
         try:
-            from apps.llm.models import ClaudeCliConfig
+            from apps.llm.config_cache import get_active_claude_cli_config
 
-            # 每次都从数据库查询最新配置
-            cli_config = ClaudeCliConfig.objects.filter(is_active=True).first()
+            cli_config = get_active_claude_cli_config()
 
             if cli_config:
                 # 保存到实例变量
@@ -195,29 +200,40 @@ class ClaudeCliService:
                 env['ANTHROPIC_AUTH_TOKEN'] = self.anthropic_auth_token
                 logger.info(f"[{self.request_id}] 设置 ANTHROPIC_AUTH_TOKEN: ***已配置***")
 
-            # 执行命令时传递自定义环境变量
-            result = subprocess.run(
+            # 执行命令时传递自定义环境变量，独立进程组便于取消时连同子进程一起终止
+            process = subprocess.Popen(
                 command,
                 cwd=cwd,
                 env=env,  # 🔑 使用独立的环境变量副本
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
-                timeout=self.timeout,
-                check=False
+                start_new_session=True
             )
+            self._register_process(process)
+
+            try:
+                stdout, stderr = process.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                self._terminate_process(process)
+                process.communicate()
+                error_msg = f"Claude CLI timeout after {self.timeout}s"
+                logger.error(f"[{self.request_id}] {error_msg}")
+                return False, "", error_msg
+            finally:
+                self._unregister_process(process)
 
-            if result.returncode == 0:
+            if process.returncode == 0:
                 logger.info(f"[{self.request_id}] Claude CLI command succeeded")
-                return True, result.stdout, result.stderr
+                return True, stdout, stderr
+            elif process.returncode < 0:
+                error_msg = f"Claude CLI terminated by signal {-process.returncode}"
+                logger.warning(f"[{self.request_id}] {error_msg}")
+                return False, stdout, error_msg
             else:
-                logger.error(f"[{self.request_id}] Claude CLI command failed with code {result.returncode}")
-                logger.error(f"[{self.request_id}] Stderr: {result.stderr}")
-                return False, result.stdout, result.stderr
-
-        except subprocess.TimeoutExpired:
-            error_msg = f"Claude CLI timeout after {self.timeout}s"
-            logger.error(f"[{self.request_id}] {error_msg}")
-            return False, "", error_msg
+                logger.error(f"[{self.request_id}] Claude CLI command failed with code {process.returncode}")
+                logger.error(f"[{self.request_id}] Stderr: {stderr}")
+                return False, stdout, stderr
 
         except FileNotFoundError:
             error_msg = f"Claude CLI not found at: {self.cli_path}"
@@ -229,6 +245,49 @@ class ClaudeCliService:
             logger.error(f"[{self.request_id}] {error_msg}", exc_info=True)
             return False, "", error_msg
 
+    def _register_process(self, process):
+        if self.request_id:
+            with _active_processes_lock:
+                _active_processes[self.request_id] = process
+
+    def _unregister_process(self, process):
+        if self.request_id:
+            with _active_processes_lock:
+                if _active_processes.get(self.request_id) is process:
+                    del _active_processes[self.request_id]
+
+    @staticmethod
+    def _terminate_process(process, grace_seconds=5):
+        """终止 CLI 进程组：先 SIGTERM，超时后 SIGKILL"""
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=grace_seconds)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    @classmethod
+    def cancel(cls, request_id):
+        """
+        终止指定请求正在执行的 Claude CLI 进程
+
+        Args:
+            request_id: 审查请求ID
+
+        Returns:
+            bool: 存在正在执行的进程并已发送终止信号时返回 True
+        """
+        with _active_processes_lock:
+            process = _active_processes.get(request_id)
+
+        if process is None or process.poll() is not None:
+            return False
+
+        logger.info(f"[{request_id}] 终止 Claude CLI 进程 PID:{process.pid}")
+        cls._terminate_process(process)
+        return True
+
     def _parse_json_output(self, output):
         """
         解析 Claude CLI 的 JSON 输出
@@ -0,0 +1,415 @@
+"""
+Review Job Queue
+持久化的审查任务队列：数据库是唯一的事实来源，Redis（可选）只用于唤醒空闲 worker
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.common.redis_utils import get_redis_client
+from .models import ReviewJob
+from .scheduler import FairReviewScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseJobBackend:
+    """
+    纯数据库后端：空闲 worker 按固定间隔轮询
+    """
+
+    name = 'database'
+
+    def notify(self, job_id):
+        """数据库后端无需主动唤醒"""
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+
+class RedisJobBackend:
+    """
+    Redis 唤醒后端：入队时推送信号，空闲 worker 阻塞等待
+    信号丢失不影响正确性，worker 超时后仍会回到数据库轮询
+    """
+
+    name = 'redis'
+    SIGNAL_KEY = 'code_review:review_jobs:signal'
+    MAX_PENDING_SIGNALS = 1000
+
+    def __init__(self, client):
+        self.client = client
+
+    def notify(self, job_id):
+        try:
+            pipe = self.client.pipeline()
+            pipe.lpush(self.SIGNAL_KEY, job_id)
+            pipe.ltrim(self.SIGNAL_KEY, 0, self.MAX_PENDING_SIGNALS - 1)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis 唤醒信号发送失败: {e}")
+
+    def wait(self, timeout):
+        try:
+            self.client.brpop(self.SIGNAL_KEY, timeout=max(int(timeout), 1))
+        except Exception as e:
+            logger.warning(f"Redis 等待信号失败，回退到轮询: {e}")
+            time.sleep(timeout)
+
+
+def get_job_backend():
+    """根据配置选择队列后端，Redis 不可用时回退到数据库"""
+    if getattr(settings, 'REVIEW_QUEUE_BACKEND', 'database') == 'redis':
+        client = get_redis_client()
+        if client is not None:
+            return RedisJobBackend(client)
+        logger.warning("REVIEW_QUEUE_BACKEND=redis 但 Redis 不可用，使用数据库后端")
+    return DatabaseJobBackend()
+
+
+class ReviewJobQueue:
+    """
+    审查任务队列，负责入队、认领、续约、完成与崩溃恢复
+    """
+
+    # 认领时每次检查的候选任务数量
+    CLAIM_BATCH_SIZE = 10
+
+    def __init__(self, request_id=None, backend=None, scheduler=None):
+        self.request_id = request_id
+        self.backend = backend or get_job_backend()
+        self.visibility_timeout = getattr(settings, 'REVIEW_JOB_VISIBILITY_TIMEOUT', 600)
+        self.max_attempts = getattr(settings, 'REVIEW_JOB_MAX_ATTEMPTS', 3)
+        self.scheduler = scheduler or FairReviewScheduler()
+        self.debounce_seconds = getattr(settings, 'REVIEW_COALESCE_DEBOUNCE_SECONDS', 20)
+
+    def enqueue(self, review, payload, matched_rule=None):
+        """
+        创建审查任务，事务提交后唤醒 worker
+
+        同一 MR 的新任务会取代尚未完成的旧任务：排队中的直接标记为 superseded，
+        执行中且 HEAD 不同的请求取消；新任务延迟防抖时间后才可被认领，连续推送只审查最后一次
+
+        Args:
+            review: MergeRequestReview 实例
+            payload: GitLab webhook payload
+            matched_rule: 匹配的 WebhookEventRule 实例
+
+        Returns:
+            ReviewJob 实例
+        """
+        job = ReviewJob(
+            review=review,
+            project_id=review.project_id,
+            merge_request_iid=review.merge_request_iid,
+            matched_rule_id=matched_rule.id if matched_rule else None,
+            max_attempts=self.max_attempts,
+            available_at=timezone.now() + timedelta(seconds=self.debounce_seconds),
+            request_id=self.request_id,
+        )
+        job.payload_dict = payload
+
+        with transaction.atomic():
+            job.save()
+            self._supersede_previous(job, review.head_sha)
+
+        transaction.on_commit(lambda: self.backend.notify(job.id))
+        logger.info(f"[{self.request_id}] 审查任务已入队 - Job#{job.id}, 项目:{job.project_id}, MR:{job.merge_request_iid}")
+        return job
+
+    def find_active(self, project_id, merge_request_iid, head_sha, payload=None):
+        """
+        查找同一 MR 已覆盖相同 HEAD 的排队中或执行中任务（标题、标签、描述等修改不产生新提交）
+
+        排队中的任务改用最新的 payload，执行中的任务不受影响
+
+        Returns:
+            ReviewJob 实例或 None
+        """
+        if not head_sha:
+            return None
+        job = (
+            ReviewJob.objects.filter(
+                project_id=project_id,
+                merge_request_iid=merge_request_iid,
+                status__in=['queued', 'running'],
+                cancel_requested=False,
+                review__head_sha=head_sha,
+            )
+            .order_by('-id')
+            .first()
+        )
+        if job is not None and payload is not None and job.status == 'queued':
+            job.payload_dict = payload
+            ReviewJob.objects.filter(pk=job.pk, status='queued').update(
+                payload=job.payload,
+                updated_at=timezone.now(),
+            )
+        return job
+
+    def _supersede_previous(self, job, head_sha):
+        """取代同一 MR 尚未完成的旧任务"""
+        now = timezone.now()
+        previous = list(
+            ReviewJob.objects.filter(
+                project_id=job.project_id,
+                merge_request_iid=job.merge_request_iid,
+                status__in=['queued', 'running']
+            ).exclude(pk=job.pk).values('id', 'review_id', 'status', 'review__head_sha')
+        )
+        if not previous:
+            return
+
+        queued_ids = [item['id'] for item in previous if item['status'] == 'queued']
+        running_ids = [
+            item['id'] for item in previous
+            if item['status'] == 'running' and not (head_sha and item['review__head_sha'] == head_sha)
+        ]
+
+        superseded_queued = ReviewJob.objects.filter(pk__in=queued_ids, status='queued').update(
+            status='superseded',
+            finished_at=now,
+            updated_at=now,
+        )
+        cancelled_running = ReviewJob.objects.filter(pk__in=running_ids, status='running').update(
+            cancel_requested=True,
+            updated_at=now,
+        )
+
+        review_ids = [item['review_id'] for item in previous if item['id'] in queued_ids or item['id'] in running_ids]
+        self._mark_review_superseded(review_ids, head_sha)
+
+        logger.info(
+            f"[{self.request_id}] MR {job.project_id}!{job.merge_request_iid} 新提交 {(head_sha or '')[:8]} "
+            f"取代了 {superseded_queued} 个排队任务，请求取消 {cancelled_running} 个执行中任务"
+        )
+
+    def claim(self, worker_id):
+        """
+        按公平调度顺序认领一个可执行的任务（乐观并发：条件更新成功才算认领）
+
+        Args:
+            worker_id: worker 标识
+
+        Returns:
+            ReviewJob 实例或 None
+        """
+        now = timezone.now()
+        candidates = self.scheduler.next_candidates(limit=self.CLAIM_BATCH_SIZE)
+
+        for job_id, project_id, project_limit in candidates:
+            conditions = self.scheduler.capacity_conditions(project_id, project_limit)
+            if self._try_lock(job_id, worker_id, now, conditions):
+                return ReviewJob.objects.get(pk=job_id)
+
+        return None
+
+    def _try_lock(self, job_id, worker_id, now, conditions=()):
+        """
+        条件更新任务状态为 running，返回是否认领成功
+        并发上限检查作为附加条件与更新在同一条语句中执行，避免多个 worker 同时突破上限
+        """
+        updated = ReviewJob.objects.filter(*conditions, pk=job_id, status='queued').update(
+            status='running',
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=self.visibility_timeout),
+            started_at=now,
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+        return updated == 1
+
+    def heartbeat(self, job, worker_id):
+        """
+        续约任务租约
+
+        Returns:
+            bool: 仍持有任务时返回 True
+        """
+        now = timezone.now()
+        updated = ReviewJob.objects.filter(pk=job.pk, status='running', locked_by=worker_id).update(
+            locked_until=now + timedelta(seconds=self.visibility_timeout),
+            updated_at=now,
+        )
+        return updated == 1
+
+    def is_cancel_requested(self, job):
+        """任务是否已被同一 MR 的新任务取代"""
+        return ReviewJob.objects.filter(pk=job.pk, cancel_requested=True).exists()
+
+    def supersede(self, job, worker_id):
+        """被取消的执行中任务结束时标记为 superseded"""
+        now = timezone.now()
+        ReviewJob.objects.filter(pk=job.pk, locked_by=worker_id).update(
+            status='superseded',
+            locked_until=None,
+            finished_at=now,
+            updated_at=now,
+        )
+        self._mark_review_superseded([job.review_id])
+
+    def complete(self, job, worker_id):
+        """标记任务完成"""
+        now = timezone.now()
+        ReviewJob.objects.filter(pk=job.pk, locked_by=worker_id).update(
+            status='completed',
+            locked_until=None,
+            finished_at=now,
+            updated_at=now,
+        )
+
+    def fail(self, job, worker_id, error):
+        """
+        任务执行异常：未超过最大尝试次数时按指数退避重新入队
+        """
+        job.refresh_from_db(fields=['attempts', 'max_attempts'])
+        now = timezone.now()
+
+        if job.attempts < job.max_attempts:
+            delay = self._retry_delay(job.attempts)
+            requeued = ReviewJob.objects.filter(pk=job.pk, locked_by=worker_id).update(
+                status='queued',
+                locked_by=None,
+                locked_until=None,
+                available_at=now + timedelta(seconds=delay),
+                last_error=str(error),
+                updated_at=now,
+            )
+            if requeued:
+                self._reset_review_pending(job.review_id)
+            logger.warning(f"[{job.request_id}] Job#{job.pk} 执行失败，{delay}秒后重试 ({job.attempts}/{job.max_attempts}): {error}")
+        else:
+            ReviewJob.objects.filter(pk=job.pk, locked_by=worker_id).update(
+                status='failed',
+                locked_until=None,
+                finished_at=now,
+                last_error=str(error),
+                updated_at=now,
+            )
+            self._mark_review_failed(job.review_id, f'审查任务多次执行失败: {error}')
+            logger.error(f"[{job.request_id}] Job#{job.pk} 已达最大尝试次数，标记为失败: {error}")
+
+    def recover_expired(self):
+        """
+        崩溃恢复：租约过期的 running 任务重新入队或标记失败
+
+        Returns:
+            int: 处理的任务数量
+        """
+        now = timezone.now()
+        expired = list(
+            ReviewJob.objects.filter(status='running', locked_until__lt=now)
+            .values('id', 'review_id', 'attempts', 'max_attempts', 'locked_by', 'request_id', 'cancel_requested')
+        )
+
+        recovered = 0
+        for item in expired:
+            base_filter = ReviewJob.objects.filter(pk=item['id'], status='running', locked_by=item['locked_by'])
+            if item['cancel_requested']:
+                updated = base_filter.update(
+                    status='superseded',
+                    locked_until=None,
+                    finished_at=now,
+                    updated_at=now,
+                )
+                if updated:
+                    self._mark_review_superseded([item['review_id']])
+            elif item['attempts'] < item['max_attempts']:
+                updated = base_filter.update(
+                    status='queued',
+                    locked_by=None,
+                    locked_until=None,
+                    available_at=now,
+                    last_error=f"Lease expired (worker {item['locked_by']})",
+                    updated_at=now,
+                )
+                if updated:
+                    self._reset_review_pending(item['review_id'])
+                    self.backend.notify(item['id'])
+                    logger.warning(f"[{item['request_id']}] Job#{item['id']} 租约过期，已重新入队")
+            else:
+                updated = base_filter.update(
+                    status='failed',
+                    locked_until=None,
+                    finished_at=now,
+                    last_error=f"Lease expired after {item['attempts']} attempts",
+                    updated_at=now,
+                )
+                if updated:
+                    self._mark_review_failed(item['review_id'], '审查任务执行超时或 worker 异常退出')
+                    logger.error(f"[{item['request_id']}] Job#{item['id']} 租约过期且已达最大尝试次数，标记为失败")
+            recovered += updated
+
+        return recovered
+
+    def count_stalled(self, threshold=None):
+        """
+        检测是否没有运行中的 worker：有任务到期超过 threshold 秒仍在排队，
+        且期间没有任务被认领、也没有持有有效租约的执行中任务
+        已暂停项目（max_concurrent_reviews=0）的任务按设计排队等待，不计入
+
+        Returns:
+            int: 积压的任务数量，worker 正常运行时为 0
+        """
+        if threshold is None:
+            threshold = getattr(settings, 'REVIEW_WORKER_STALL_THRESHOLD', 300)
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=threshold)
+        if ReviewJob.objects.filter(
+            Q(started_at__gte=cutoff) | Q(status='running', locked_until__gte=now)
+        ).exists():
+            return 0
+        overdue = ReviewJob.objects.filter(status='queued', available_at__lt=cutoff)
+        project_ids = set(overdue.values_list('project_id', flat=True).distinct())
+        overrides = self.scheduler._load_project_overrides(project_ids)
+        paused = [
+            project_id for project_id in project_ids
+            if self.scheduler.get_project_limit(project_id, overrides) <= 0
+        ]
+        return overdue.exclude(project_id__in=paused).count()
+
+    def wait_for_job(self, timeout):
+        """空闲时等待新任务"""
+        self.backend.wait(timeout)
+
+    def _retry_delay(self, attempts):
+        """指数退避：30s, 60s, 120s ... 最长 10 分钟"""
+        return min(30 * (2 ** max(attempts - 1, 0)), 600)
+
+    def _mark_review_failed(self, review_id, message):
+        from apps.webhook.models import MergeRequestReview
+        from apps.webhook.stats import update_review_status
+        update_review_status(
+            MergeRequestReview.objects.filter(pk=review_id).exclude(status__in=['completed', 'superseded']),
+            'failed',
+            error_message=message,
+            updated_at=timezone.now(),
+        )
+
+    def _reset_review_pending(self, review_id):
+        """任务重新入队时审查恢复为等待中（审查流程失败时已标记为 failed）"""
+        from apps.webhook.models import MergeRequestReview
+        from apps.webhook.stats import update_review_status
+        update_review_status(
+            MergeRequestReview.objects.filter(pk=review_id, status__in=['processing', 'failed']),
+            'pending',
+            updated_at=timezone.now(),
+        )
+
+    def _mark_review_superseded(self, review_ids, head_sha=None):
+        from apps.webhook.models import MergeRequestReview
+        from apps.webhook.stats import update_review_status
+        if not review_ids:
+            return
+        message = f'已被更新的提交 {head_sha[:8]} 取代' if head_sha else '已被同一 MR 的新审查取代'
+        update_review_status(
+            MergeRequestReview.objects.filter(pk__in=review_ids).exclude(status__in=['completed', 'failed']),
+            'superseded',
+            error_message=message,
+            updated_at=timezone.now(),
+        )
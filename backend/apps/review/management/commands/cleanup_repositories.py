@@ -0,0 +1,47 @@
+"""
+统计本地仓库缓存并按保留天数与 REPOSITORY_MAX_SIZE_GB 淘汰
+
+使用方法:
+    python manage.py cleanup_repositories
+    python manage.py cleanup_repositories --max-size-gb 20 --dry-run
+"""
+from django.core.management.base import BaseCommand
+
+from apps.review.repository_cache import RepositoryCacheManager
+
+
+class Command(BaseCommand):
+    help = '统计本地仓库缓存占用，删除过期项目并按最近使用时间淘汰超出空间预算的项目'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='保留天数（默认使用 REPOSITORY_CACHE_DAYS）',
+        )
+        parser.add_argument(
+            '--max-size-gb',
+            type=float,
+            default=None,
+            help='缓存空间上限 GB（默认使用 REPOSITORY_MAX_SIZE_GB）',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只输出淘汰计划，不删除',
+        )
+
+    def handle(self, *args, **options):
+        manager = RepositoryCacheManager(request_id='cleanup', max_size_gb=options['max_size_gb'])
+        result = manager.run(days=options['days'], dry_run=options['dry_run'])
+
+        action = '将删除' if options['dry_run'] else '已删除'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {len(result['removed'])} 个项目仓库，释放 {result['freed_bytes'] / 1024 / 1024:.2f} MB"
+        ))
+        if result['skipped']:
+            self.stdout.write(self.style.WARNING(f"使用中跳过: {result['skipped']}"))
+        self.stdout.write(
+            f"当前占用 {result['total_bytes'] / 1024 ** 3:.2f} GB / 上限 {result['budget_bytes'] / 1024 ** 3:.2f} GB"
+        )
@@ -0,0 +1,37 @@
+"""
+启动审查任务 worker 进程池
+
+使用方法:
+    python manage.py run_review_workers
+    python manage.py run_review_workers --concurrency 4
+"""
+from django.core.management.base import BaseCommand
+
+from apps.review.workers import ReviewWorkerPool
+
+
+class Command(BaseCommand):
+    help = '启动审查任务 worker 进程池，从持久化队列中认领并执行 MR 审查'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=None,
+            help='worker 进程数量（默认使用 REVIEW_WORKER_CONCURRENCY）',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=None,
+            help='空闲轮询间隔秒数（默认使用 REVIEW_WORKER_POLL_INTERVAL）',
+        )
+
+    def handle(self, *args, **options):
+        pool = ReviewWorkerPool(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'启动 {pool.concurrency} 个审查 worker 进程'))
+        pool.run()
+        self.stdout.write(self.style.SUCCESS('审查 worker 进程池已停止'))
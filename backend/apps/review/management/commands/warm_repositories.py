@@ -0,0 +1,45 @@
+"""
+预热启用审查的项目镜像
+
+使用方法:
+    python manage.py warm_repositories
+    python manage.py warm_repositories --project-id 123 --branch develop
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.review.repository_warmer import RepositoryWarmer
+from apps.webhook.models import Project
+
+
+class Command(BaseCommand):
+    help = '拉取启用审查的项目镜像，使 MR 审查只需增量 fetch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project-id',
+            type=int,
+            default=None,
+            help='只预热指定项目（默认近期被审查使用过的项目与从未预热过的项目）',
+        )
+        parser.add_argument(
+            '--branch',
+            action='append',
+            default=[],
+            help='额外拉取的分支，可重复指定',
+        )
+
+    def handle(self, *args, **options):
+        warmer = RepositoryWarmer(request_id='warm')
+
+        if options['project_id'] is None:
+            warmed, failed = warmer.warm_all()
+            self.stdout.write(self.style.SUCCESS(f'镜像预热完成 - 成功:{warmed}, 失败:{failed}'))
+            return
+
+        project = Project.objects.filter(project_id=options['project_id']).first()
+        if project is None:
+            raise CommandError(f"项目 {options['project_id']} 不存在")
+
+        if not warmer.warm_project(project, options['branch']):
+            raise CommandError(f'项目 {project.project_id} 镜像预热失败')
+        self.stdout.write(self.style.SUCCESS(f'项目 {project.project_id} 镜像预热完成'))
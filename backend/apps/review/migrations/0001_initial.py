@@ -0,0 +1,56 @@
+# Generated by Django 4.1.13 on 2026-10-18 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('webhook', '0008_add_log_level_and_skip_reason'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewJob',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('project_id', models.IntegerField(db_index=True)),
+                ('merge_request_iid', models.IntegerField()),
+                ('matched_rule_id', models.IntegerField(blank=True, null=True)),
+                ('payload', models.TextField(default='{}')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=3)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=100, null=True)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('request_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='webhook.mergerequestreview')),
+            ],
+            options={
+                'db_table': 'review_jobs',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reviewjob',
+            index=models.Index(fields=['status', 'available_at'], name='review_jobs_status_d0cb07_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewjob',
+            index=models.Index(fields=['status', 'locked_until'], name='review_jobs_status_0c0368_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewjob',
+            index=models.Index(fields=['project_id', 'status'], name='review_jobs_project_569337_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.1.13 on 2026-10-18 12:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0002_reviewjob_cancel_requested'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewResultCacheEntry',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('result', models.TextField(default='{}')),
+                ('llm_provider', models.CharField(blank=True, max_length=50, null=True)),
+                ('llm_model', models.CharField(blank=True, max_length=100, null=True)),
+                ('project_id', models.IntegerField(blank=True, null=True)),
+                ('merge_request_iid', models.IntegerField(blank=True, null=True)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'review_result_cache',
+                'ordering': ['-last_used_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewResultCacheStat',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField(unique=True)),
+                ('hits', models.IntegerField(default=0)),
+                ('misses', models.IntegerField(default=0)),
+                ('stores', models.IntegerField(default=0)),
+                ('evictions', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'review_result_cache_stats',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.13 on 2026-10-18 12:50
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0003_review_result_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepositoryCacheEntry',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('project_id', models.IntegerField(unique=True)),
+                ('mirror_size_bytes', models.BigIntegerField(default=0)),
+                ('worktree_size_bytes', models.BigIntegerField(default=0)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_measured_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'repository_cache_entries',
+                'ordering': ['last_used_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.13 on 2026-10-18 12:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0004_repository_cache_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepositoryWarmRequest',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('project_id', models.IntegerField(unique=True)),
+                ('branches', models.TextField(default='[]')),
+                ('requested_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'repository_warm_requests',
+                'ordering': ['requested_at'],
+            },
+        ),
+    ]
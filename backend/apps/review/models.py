@@ -1,4 +1,191 @@
 from django.db import models
+from django.utils import timezone
+import json
 
-# Review models are in webhook app (MergeRequestReview)
-# This file is kept for future review-specific models
+# MergeRequestReview 位于 webhook 应用中，此处存放审查执行相关的模型
+
+
+class ReviewJob(models.Model):
+    """
+    持久化的审查任务队列
+    每条记录对应一次待执行的 MR 审查，由 worker 进程认领并在可见性超时内续约
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('superseded', 'Superseded'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    review = models.ForeignKey(
+        'webhook.MergeRequestReview',
+        on_delete=models.CASCADE,
+        related_name='jobs'
+    )
+    project_id = models.IntegerField(db_index=True)
+    merge_request_iid = models.IntegerField()
+    matched_rule_id = models.IntegerField(null=True, blank=True)
+
+    # Webhook payload - SQLite兼容的JSON字段
+    payload = models.TextField(default='{}')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+
+    # 调度与租约
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    # 同一 MR 有更新的提交时置位，执行中的 worker 据此终止审查
+    cancel_requested = models.BooleanField(default=False)
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    request_id = models.CharField(max_length=100, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'review_jobs'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['status', 'locked_until']),
+            models.Index(fields=['project_id', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Job#{self.id} - Project {self.project_id} MR#{self.merge_request_iid} - {self.status}"
+
+    @property
+    def payload_dict(self):
+        try:
+            return json.loads(self.payload)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+
+    @payload_dict.setter
+    def payload_dict(self, value):
+        self.payload = json.dumps(value, ensure_ascii=False)
+
+
+class ReviewResultCacheEntry(models.Model):
+    """
+    审查结果缓存
+    以规范化 diff、最终 prompt 与模型配置的哈希为键，相同输入直接复用解析后的审查结果
+    """
+    id = models.AutoField(primary_key=True)
+    cache_key = models.CharField(max_length=64, unique=True)
+
+    # ReviewResultParser 输出 - SQLite兼容的JSON字段
+    result = models.TextField(default='{}')
+
+    llm_provider = models.CharField(max_length=50, null=True, blank=True)
+    llm_model = models.CharField(max_length=100, null=True, blank=True)
+    project_id = models.IntegerField(null=True, blank=True)
+    merge_request_iid = models.IntegerField(null=True, blank=True)
+
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'review_result_cache'
+        ordering = ['-last_used_at']
+
+    def __str__(self):
+        return f"{self.cache_key[:12]} - Project {self.project_id} MR#{self.merge_request_iid} - hits {self.hit_count}"
+
+    @property
+    def result_dict(self):
+        try:
+            return json.loads(self.result)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+
+    @result_dict.setter
+    def result_dict(self, value):
+        self.result = json.dumps(value, ensure_ascii=False)
+
+
+class ReviewResultCacheStat(models.Model):
+    """
+    审查结果缓存的按天计数
+    """
+    id = models.AutoField(primary_key=True)
+    date = models.DateField(unique=True)
+    hits = models.IntegerField(default=0)
+    misses = models.IntegerField(default=0)
+    stores = models.IntegerField(default=0)
+    evictions = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'review_result_cache_stats'
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.date} - hits {self.hits} / misses {self.misses}"
+
+
+class RepositoryCacheEntry(models.Model):
+    """
+    本地仓库缓存记录
+    每个项目的镜像与工作树占用空间和最近使用时间，用于按 REPOSITORY_MAX_SIZE_GB 做 LRU 淘汰
+    """
+    id = models.AutoField(primary_key=True)
+    project_id = models.IntegerField(unique=True)
+
+    # 镜像对象库大小（git count-objects），每次 fetch 后更新
+    mirror_size_bytes = models.BigIntegerField(default=0)
+    # 工作树检出文件大小，由周期任务统计
+    worktree_size_bytes = models.BigIntegerField(default=0)
+    size_bytes = models.BigIntegerField(default=0)
+
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_measured_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'repository_cache_entries'
+        ordering = ['last_used_at']
+
+    def __str__(self):
+        return f"Project {self.project_id} - {self.size_bytes / 1024 / 1024:.1f} MB"
+
+
+class RepositoryWarmRequest(models.Model):
+    """
+    待预热的项目镜像
+    push 事件只登记需要拉取的分支，由 worker 进程池的周期任务在后台执行 fetch
+    """
+    id = models.AutoField(primary_key=True)
+    project_id = models.IntegerField(unique=True)
+
+    # 需要拉取的分支列表 - SQLite兼容的JSON字段
+    branches = models.TextField(default='[]')
+    requested_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = 'repository_warm_requests'
+        ordering = ['requested_at']
+
+    def __str__(self):
+        return f"Project {self.project_id} - {self.branches}"
+
+    @property
+    def branches_list(self):
+        try:
+            return json.loads(self.branches)
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+    @branches_list.setter
+    def branches_list(self, value):
+        self.branches = json.dumps(value, ensure_ascii=False)
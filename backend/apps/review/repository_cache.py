@@ -0,0 +1,171 @@
+"""
+Repository Cache Manager
+按 REPOSITORY_MAX_SIZE_GB 约束本地仓库缓存：审查时只更新数据库中的使用时间与镜像大小，
+由周期任务或 cleanup_repositories 命令统计工作树大小、清理过期项目并按最近使用时间（LRU）淘汰
+"""
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import RepositoryCacheEntry
+from .repository_manager import RepositoryManager
+
+logger = logging.getLogger(__name__)
+
+
+class RepositoryCacheManager:
+    """
+    本地仓库缓存的统计与淘汰
+    """
+
+    def __init__(self, request_id=None, repo_manager=None, max_size_gb=None):
+        self.request_id = request_id
+        self.repo_manager = repo_manager or RepositoryManager(request_id=request_id)
+        if max_size_gb is None:
+            max_size_gb = getattr(settings, 'REPOSITORY_MAX_SIZE_GB', 50)
+        self.max_bytes = int(max_size_gb * 1024 ** 3)
+        self.retention_days = getattr(settings, 'REPOSITORY_CACHE_DAYS', 7)
+
+    def run(self, days=None, dry_run=False):
+        """
+        同步磁盘与数据库记录后执行淘汰
+
+        Args:
+            days: 保留天数，超过该天数未使用的项目直接删除（默认 REPOSITORY_CACHE_DAYS）
+            dry_run: 只计算淘汰计划，不删除
+
+        Returns:
+            dict: removed（已删除的项目 ID）、skipped（使用中跳过）、freed_bytes、total_bytes、budget_bytes
+        """
+        self.refresh(dry_run=dry_run)
+        return self.evict(days=days, dry_run=dry_run)
+
+    def refresh(self, dry_run=False):
+        """
+        重新统计磁盘上每个项目的占用空间，补录缺失的记录并删除已不存在的记录
+        旧版单工作目录布局（project-<id>）已不再使用，直接删除
+
+        Returns:
+            int: 统计的项目数量
+        """
+        base_path = self.repo_manager.base_path
+        if not dry_run and os.path.isdir(base_path):
+            for item in os.listdir(base_path):
+                item_path = os.path.join(base_path, item)
+                if item.startswith('project-') and os.path.isdir(item_path):
+                    shutil.rmtree(item_path, ignore_errors=True)
+                    logger.info(f"[{self.request_id}] Removed legacy repository: {item}")
+
+        project_ids = self._list_cached_projects()
+        now = timezone.now()
+        for project_id in project_ids:
+            mirror_size, worktree_size = self.repo_manager.measure_project_repository(project_id)
+            values = {
+                'mirror_size_bytes': mirror_size,
+                'worktree_size_bytes': worktree_size,
+                'size_bytes': mirror_size + worktree_size,
+                'last_measured_at': now,
+            }
+            if dry_run:
+                continue
+            if not RepositoryCacheEntry.objects.filter(project_id=project_id).update(**values):
+                # 记录缺失（如升级前已存在的镜像），以镜像修改时间作为最近使用时间
+                mirror_path = self.repo_manager._get_mirror_path(project_id)
+                RepositoryCacheEntry.objects.get_or_create(
+                    project_id=project_id,
+                    defaults=dict(values, last_used_at=datetime.fromtimestamp(os.path.getmtime(mirror_path))),
+                )
+
+        if not dry_run:
+            RepositoryCacheEntry.objects.exclude(project_id__in=project_ids).delete()
+
+        logger.info(f"[{self.request_id}] Measured {len(project_ids)} cached repositories")
+        return len(project_ids)
+
+    def evict(self, days=None, dry_run=False):
+        """
+        删除超过保留天数未使用的项目，总大小仍超出预算时按最近使用时间从旧到新淘汰
+        正在被审查租用的项目跳过
+
+        Returns:
+            dict: 淘汰结果
+        """
+        days = self.retention_days if days is None else days
+        cutoff = timezone.now() - timedelta(days=days)
+        total = self.get_total_size()
+        result = {
+            'removed': [],
+            'skipped': [],
+            'freed_bytes': 0,
+            'total_bytes': total,
+            'budget_bytes': self.max_bytes,
+        }
+
+        for entry in RepositoryCacheEntry.objects.order_by('last_used_at', 'id'):
+            expired = entry.last_used_at < cutoff
+            if not expired and total <= self.max_bytes:
+                break
+
+            reason = 'expired' if expired else 'over budget'
+            if dry_run:
+                size = entry.size_bytes
+            else:
+                size = self._remove(entry)
+                if size is None:
+                    result['skipped'].append(entry.project_id)
+                    logger.info(f"[{self.request_id}] Repository of project {entry.project_id} is in use, skipped")
+                    continue
+
+            total -= entry.size_bytes
+            result['removed'].append(entry.project_id)
+            result['freed_bytes'] += size
+            logger.info(
+                f"[{self.request_id}] {'Would remove' if dry_run else 'Removed'} repository of project "
+                f"{entry.project_id} ({reason}, {size / 1024 / 1024:.2f} MB)"
+            )
+
+        result['total_bytes'] = max(total, 0)
+        logger.info(
+            f"[{self.request_id}] Repository cache eviction complete: {len(result['removed'])} repos, "
+            f"{result['freed_bytes'] / 1024 / 1024:.2f} MB freed, "
+            f"{result['total_bytes'] / 1024 ** 3:.2f}/{self.max_bytes / 1024 ** 3:.2f} GB used"
+        )
+        return result
+
+    def get_total_size(self):
+        """数据库记录的缓存总大小（字节）"""
+        return RepositoryCacheEntry.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+
+    def _remove(self, entry):
+        """
+        删除项目仓库及其记录
+
+        Returns:
+            释放的字节数，使用中返回 None
+        """
+        size = self.repo_manager.remove_project_repository(entry.project_id)
+        if size is None:
+            return None
+
+        # 删除期间若有新的审查重新拉取了该项目，保留其记录
+        RepositoryCacheEntry.objects.filter(pk=entry.pk, last_used_at__lte=entry.last_used_at).delete()
+        return size
+
+    def _list_cached_projects(self):
+        """磁盘上存在镜像的项目 ID 列表"""
+        mirrors_dir = os.path.join(self.repo_manager.base_path, 'mirrors')
+        if not os.path.isdir(mirrors_dir):
+            return []
+
+        project_ids = []
+        for item in os.listdir(mirrors_dir):
+            if item.startswith('project-') and item.endswith('.git'):
+                project_id = item[len('project-'):-len('.git')]
+                if project_id.isdigit():
+                    project_ids.append(int(project_id))
+        return project_ids
@@ -1,14 +1,27 @@
 """
 Repository Manager for Code Review
 Handles Git repository cloning, updating, and branch management
+
+目录布局（均位于 REPOSITORY_BASE_PATH 下）:
+    mirrors/project-<id>.git          每个项目一个裸仓库镜像，远程分支映射到 refs/remotes/origin/*
+    worktrees/project-<id>/slot-<n>   基于镜像的工作树池，每次审查租用一个
+    locks/project-<id>/               镜像锁与工作树槽位锁（fcntl.flock，进程退出自动释放）
 """
 import os
+import time
+import fcntl
 import shutil
 import logging
 import subprocess
+from contextlib import contextmanager
+from datetime import timedelta
 from pathlib import Path
-from datetime import datetime, timedelta
 from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RepositoryCacheEntry
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +34,22 @@ class RepositoryManager:
     def __init__(self, request_id=None):
         self.request_id = request_id
         self.base_path = getattr(settings, 'REPOSITORY_BASE_PATH', '/tmp/code-review-repositories')
+        self.pool_size = max(getattr(settings, 'REPOSITORY_WORKTREE_POOL_SIZE', 4), 1)
+        self.lease_timeout = getattr(settings, 'REPOSITORY_WORKTREE_LEASE_TIMEOUT', 600)
+        self.fetch_mode = getattr(settings, 'REPOSITORY_FETCH_MODE', 'targeted')
+        self.fetch_depth = getattr(settings, 'REPOSITORY_FETCH_DEPTH', 50)
+        self.deepen_step = getattr(settings, 'REPOSITORY_DEEPEN_STEP', 200)
+        self.max_deepen_attempts = getattr(settings, 'REPOSITORY_MAX_DEEPEN_ATTEMPTS', 2)
+        self.partial_clone = getattr(settings, 'REPOSITORY_PARTIAL_CLONE', True)
+        self.sparse_checkout = getattr(settings, 'REPOSITORY_SPARSE_CHECKOUT', True)
+        self.sparse_context_dirs = getattr(settings, 'REPOSITORY_SPARSE_CONTEXT_DIRS', [])
+        self.sparse_max_dirs = getattr(settings, 'REPOSITORY_SPARSE_MAX_DIRS', 200)
+        # 本次审查的 fetch 统计（次数、下载字节数、耗时）
+        self.fetch_stats = {'fetches': 0, 'bytes': 0, 'seconds': 0.0}
+        self._mirror_size = None
+        self._lease = None
+        self._fetch_refspecs = None
+        self._mr_ref = None
         self._ensure_base_directory()
 
     def _ensure_base_directory(self):
@@ -29,9 +58,62 @@ class RepositoryManager:
         logger.info(f"[{self.request_id}] Repository base path: {self.base_path}")
 
     def _get_project_path(self, project_id):
-        """获取项目的本地路径"""
+        """获取旧版单工作目录布局下项目的本地路径"""
         return os.path.join(self.base_path, f"project-{project_id}")
 
+    def _get_mirror_path(self, project_id):
+        """获取项目裸仓库镜像路径"""
+        return os.path.join(self.base_path, 'mirrors', f"project-{project_id}.git")
+
+    def _get_worktree_path(self, project_id, slot):
+        """获取项目工作树槽位路径"""
+        return os.path.join(self._get_worktrees_dir(project_id), f"slot-{slot}")
+
+    def _get_worktrees_dir(self, project_id):
+        """获取项目全部工作树所在目录"""
+        return os.path.join(self.base_path, 'worktrees', f"project-{project_id}")
+
+    def _get_lock_path(self, project_id, name):
+        lock_dir = os.path.join(self.base_path, 'locks', f"project-{project_id}")
+        Path(lock_dir).mkdir(parents=True, exist_ok=True)
+        return os.path.join(lock_dir, f"{name}.lock")
+
+    @contextmanager
+    def _project_lock(self, project_id):
+        """
+        项目级互斥锁：镜像的初始化、fetch 与工作树增删串行执行
+        """
+        with open(self._get_lock_path(project_id, 'mirror'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _exclusive_worktrees(self, project_id):
+        """
+        非阻塞地锁定项目的全部工作树槽位（调用方持有项目锁），期间没有审查能租用工作树
+
+        Yields:
+            bool: 是否锁定成功，有槽位正在被租用时为 False
+        """
+        slot_locks = []
+        try:
+            for slot in range(self.pool_size):
+                lock_file = open(self._get_lock_path(project_id, f"slot-{slot}"), 'a')
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    lock_file.close()
+                    yield False
+                    return
+                slot_locks.append(lock_file)
+            yield True
+        finally:
+            for lock_file in slot_locks:
+                lock_file.close()
+
     def _run_git_command(self, command, cwd=None, timeout=300):
         """
         执行 Git 命令
@@ -69,33 +151,92 @@ class RepositoryManager:
             logger.error(f"[{self.request_id}] Git command error: {e}", exc_info=True)
             return False, "", str(e)
 
-    def get_or_clone_repository(self, project_url, project_id, access_token=None):
+    def get_or_clone_repository(self, project_url, project_id, access_token=None,
+                                merge_request_iid=None, target_branch=None):
         """
-        获取或克隆项目仓库
+        更新项目镜像并租用一个工作树
+
+        同一项目的多个审查各自持有独立工作树，互不干扰；使用完毕后需调用 release_repository 归还
+        targeted 模式下提供 merge_request_iid 与 target_branch 时，只拉取 MR head 与目标分支
 
         Args:
             project_url: GitLab 项目 URL
             project_id: 项目 ID
             access_token: GitLab Access Token
+            merge_request_iid: MR IID（可选）
+            target_branch: 目标分支（可选）
 
         Returns:
             (success, repo_path, error_message)
         """
-        repo_path = self._get_project_path(project_id)
+        if self.fetch_mode == 'targeted' and merge_request_iid and target_branch:
+            self._fetch_refspecs = [
+                f'+refs/merge-requests/{merge_request_iid}/head:refs/remotes/origin/merge-requests/{merge_request_iid}',
+                f'+refs/heads/{target_branch}:refs/remotes/origin/{target_branch}',
+            ]
+            self._mr_ref = f'origin/merge-requests/{merge_request_iid}'
+
+        success, error = self._ensure_mirror(project_url, project_id, access_token)
+        if not success:
+            return False, None, error
 
-        # 如果仓库已存在，尝试更新
-        if os.path.exists(repo_path):
-            logger.info(f"[{self.request_id}] Repository exists at {repo_path}, updating...")
-            success = self._update_repository(repo_path)
-            if success:
-                return True, repo_path, None
-            else:
-                # 更新失败，删除并重新克隆
-                logger.warning(f"[{self.request_id}] Update failed, removing and re-cloning...")
-                shutil.rmtree(repo_path, ignore_errors=True)
+        self._record_usage(project_id)
 
-        # 克隆新仓库
-        logger.info(f"[{self.request_id}] Cloning repository from {project_url}")
+        worktree_path = self._lease_worktree(project_id)
+        if worktree_path is None:
+            error_msg = f"No free worktree for project {project_id} within {self.lease_timeout}s"
+            logger.error(f"[{self.request_id}] {error_msg}")
+            return False, None, error_msg
+
+        return True, worktree_path, None
+
+    def warm_repository(self, project_url, project_id, access_token=None, branches=None):
+        """
+        预热项目镜像（不租用工作树），之后的审查只需增量拉取 MR head
+
+        targeted 模式下只拉取指定分支（如默认分支、刚推送的分支），否则拉取全部分支
+
+        Args:
+            project_url: GitLab 项目 URL
+            project_id: 项目 ID
+            access_token: GitLab Access Token
+            branches: 需要拉取的分支列表（可选）
+
+        Returns:
+            (success, error_message)
+        """
+        branches = [branch for branch in dict.fromkeys(branches or []) if branch]
+        if self.fetch_mode == 'targeted' and branches:
+            self._fetch_refspecs = [f'+refs/heads/{branch}:refs/remotes/origin/{branch}' for branch in branches]
+
+        success, error = self._ensure_mirror(project_url, project_id, access_token)
+        if success:
+            # 预热不算作使用，不影响 LRU 淘汰顺序
+            self._record_usage(project_id, touch=False)
+        return success, error
+
+    def release_repository(self):
+        """归还当前租用的工作树"""
+        if self._lease is None:
+            return
+
+        lock_file, project_id, slot = self._lease
+        self._lease = None
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            lock_file.close()
+        logger.info(f"[{self.request_id}] Released worktree slot-{slot} of project {project_id}")
+
+    def _ensure_mirror(self, project_url, project_id, access_token=None):
+        """
+        创建或更新项目裸仓库镜像
+        更新失败时保留镜像并返回失败（审查任务按退避策略重试），只有镜像损坏时才重新克隆
+
+        Returns:
+            (success, error_message)
+        """
+        mirror_path = self._get_mirror_path(project_id)
 
         # 构建带 token 的 URL
         clone_url = self._build_authenticated_url(project_url, access_token)
@@ -107,85 +248,399 @@ class RepositoryManager:
         else:
             logger.warning(f"[{self.request_id}] No authentication added to URL!")
 
-        # 使用浅克隆以提高速度
-        success, stdout, stderr = self._run_git_command([
-            'git', 'clone',
-            '--depth', '1',
-            '--no-single-branch',  # 获取所有分支
-            clone_url,
-            repo_path
-        ])
+        with self._project_lock(project_id):
+            # 如果镜像已存在，尝试更新
+            if os.path.exists(mirror_path):
+                logger.info(f"[{self.request_id}] Mirror exists at {mirror_path}, updating...")
+                if self._update_repository(mirror_path, clone_url):
+                    return True, None
+
+                # 网络、认证等失败时保留镜像（其他审查的工作树仍依赖它），由任务重试
+                if not self._is_mirror_corrupt(mirror_path):
+                    error_msg = f"Failed to update repository mirror of project {project_id}"
+                    logger.error(f"[{self.request_id}] {error_msg}")
+                    return False, error_msg
+
+                # 镜像损坏：仅在没有工作树被租用时删除镜像与工作树并重新克隆
+                with self._exclusive_worktrees(project_id) as acquired:
+                    if not acquired:
+                        error_msg = f"Repository mirror of project {project_id} is corrupt but worktrees are in use"
+                        logger.error(f"[{self.request_id}] {error_msg}")
+                        return False, error_msg
+
+                    logger.warning(f"[{self.request_id}] Mirror is corrupt, removing and re-cloning...")
+                    for path in (mirror_path, self._get_worktrees_dir(project_id)):
+                        shutil.rmtree(path, ignore_errors=True)
+                    return self._clone_mirror(project_url, mirror_path, clone_url)
+
+            return self._clone_mirror(project_url, mirror_path, clone_url)
+
+    def _clone_mirror(self, project_url, mirror_path, clone_url):
+        """
+        克隆新的项目镜像（调用方持有项目锁），失败时删除未完成的镜像
 
-        if success:
-            logger.info(f"[{self.request_id}] Repository cloned successfully to {repo_path}")
-            return True, repo_path, None
+        Returns:
+            (success, error_message)
+        """
+        logger.info(f"[{self.request_id}] Cloning repository from {project_url}")
+        Path(mirror_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # 裸仓库 + origin/* 远程分支映射，工作树才能使用 origin/<branch> 引用
+        for command, cwd in (
+            (['git', 'init', '--bare', mirror_path], None),
+            (['git', 'remote', 'add', 'origin', clone_url], mirror_path),
+        ):
+            success, stdout, stderr = self._run_git_command(command, cwd=cwd)
+            if not success:
+                break
         else:
+            # 使用浅克隆以提高速度：targeted 模式只拉取 MR 相关引用，历史不足时再按需加深
+            # 开启部分克隆时只下载提交与目录树，文件内容在检出/diff 时按需获取（之后的 fetch 沿用该过滤）
+            if self._fetch_refspecs:
+                success, stderr = self._fetch(
+                    mirror_path, self._fetch_refspecs, depth=self.fetch_depth, blob_filter=self.partial_clone
+                )
+                if not success:
+                    logger.warning(f"[{self.request_id}] Targeted fetch failed, falling back to all branches")
+                    self._fetch_refspecs = None
+                    self._mr_ref = None
+            if not self._fetch_refspecs:
+                success, stderr = self._fetch(mirror_path, depth=1, prune=True, blob_filter=self.partial_clone)
+
+        if not success:
+            shutil.rmtree(mirror_path, ignore_errors=True)
             error_msg = f"Failed to clone repository: {stderr}"
             logger.error(f"[{self.request_id}] {error_msg}")
-            return False, None, error_msg
+            return False, error_msg
+
+        logger.info(f"[{self.request_id}] Repository cloned successfully to {mirror_path}")
+        return True, None
+
+    def _is_mirror_corrupt(self, mirror_path):
+        """
+        fetch 失败后检查镜像是否损坏（不是有效的 Git 仓库或对象不完整）
+
+        Returns:
+            bool
+        """
+        success, _, _ = self._run_git_command(['git', 'rev-parse', '--git-dir'], cwd=mirror_path, timeout=30)
+        if not success:
+            return True
+        success, _, stderr = self._run_git_command(
+            ['git', 'fsck', '--connectivity-only', '--no-progress', '--no-dangling'], cwd=mirror_path
+        )
+        if not success:
+            logger.warning(f"[{self.request_id}] Mirror {mirror_path} failed connectivity check: {stderr}")
+        return not success
+
+    def _record_usage(self, project_id, touch=True):
+        """
+        更新项目仓库的镜像大小与最近使用时间（touch=False 时只更新大小），供缓存淘汰使用
+        镜像大小取自 fetch 后的 count-objects 结果，不遍历目录
+        """
+        now = timezone.now()
+        mirror_size = self._mirror_size
+        if mirror_size is None:
+            mirror_size = self._get_object_store_size(self._get_mirror_path(project_id))
+
+        values = {
+            'mirror_size_bytes': mirror_size,
+            'size_bytes': F('worktree_size_bytes') + mirror_size,
+        }
+        if touch:
+            values['last_used_at'] = now
+        try:
+            if RepositoryCacheEntry.objects.filter(project_id=project_id).update(**values):
+                return
+            if not touch:
+                # 仅预热过、从未被审查使用的项目视为已过期，优先被淘汰
+                now -= timedelta(days=getattr(settings, 'REPOSITORY_CACHE_DAYS', 7))
+            try:
+                RepositoryCacheEntry.objects.create(
+                    project_id=project_id,
+                    mirror_size_bytes=mirror_size,
+                    size_bytes=mirror_size,
+                    last_used_at=now,
+                )
+            except IntegrityError:
+                RepositoryCacheEntry.objects.filter(project_id=project_id).update(**values)
+        except Exception as e:
+            # 记录失败只影响淘汰顺序，不影响本次审查
+            logger.warning(f"[{self.request_id}] Failed to record repository usage of project {project_id}: {e}")
 
-    def _update_repository(self, repo_path):
+    def _update_repository(self, mirror_path, clone_url=None):
         """
-        更新已存在的仓库
+        更新已存在的镜像（调用方持有项目锁）
 
         Args:
-            repo_path: 仓库路径
+            mirror_path: 镜像路径
+            clone_url: 带认证的远程地址，token 轮换后同步更新
 
         Returns:
             success (bool)
         """
-        # 重置到干净状态
-        self._run_git_command(['git', 'reset', '--hard'], cwd=repo_path)
-        self._run_git_command(['git', 'clean', '-fd'], cwd=repo_path)
+        if clone_url:
+            self._run_git_command(['git', 'remote', 'set-url', 'origin', clone_url], cwd=mirror_path)
+
+        if self._fetch_refspecs:
+            # 只拉取 MR head 与目标分支；已有历史作为协商基础，无需再指定深度
+            success, stderr = self._fetch(mirror_path, self._fetch_refspecs)
+            if success:
+                return True
+            logger.warning(f"[{self.request_id}] Targeted fetch failed, falling back to all branches: {stderr}")
+            self._fetch_refspecs = None
+            self._mr_ref = None
 
         # 拉取最新更新
-        success, stdout, stderr = self._run_git_command(
-            ['git', 'fetch', '--all', '--prune'],
-            cwd=repo_path
+        success, stderr = self._fetch(mirror_path, prune=True)
+
+        return success
+
+    def _fetch(self, mirror_path, refspecs=None, depth=None, deepen=None, unshallow=False, prune=False,
+               blob_filter=False):
+        """
+        在镜像上执行 fetch 并统计下载量与耗时
+
+        Args:
+            mirror_path: 镜像路径
+            refspecs: 指定拉取的 refspec 列表，为空时使用 remote.origin.fetch 配置
+            depth: 浅克隆深度
+            deepen: 在现有浅克隆边界上加深的提交数
+            unshallow: 拉取完整历史
+            prune: 删除远程已不存在的分支
+            blob_filter: 以 --filter=blob:none 拉取，并将 origin 登记为 promisor 远程
+
+        Returns:
+            (success, error)
+        """
+        command = ['git', 'fetch', '--no-tags']
+        if blob_filter:
+            command.append('--filter=blob:none')
+        if depth:
+            command.append(f'--depth={depth}')
+        if deepen:
+            command.append(f'--deepen={deepen}')
+        if unshallow:
+            command.append('--unshallow')
+        if prune:
+            command.append('--prune')
+        command.append('origin')
+        command.extend(refspecs or [])
+
+        size_before = self._get_object_store_size(mirror_path)
+        start_time = time.monotonic()
+        success, stdout, stderr = self._run_git_command(command, cwd=mirror_path)
+        elapsed = time.monotonic() - start_time
+        self._mirror_size = self._get_object_store_size(mirror_path)
+        fetched_bytes = max(self._mirror_size - size_before, 0)
+
+        self.fetch_stats['fetches'] += 1
+        self.fetch_stats['bytes'] += fetched_bytes
+        self.fetch_stats['seconds'] = round(self.fetch_stats['seconds'] + elapsed, 3)
+        logger.info(
+            f"[{self.request_id}] Fetch {'succeeded' if success else 'failed'}: "
+            f"{fetched_bytes / 1024:.1f} KiB in {elapsed:.2f}s ({' '.join(command[2:])})"
         )
+        return success, stderr
+
+    def _get_object_store_size(self, repo_path):
+        """
+        通过 git count-objects 获取对象库大小（字节），不遍历目录
+
+        Returns:
+            int: 松散对象与 pack 文件总大小
+        """
+        success, stdout, _ = self._run_git_command(['git', 'count-objects', '-v'], cwd=repo_path)
+        if not success:
+            return 0
+
+        stats = {}
+        for line in stdout.splitlines():
+            key, _, value = line.partition(':')
+            if value.strip().isdigit():
+                stats[key.strip()] = int(value.strip())
+        return (stats.get('size', 0) + stats.get('size-pack', 0)) * 1024
+
+    def _is_shallow(self, repo_path):
+        success, stdout, _ = self._run_git_command(['git', 'rev-parse', '--is-shallow-repository'], cwd=repo_path)
+        return success and stdout.strip() == 'true'
+
+    def _deepen_history(self, attempt):
+        """
+        merge-base 失败时加深镜像历史：先按步长逐次加深，超过次数后拉取完整历史
+
+        Returns:
+            bool: 是否执行了加深且成功
+        """
+        if self._lease is None:
+            return False
+
+        project_id = self._lease[1]
+        mirror_path = self._get_mirror_path(project_id)
+
+        with self._project_lock(project_id):
+            if not self._is_shallow(mirror_path):
+                return False
+
+            if attempt < self.max_deepen_attempts:
+                deepen = self.deepen_step * (2 ** attempt)
+                logger.info(f"[{self.request_id}] Merge base not found, deepening history by {deepen} commits")
+                success, _ = self._fetch(mirror_path, self._fetch_refspecs, deepen=deepen)
+            else:
+                logger.info(f"[{self.request_id}] Merge base not found, fetching full history")
+                success, _ = self._fetch(mirror_path, self._fetch_refspecs, unshallow=True)
 
         return success
 
-    def checkout_merge_request(self, repo_path, mr_iid, source_branch, target_branch='main'):
+    def _lease_worktree(self, project_id):
         """
-        切换到 Merge Request 对应的分支
+        租用一个空闲工作树槽位，全部占用时等待直到超时
+
+        Returns:
+            工作树路径，超时返回 None
+        """
+        deadline = time.monotonic() + self.lease_timeout
+        while True:
+            for slot in range(self.pool_size):
+                lock_file = open(self._get_lock_path(project_id, f"slot-{slot}"), 'a')
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    lock_file.close()
+                    continue
+
+                self._lease = (lock_file, project_id, slot)
+                worktree_path = self._get_worktree_path(project_id, slot)
+                logger.info(f"[{self.request_id}] Leased worktree slot-{slot} of project {project_id}: {worktree_path}")
+                return worktree_path
+
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(1)
+
+    def checkout_merge_request(self, repo_path, mr_iid, source_branch, target_branch='main', changed_paths=None):
+        """
+        将租用的工作树切换到 Merge Request 源分支的最新提交（分离 HEAD，避免多个工作树争用同一分支）
+
+        提供 changed_paths 时使用稀疏检出，只检出变更文件所在目录、配置的上下文目录与根目录文件
 
         Args:
-            repo_path: 仓库路径
+            repo_path: 工作树路径
             mr_iid: MR IID
             source_branch: 源分支
             target_branch: 目标分支
+            changed_paths: MR 变更的文件路径列表（可选）
 
         Returns:
             (success, error_message)
         """
         logger.info(f"[{self.request_id}] Checking out MR #{mr_iid} branch: {source_branch}")
 
-        # 尝试切换到源分支
-        success, stdout, stderr = self._run_git_command(
-            ['git', 'checkout', source_branch],
-            cwd=repo_path
-        )
+        if self._lease is None:
+            return False, "No worktree leased, call get_or_clone_repository first"
+
+        project_id = self._lease[1]
+        # targeted 模式检出 refs/merge-requests/<iid>/head，同时支持来自 fork 的 MR
+        source_ref = self._mr_ref or f'origin/{source_branch}'
+        sparse_dirs = self._build_sparse_dirs(changed_paths)
+        success, stderr = False, ''
+
+        if os.path.exists(os.path.join(repo_path, '.git')):
+            # 复用工作树：清理上次审查留下的改动，先调整稀疏范围再检出，避免下载无关文件
+            self._run_git_command(['git', 'reset', '--hard'], cwd=repo_path)
+            self._run_git_command(['git', 'clean', '-fdx'], cwd=repo_path)
+            if self._apply_sparse_checkout(repo_path, sparse_dirs):
+                success, stdout, stderr = self._run_git_command(
+                    ['git', 'checkout', '--force', '--detach', source_ref],
+                    cwd=repo_path
+                )
+
+        if not success:
+            # 首次使用该槽位，或镜像重建后工作树失效：在镜像上重新创建工作树
+            success, stderr = self._create_worktree(project_id, repo_path, source_ref, sparse_dirs)
 
         if success:
-            # 拉取最新更新
-            self._run_git_command(['git', 'pull'], cwd=repo_path)
-            logger.info(f"[{self.request_id}] Checked out branch {source_branch}")
+            logger.info(f"[{self.request_id}] Checked out {source_ref} in {repo_path}")
             return True, None
-        else:
-            # 尝试从远程创建分支
+
+        error_msg = f"Failed to checkout branch {source_branch}: {stderr}"
+        logger.error(f"[{self.request_id}] {error_msg}")
+        return False, error_msg
+
+    def _create_worktree(self, project_id, worktree_path, ref, sparse_dirs=None):
+        """
+        在项目镜像上（重新）创建工作树
+
+        Returns:
+            (success, error)
+        """
+        shutil.rmtree(worktree_path, ignore_errors=True)
+        Path(worktree_path).parent.mkdir(parents=True, exist_ok=True)
+        mirror_path = self._get_mirror_path(project_id)
+
+        with self._project_lock(project_id):
+            self._run_git_command(['git', 'worktree', 'prune'], cwd=mirror_path)
             success, stdout, stderr = self._run_git_command(
-                ['git', 'checkout', '-b', source_branch, f'origin/{source_branch}'],
-                cwd=repo_path
+                ['git', 'worktree', 'add', '--force', '--detach', '--no-checkout', worktree_path, ref],
+                cwd=mirror_path
             )
 
-            if success:
-                logger.info(f"[{self.request_id}] Created and checked out branch {source_branch}")
-                return True, None
-            else:
-                error_msg = f"Failed to checkout branch {source_branch}: {stderr}"
-                logger.error(f"[{self.request_id}] {error_msg}")
-                return False, error_msg
+        if not success:
+            return False, stderr
+
+        # 先设置稀疏范围再检出，部分克隆下只会下载范围内的文件
+        if not self._apply_sparse_checkout(worktree_path, sparse_dirs):
+            return False, f"Failed to configure sparse checkout in {worktree_path}"
+
+        success, stdout, stderr = self._run_git_command(
+            ['git', 'checkout', '--force', '--detach', ref],
+            cwd=worktree_path
+        )
+        return success, stderr
+
+    def _build_sparse_dirs(self, changed_paths):
+        """
+        根据变更文件计算稀疏检出目录（cone 模式，根目录文件始终检出）
+
+        Returns:
+            目录列表；未启用、未提供变更或目录过多时返回 None 表示完整检出
+        """
+        if not self.sparse_checkout or not changed_paths:
+            return None
+
+        dirs = {os.path.dirname(path) for path in changed_paths if path}
+        dirs.update(d.strip('/') for d in self.sparse_context_dirs if d.strip('/'))
+        dirs.discard('')
+
+        if len(dirs) > self.sparse_max_dirs:
+            logger.info(f"[{self.request_id}] {len(dirs)} directories changed, using full checkout")
+            return None
+
+        return sorted(dirs)
+
+    def _apply_sparse_checkout(self, worktree_path, sparse_dirs):
+        """
+        设置或关闭工作树的稀疏检出（配置写入工作树自身，不影响同项目的其他工作树）
+
+        Returns:
+            bool: 是否成功
+        """
+        if sparse_dirs is None:
+            success, stdout, _ = self._run_git_command(
+                ['git', 'config', '--get', 'core.sparseCheckout'],
+                cwd=worktree_path
+            )
+            if success and stdout.strip() == 'true':
+                success, _, _ = self._run_git_command(['git', 'sparse-checkout', 'disable'], cwd=worktree_path)
+                return success
+            return True
+
+        logger.info(f"[{self.request_id}] Sparse checkout: {len(sparse_dirs)} directories")
+        success, _, _ = self._run_git_command(
+            ['git', 'sparse-checkout', 'set', '--cone'] + sparse_dirs,
+            cwd=worktree_path
+        )
+        return success
 
     def get_commit_range(self, repo_path, target_branch='main'):
         """
@@ -209,11 +664,14 @@ class RepositoryManager:
 
         current_branch = current_branch.strip()
 
-        # 获取 merge base
-        success, merge_base, stderr = self._run_git_command(
-            ['git', 'merge-base', f'origin/{target_branch}', current_branch],
-            cwd=repo_path
-        )
+        # 获取 merge base，浅克隆历史不足时按需加深后重试
+        for attempt in range(self.max_deepen_attempts + 2):
+            success, merge_base, stderr = self._run_git_command(
+                ['git', 'merge-base', f'origin/{target_branch}', current_branch],
+                cwd=repo_path
+            )
+            if success or not self._deepen_history(attempt):
+                break
 
         if not success:
             # 如果找不到 merge base，使用最近一次提交
@@ -260,7 +718,8 @@ class RepositoryManager:
 
     def cleanup_old_repositories(self, days=7):
         """
-        清理超过指定天数的旧仓库
+        清理超过指定天数未使用的项目镜像及其工作树，并按 REPOSITORY_MAX_SIZE_GB 淘汰最久未使用的项目
+        正在被审查租用的项目跳过
 
         Args:
             days: 保留天数
@@ -268,42 +727,39 @@ class RepositoryManager:
         Returns:
             (cleaned_count, total_size_freed)
         """
-        logger.info(f"[{self.request_id}] Starting repository cleanup (older than {days} days)")
-
-        if not os.path.exists(self.base_path):
-            return 0, 0
-
-        cutoff_time = datetime.now() - timedelta(days=days)
-        cleaned_count = 0
-        total_size_freed = 0
+        from .repository_cache import RepositoryCacheManager
 
-        for item in os.listdir(self.base_path):
-            item_path = os.path.join(self.base_path, item)
+        result = RepositoryCacheManager(request_id=self.request_id, repo_manager=self).run(days=days)
+        return len(result['removed']), result['freed_bytes']
 
-            if not os.path.isdir(item_path):
-                continue
-
-            # 检查最后修改时间
-            mtime = datetime.fromtimestamp(os.path.getmtime(item_path))
-
-            if mtime < cutoff_time:
-                try:
-                    # 计算大小
-                    size = self._get_directory_size(item_path)
-
-                    # 删除目录
-                    shutil.rmtree(item_path)
+    def remove_project_repository(self, project_id):
+        """
+        删除项目镜像与全部工作树
 
-                    cleaned_count += 1
-                    total_size_freed += size
+        Returns:
+            释放的字节数；有工作树正在被租用时不删除并返回 None
+        """
+        with self._project_lock(project_id), self._exclusive_worktrees(project_id) as acquired:
+            if not acquired:
+                return None
 
-                    logger.info(f"[{self.request_id}] Removed old repository: {item} ({size / 1024 / 1024:.2f} MB)")
+            mirror_size, worktree_size = self.measure_project_repository(project_id)
+            for path in (self._get_mirror_path(project_id), self._get_worktrees_dir(project_id)):
+                shutil.rmtree(path, ignore_errors=True)
+            return mirror_size + worktree_size
 
-                except Exception as e:
-                    logger.error(f"[{self.request_id}] Failed to remove {item_path}: {e}")
+    def measure_project_repository(self, project_id):
+        """
+        统计项目占用空间：镜像取对象库大小，工作树（稀疏检出，体积较小）遍历统计
 
-        logger.info(f"[{self.request_id}] Cleanup complete: {cleaned_count} repos, {total_size_freed / 1024 / 1024:.2f} MB freed")
-        return cleaned_count, total_size_freed
+        Returns:
+            (mirror_size, worktree_size) 字节数
+        """
+        mirror_path = self._get_mirror_path(project_id)
+        worktrees_dir = self._get_worktrees_dir(project_id)
+        mirror_size = self._get_object_store_size(mirror_path) if os.path.isdir(mirror_path) else 0
+        worktree_size = self._get_directory_size(worktrees_dir) if os.path.isdir(worktrees_dir) else 0
+        return mirror_size, worktree_size
 
     def _get_directory_size(self, path):
         """获取目录大小（字节）"""
@@ -0,0 +1,189 @@
+"""
+Repository Warmer
+在审查关键路径之外预先拉取项目镜像：定期刷新所有启用审查的项目，并在 push 事件后拉取推送的分支，
+审查时只需对 MR head 做近乎为零的增量 fetch
+
+定期刷新 REPOSITORY_CACHE_DAYS 内被审查使用过的项目；启用审查但从未预热过、本地没有镜像的项目做一次首次预热，
+首个 MR 无需在审查关键路径上完整克隆。首次预热的镜像视为已过期，未被审查使用时优先被淘汰，淘汰后不再重新预热；
+缓存总大小达到 REPOSITORY_MAX_SIZE_GB 时停止预热，避免与缓存淘汰相互抵消
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RepositoryCacheEntry, RepositoryWarmRequest
+from .repository_cache import RepositoryCacheManager
+from .repository_manager import RepositoryManager
+
+logger = logging.getLogger(__name__)
+
+# push 事件中表示分支被删除的 after 值
+DELETED_BRANCH_SHA = '0' * 40
+
+
+class RepositoryWarmer:
+    """
+    项目镜像预热
+    """
+
+    # 每次处理的 push 预热请求数量
+    REQUEST_BATCH_SIZE = 20
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+
+    def request_from_push(self, payload, project_id):
+        """
+        登记 push 事件的预热请求，实际 fetch 由后台周期任务执行
+
+        Returns:
+            bool: 是否登记
+        """
+        ref = payload.get('ref') or ''
+        if not project_id or not ref.startswith('refs/heads/') or payload.get('after') == DELETED_BRANCH_SHA:
+            return False
+
+        self.request(project_id, [ref[len('refs/heads/'):]])
+        return True
+
+    def request(self, project_id, branches):
+        """登记预热请求，同一项目未处理的请求合并分支列表"""
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                warm_request, created = RepositoryWarmRequest.objects.select_for_update().get_or_create(
+                    project_id=project_id,
+                    defaults={'requested_at': now}
+                )
+                warm_request.branches_list = list(dict.fromkeys(warm_request.branches_list + branches))
+                warm_request.requested_at = now
+                warm_request.save(update_fields=['branches', 'requested_at'])
+        except IntegrityError:
+            # 并发创建同一项目的请求，已有请求会在稍后被处理
+            pass
+        logger.info(f"[{self.request_id}] 已登记项目 {project_id} 的镜像预热请求: {branches}")
+
+    def process_requests(self):
+        """
+        处理待执行的 push 预热请求
+
+        Returns:
+            int: 成功预热的项目数量
+        """
+        from apps.webhook.models import Project
+
+        recently_used = set(self._recently_used_projects())
+        warmed = 0
+        for warm_request in list(RepositoryWarmRequest.objects.order_by('requested_at')[:self.REQUEST_BATCH_SIZE]):
+            # 只删除处理期间未被更新的请求，新的 push 会在下一轮再次预热
+            deleted, _ = RepositoryWarmRequest.objects.filter(
+                pk=warm_request.pk,
+                requested_at=warm_request.requested_at
+            ).delete()
+            if not deleted:
+                continue
+
+            if warm_request.project_id not in recently_used:
+                logger.info(f"[{self.request_id}] 项目 {warm_request.project_id} 近期未被审查使用，跳过镜像预热")
+                continue
+            if self._over_budget():
+                break
+
+            project = Project.objects.filter(project_id=warm_request.project_id, review_enabled=True).first()
+            if project and self.warm_project(project, warm_request.branches_list):
+                warmed += 1
+        return warmed
+
+    def warm_all(self):
+        """
+        按最近使用时间从新到旧刷新近期使用过的启用审查的项目镜像，之后首次预热从未预热过的新项目
+
+        Returns:
+            (warmed_count, failed_count)
+        """
+        from apps.webhook.models import Project
+
+        project_ids = self._recently_used_projects()
+        projects = Project.objects.in_bulk(project_ids, field_name='project_id')
+        recent = [projects[project_id] for project_id in project_ids
+                  if project_id in projects and projects[project_id].review_enabled]
+        initial = list(
+            Project.objects.filter(review_enabled=True, repository_warmed_at__isnull=True)
+            .exclude(project_id__in=RepositoryCacheEntry.objects.values('project_id'))
+            .order_by('-created_at')
+        )
+
+        warmed = failed = 0
+        for project in recent + initial:
+            if self._over_budget():
+                logger.info(f"[{self.request_id}] 仓库缓存已达到空间上限，停止镜像预热")
+                break
+            if not self.warm_project(project):
+                failed += 1
+                continue
+            warmed += 1
+            if project.repository_warmed_at is None:
+                Project.objects.filter(pk=project.pk).update(repository_warmed_at=timezone.now())
+
+        logger.info(f"[{self.request_id}] 镜像预热完成 - 成功:{warmed}, 失败:{failed}")
+        return warmed, failed
+
+    def _recently_used_projects(self):
+        """REPOSITORY_CACHE_DAYS 内被审查使用过的项目 ID，按最近使用时间从新到旧"""
+        cutoff = timezone.now() - timedelta(days=getattr(settings, 'REPOSITORY_CACHE_DAYS', 7))
+        return list(
+            RepositoryCacheEntry.objects.filter(last_used_at__gte=cutoff)
+            .order_by('-last_used_at')
+            .values_list('project_id', flat=True)
+        )
+
+    def _over_budget(self):
+        """缓存总大小是否已达到 REPOSITORY_MAX_SIZE_GB"""
+        cache_manager = RepositoryCacheManager(request_id=self.request_id)
+        return cache_manager.get_total_size() >= cache_manager.max_bytes
+
+    def warm_project(self, project, branches=None):
+        """
+        拉取项目默认分支与指定分支
+
+        Args:
+            project: Project 实例
+            branches: 额外拉取的分支列表
+
+        Returns:
+            bool: 是否成功
+        """
+        from apps.llm.config_cache import get_active_gitlab_config
+        from apps.webhook.services import ProjectService
+
+        gitlab_config = get_active_gitlab_config()
+        if not gitlab_config:
+            logger.warning(f"[{self.request_id}] 未找到已激活的 GitLab 配置，跳过项目 {project.project_id} 的镜像预热")
+            return False
+
+        project_data = project.gitlab_data_dict or {}
+        project_data.setdefault('path_with_namespace', project.project_path)
+        project_url = ProjectService.build_clone_url(project_data, base_url=gitlab_config.server_url)
+        if not project_url:
+            logger.warning(f"[{self.request_id}] 无法确定项目 {project.project_id} 的仓库地址，跳过镜像预热")
+            return False
+
+        default_branch = project_data.get('default_branch')
+        branches = ([default_branch] if default_branch else []) + list(branches or [])
+
+        try:
+            success, error = RepositoryManager(request_id=self.request_id).warm_repository(
+                project_url=project_url,
+                project_id=project.project_id,
+                access_token=gitlab_config.private_token,
+                branches=branches
+            )
+        except Exception as e:
+            success, error = False, str(e)
+
+        if not success:
+            logger.warning(f"[{self.request_id}] 项目 {project.project_id} 镜像预热失败: {error}")
+        return success
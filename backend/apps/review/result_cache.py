@@ -0,0 +1,199 @@
+"""
+Review Result Cache
+以规范化 diff + 最终 prompt + 模型配置为键缓存审查结果，重开 MR、目标分支未变的 rebase
+或重复触发的 update 事件产生相同 diff 时直接复用结果，不再调用 Claude CLI
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ReviewResultCacheEntry, ReviewResultCacheStat
+
+logger = logging.getLogger(__name__)
+
+# 键格式版本，规范化规则变化时递增以避免误命中
+CACHE_KEY_VERSION = 'v1'
+
+
+def normalize_diff(changes):
+    """
+    将 GitLab MR changes 规范化为稳定文本：按路径排序，统一换行并去除行尾空白
+
+    Args:
+        changes: GitlabService.get_merge_request_changes 的返回值
+
+    Returns:
+        str: 规范化后的 diff，没有任何 diff 内容时返回空字符串
+    """
+    items = sorted(
+        changes.get('changes', []),
+        key=lambda change: (change.get('new_path') or '', change.get('old_path') or '')
+    )
+
+    parts = []
+    has_content = False
+    for change in items:
+        diff = (change.get('diff') or '').replace('\r\n', '\n')
+        has_content = has_content or bool(diff.strip())
+        flags = ''.join(
+            '1' if change.get(flag) else '0'
+            for flag in ('new_file', 'deleted_file', 'renamed_file')
+        )
+        parts.append(f"--- {change.get('old_path') or ''}\n+++ {change.get('new_path') or ''}\n# {flags}")
+        parts.append('\n'.join(line.rstrip() for line in diff.split('\n')))
+
+    return '\n'.join(parts) if has_content else ''
+
+
+class ReviewResultCache:
+    """
+    持久化的审查结果缓存，支持 TTL 过期与按最近使用时间（LRU）淘汰
+    """
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+        self.enabled = getattr(settings, 'REVIEW_RESULT_CACHE_ENABLED', True)
+        self.ttl = timedelta(hours=getattr(settings, 'REVIEW_RESULT_CACHE_TTL_HOURS', 168))
+        self.max_entries = getattr(settings, 'REVIEW_RESULT_CACHE_MAX_ENTRIES', 5000)
+
+    def build_key(self, changes, prompt, config_fingerprint):
+        """
+        计算缓存键
+
+        Args:
+            changes: MR 变更信息
+            prompt: 最终发送给 Claude CLI 的 prompt
+            config_fingerprint: 影响审查结果的模型/CLI 配置
+
+        Returns:
+            str: sha256 十六进制键，diff 为空（如变更过大被 GitLab 截断）时返回 None
+        """
+        diff_text = normalize_diff(changes)
+        if not diff_text:
+            return None
+
+        digest = hashlib.sha256()
+        for part in (CACHE_KEY_VERSION, config_fingerprint or '', prompt or '', diff_text):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def get(self, cache_key):
+        """
+        查找缓存结果
+
+        Returns:
+            dict: ReviewResultParser 输出，未命中时返回 None
+        """
+        if not self.enabled or not cache_key:
+            return None
+
+        now = timezone.now()
+        entry = ReviewResultCacheEntry.objects.filter(cache_key=cache_key, expires_at__gt=now).first()
+        if entry is None:
+            self._incr('misses')
+            logger.info(f"[{self.request_id}] 审查结果缓存未命中 - {cache_key[:12]}")
+            return None
+
+        ReviewResultCacheEntry.objects.filter(pk=entry.pk).update(
+            hit_count=F('hit_count') + 1,
+            last_used_at=now,
+        )
+        self._incr('hits')
+        logger.info(f"[{self.request_id}] 审查结果缓存命中 - {cache_key[:12]} (累计命中 {entry.hit_count + 1} 次)")
+
+        result = entry.result_dict
+        result.setdefault('metadata', {})
+        result['metadata'].update({'cache_hit': True, 'cache_key': cache_key})
+        return result
+
+    def set(self, cache_key, result, llm_provider=None, llm_model=None, project_id=None, merge_request_iid=None):
+        """写入缓存结果，并在超出容量时淘汰"""
+        if not self.enabled or not cache_key:
+            return
+
+        now = timezone.now()
+        try:
+            ReviewResultCacheEntry.objects.update_or_create(
+                cache_key=cache_key,
+                defaults={
+                    'result': json.dumps(result, ensure_ascii=False),
+                    'llm_provider': llm_provider,
+                    'llm_model': llm_model,
+                    'project_id': project_id,
+                    'merge_request_iid': merge_request_iid,
+                    'hit_count': 0,
+                    'created_at': now,
+                    'last_used_at': now,
+                    'expires_at': now + self.ttl,
+                }
+            )
+        except IntegrityError:
+            # 并发写入同一键，保留先写入的结果即可
+            return
+
+        self._incr('stores')
+        self.evict()
+
+    def evict(self):
+        """
+        淘汰过期条目，超出最大条目数时删除最久未使用的条目
+
+        Returns:
+            int: 删除的条目数量
+        """
+        now = timezone.now()
+        deleted, _ = ReviewResultCacheEntry.objects.filter(expires_at__lte=now).delete()
+
+        overflow = ReviewResultCacheEntry.objects.count() - self.max_entries
+        if overflow > 0:
+            stale_ids = list(
+                ReviewResultCacheEntry.objects.order_by('last_used_at', 'id')
+                .values_list('id', flat=True)[:overflow]
+            )
+            lru_deleted, _ = ReviewResultCacheEntry.objects.filter(pk__in=stale_ids).delete()
+            deleted += lru_deleted
+
+        if deleted:
+            self._incr('evictions', deleted)
+            logger.info(f"[{self.request_id}] 审查结果缓存淘汰 {deleted} 条")
+        return deleted
+
+    def get_stats(self, days=7):
+        """
+        获取最近的命中统计
+
+        Returns:
+            dict: 汇总计数与命中率
+        """
+        since = timezone.now().date() - timedelta(days=days - 1)
+        rows = list(
+            ReviewResultCacheStat.objects.filter(date__gte=since)
+            .values('date', 'hits', 'misses', 'stores', 'evictions')
+        )
+        hits = sum(row['hits'] for row in rows)
+        misses = sum(row['misses'] for row in rows)
+        return {
+            'entries': ReviewResultCacheEntry.objects.count(),
+            'hits': hits,
+            'misses': misses,
+            'stores': sum(row['stores'] for row in rows),
+            'evictions': sum(row['evictions'] for row in rows),
+            'hit_rate': round(hits / (hits + misses) * 100, 1) if hits + misses else 0,
+            'daily': rows,
+        }
+
+    def _incr(self, field, amount=1):
+        today = timezone.now().date()
+        updated = ReviewResultCacheStat.objects.filter(date=today).update(**{field: F(field) + amount})
+        if not updated:
+            try:
+                ReviewResultCacheStat.objects.create(date=today, **{field: amount})
+            except IntegrityError:
+                ReviewResultCacheStat.objects.filter(date=today).update(**{field: F(field) + amount})
@@ -0,0 +1,146 @@
+"""
+Fair Review Scheduler
+在全局并发上限与项目并发上限约束下，按项目轮询（最久未被服务的项目优先）挑选待执行任务
+"""
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Exists, Max, Min, Q
+from django.utils import timezone
+
+from .models import ReviewJob
+
+logger = logging.getLogger(__name__)
+
+
+class FairReviewScheduler:
+    """
+    公平调度器
+
+    - 全局上限：同时处于 running 的任务总数
+    - 项目上限：单个项目同时 running 的任务数（Project.max_concurrent_reviews 可覆盖默认值，0 表示暂停该项目）
+    - 公平性：有待执行任务的项目中，最近一次开始执行时间最早的项目优先，同一项目内先进先出
+    """
+
+    def __init__(self, global_limit=None, project_limit=None):
+        self.global_limit = global_limit if global_limit is not None else getattr(settings, 'REVIEW_GLOBAL_MAX_CONCURRENCY', 4)
+        self.project_limit = project_limit if project_limit is not None else getattr(settings, 'REVIEW_PROJECT_MAX_CONCURRENCY', 2)
+
+    def get_project_limit(self, project_id, overrides=None):
+        """获取项目的并发上限，0 表示暂停（任务保持排队，不再开始执行）"""
+        if overrides is None:
+            overrides = self._load_project_overrides([project_id])
+        limit = overrides.get(project_id)
+        return limit if limit is not None else self.project_limit
+
+    def next_candidates(self, limit=10):
+        """
+        按公平顺序返回可尝试认领的任务
+
+        Args:
+            limit: 最多返回的候选数量
+
+        Returns:
+            list[(job_id, project_id, project_limit)]
+        """
+        now = timezone.now()
+
+        running_by_project = dict(
+            ReviewJob.objects.filter(status='running')
+            .values('project_id').annotate(n=Count('id')).values_list('project_id', 'n')
+        )
+        if self.global_limit and sum(running_by_project.values()) >= self.global_limit:
+            return []
+
+        queued_projects = dict(
+            ReviewJob.objects.filter(status='queued', available_at__lte=now)
+            .values('project_id').annotate(oldest=Min('available_at')).values_list('project_id', 'oldest')
+        )
+        if not queued_projects:
+            return []
+
+        project_ids = list(queued_projects.keys())
+        overrides = self._load_project_overrides(project_ids)
+        last_served = dict(
+            ReviewJob.objects.filter(project_id__in=project_ids, started_at__isnull=False)
+            .values('project_id').annotate(last=Max('started_at')).values_list('project_id', 'last')
+        )
+
+        eligible = [
+            project_id for project_id in project_ids
+            if running_by_project.get(project_id, 0) < self.get_project_limit(project_id, overrides)
+        ]
+        eligible.sort(key=lambda pid: (last_served.get(pid) or datetime.min, queued_projects[pid]))
+
+        candidates = []
+        for project_id in eligible[:limit]:
+            job_id = (
+                ReviewJob.objects.filter(project_id=project_id, status='queued', available_at__lte=now)
+                .order_by('available_at', 'id').values_list('id', flat=True).first()
+            )
+            if job_id:
+                candidates.append((job_id, project_id, self.get_project_limit(project_id, overrides)))
+
+        return candidates
+
+    def capacity_conditions(self, project_id, project_limit):
+        """
+        认领时附加到条件更新上的并发约束，保证检查与更新在同一条语句内完成
+        """
+        if project_limit <= 0:
+            # 项目已暂停，条件恒不成立
+            return [Q(pk__in=[])]
+        conditions = [
+            ~Exists(
+                ReviewJob.objects.filter(status='running', project_id=project_id)
+                .order_by()[project_limit - 1:project_limit]
+            )
+        ]
+        if self.global_limit:
+            conditions.append(
+                ~Exists(
+                    ReviewJob.objects.filter(status='running')
+                    .order_by()[self.global_limit - 1:self.global_limit]
+                )
+            )
+        return conditions
+
+    def get_project_queue_stats(self, project_id):
+        """
+        获取项目的队列深度与等待时间
+
+        Returns:
+            dict: 队列统计
+        """
+        now = timezone.now()
+        counts = dict(
+            ReviewJob.objects.filter(project_id=project_id, status__in=['queued', 'running'])
+            .values('status').annotate(n=Count('id')).values_list('status', 'n')
+        )
+        oldest_queued = (
+            ReviewJob.objects.filter(project_id=project_id, status='queued')
+            .aggregate(oldest=Min('created_at'))['oldest']
+        )
+        recent_waits = [
+            (started_at - created_at).total_seconds()
+            for created_at, started_at in ReviewJob.objects.filter(
+                project_id=project_id,
+                started_at__gte=now - timedelta(hours=24)
+            ).values_list('created_at', 'started_at')[:500]
+        ]
+
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'max_concurrency': self.get_project_limit(project_id),
+            'oldest_wait_seconds': round((now - oldest_queued).total_seconds(), 1) if oldest_queued else 0,
+            'avg_wait_seconds_24h': round(sum(recent_waits) / len(recent_waits), 1) if recent_waits else 0,
+        }
+
+    def _load_project_overrides(self, project_ids):
+        from apps.webhook.models import Project
+        return dict(
+            Project.objects.filter(project_id__in=project_ids, max_concurrent_reviews__isnull=False)
+            .values_list('project_id', 'max_concurrent_reviews')
+        )
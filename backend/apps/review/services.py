@@ -5,6 +5,7 @@ import os
 import re
 import shutil
 import logging
+import threading
 import gitlab
 from retrying import retry
 from django.core.exceptions import ImproperlyConfigured
@@ -14,6 +15,46 @@ from utils.gitlab_parser import parse_diff_content
 
 logger = logging.getLogger(__name__)
 
+# 进程内共享的 python-gitlab 客户端，按 (server_url, private_token) 复用 HTTP 连接
+_client_pool = {}
+_client_pool_lock = threading.Lock()
+
+
+def get_gitlab_client(server_url, private_token):
+    """
+    获取进程内共享的 GitLab 客户端，首次创建时调用 auth() 验证连接
+
+    Returns:
+        gitlab.Gitlab 实例
+
+    Raises:
+        验证失败时抛出 python-gitlab 的异常，失败的客户端不会被缓存
+    """
+    key = (server_url, private_token)
+    client = _client_pool.get(key)
+    if client is not None:
+        return client
+
+    with _client_pool_lock:
+        client = _client_pool.get(key)
+        if client is not None:
+            return client
+
+        client = gitlab.Gitlab(server_url, private_token=private_token, timeout=30)
+        client.auth()
+
+        # 配置轮换后旧 token 的客户端不再使用，仍在使用它的请求结束后随对象回收
+        for stale_key in [k for k in _client_pool if k[0] == server_url]:
+            _client_pool.pop(stale_key)
+        _client_pool[key] = client
+        return client
+
+
+def reset_gitlab_clients():
+    """清空客户端池（fork 出子进程后调用，避免共享连接）"""
+    with _client_pool_lock:
+        _client_pool.clear()
+
 
 class GitlabService:
     """
@@ -30,12 +71,12 @@ class GitlabService:
         从数据库加载GitLab配置，未配置时抛出异常
         """
         try:
-            from apps.llm.models import GitLabConfig
+            from apps.llm.config_cache import get_active_gitlab_config
         except ImportError as exc:
             logger.error(f"[{self.request_id}] 无法导入 GitLabConfig 模型: {exc}")
             raise ImproperlyConfigured("GitLabConfig 模型不可用，请检查应用安装和迁移") from exc
 
-        gitlab_config = GitLabConfig.objects.filter(is_active=True).first()
+        gitlab_config = get_active_gitlab_config()
 
         if not gitlab_config:
             error_msg = "未找到已激活的 GitLab 配置，请在管理后台创建并启用对应配置"
@@ -49,21 +90,10 @@ class GitlabService:
 
     def _init_gitlab_client(self):
         """
-        初始化GitLab客户端
+        初始化GitLab客户端（从进程内客户端池获取，只有首次创建时验证连接）
         """
         try:
-            # 打印配置信息（隐藏敏感信息）
-            masked_token = f"{self.private_token[:8]}...{self.private_token[-8:]}" if len(self.private_token) > 16 else "***"
-            logger.info(f"[{self.request_id}] 开始初始化GitLab客户端 - 服务器:{self.server_url}, Token:{masked_token}")
-
-            self.gl = gitlab.Gitlab(
-                self.server_url,
-                private_token=self.private_token,
-                timeout=30
-            )
-            # 测试连接
-            self.gl.auth()
-            logger.info(f"[{self.request_id}] GitLab客户端初始化成功")
+            self.gl = get_gitlab_client(self.server_url, self.private_token)
         except Exception as e:
             # 打印详细的错误信息和参数
             masked_token = f"{self.private_token[:8]}...{self.private_token[-8:]}" if len(self.private_token) > 16 else "***"
@@ -87,8 +117,9 @@ class GitlabService:
             return None
 
         try:
-            project = self.gl.projects.get(project_id)
-            merge_request = project.mergerequests.get(merge_request_iid)
+            # 懒加载项目与 MR 对象，不发起额外的 GET 请求
+            project = self.gl.projects.get(project_id, lazy=True)
+            merge_request = project.mergerequests.get(merge_request_iid, lazy=True)
             changes = merge_request.changes()
 
             # changes() 已经返回字典格式，直接返回
@@ -107,7 +138,7 @@ class GitlabService:
             return None
 
         try:
-            project = self.gl.projects.get(project_id)
+            project = self.gl.projects.get(project_id, lazy=True)
             merge_request = project.mergerequests.get(merge_request_iid)
             return merge_request.asdict()
         except Exception as e:
@@ -124,7 +155,7 @@ class GitlabService:
             return None
 
         try:
-            project = self.gl.projects.get(project_id)
+            project = self.gl.projects.get(project_id, lazy=True)
             file_obj = project.files.get(file_path=file_path, ref=branch_name)
             return file_obj.decode()
         except Exception as e:
@@ -132,18 +163,21 @@ class GitlabService:
             return None
 
     @retry(stop_max_attempt_number=3, wait_fixed=2000)
-    def post_merge_request_comment(self, project_id, merge_request_iid, comment):
+    def post_merge_request_comment(self, project_id, merge_request_iid, comment, timeout=None):
         """
         Post a comment to a merge request using python-gitlab library
+
+        Args:
+            timeout: 本次请求的超时（秒），默认使用客户端的超时设置
         """
         if not self.gl:
             logger.error(f"[{self.request_id}] GitLab客户端未初始化")
             return None
 
         try:
-            project = self.gl.projects.get(project_id)
-            merge_request = project.mergerequests.get(merge_request_iid)
-            note = merge_request.notes.create({'body': comment})
+            project = self.gl.projects.get(project_id, lazy=True)
+            merge_request = project.mergerequests.get(merge_request_iid, lazy=True)
+            note = merge_request.notes.create({'body': comment}, timeout=timeout)
             logger.info(f"[{self.request_id}] Comment posted successfully to MR #{merge_request_iid}")
             return note.asdict()
         except Exception as e:
@@ -4,5 +4,5 @@ from . import views
 app_name = 'review'
 
 urlpatterns = [
-    # Future review endpoints can be added here
+    path('result-cache/stats/', views.result_cache_stats, name='result_cache_stats'),
 ]
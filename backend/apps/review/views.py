@@ -1,4 +1,31 @@
-from django.shortcuts import render
+import logging
 
-# Create your views here.
-# Future review-related views can be added here
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .result_cache import ReviewResultCache
+
+logger = logging.getLogger(__name__)
+
+
+@api_view(['GET'])
+def result_cache_stats(request):
+    """
+    审查结果缓存的命中统计
+
+    Query parameters:
+        - days: 统计最近天数 (default: 7)
+    """
+    try:
+        days = int(request.query_params.get('days', 7))
+        return Response({
+            'status': 'success',
+            'data': ReviewResultCache().get_stats(days=max(days, 1))
+        })
+    except Exception as e:
+        logger.error(f"Error getting result cache stats: {str(e)}", exc_info=True)
+        return Response(
+            {'status': 'error', 'message': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -0,0 +1,322 @@
+"""
+Review Worker Pool
+以多进程方式执行审查任务，主进程负责监督子进程与周期性维护任务
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from apps.common.http_utils import reset_http_session
+from apps.common.redis_utils import reset_redis_client
+from .job_queue import ReviewJobQueue
+from .services import reset_gitlab_clients
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewExecutionError(Exception):
+    """审查流程自行捕获错误并将审查标记为失败，由任务队列按重试策略重新执行"""
+
+
+def execute_review_job(job):
+    """
+    执行单个审查任务
+
+    Args:
+        job: ReviewJob 实例
+
+    Raises:
+        ReviewExecutionError: 审查结束后状态为 failed
+    """
+    from apps.llm.models import WebhookEventRule
+    from apps.webhook.models import MergeRequestReview
+    from apps.webhook.views import process_merge_request_review
+
+    matched_rule = None
+    if job.matched_rule_id:
+        matched_rule = WebhookEventRule.objects.filter(pk=job.matched_rule_id).first()
+
+    process_merge_request_review(
+        job.project_id,
+        job.merge_request_iid,
+        job.review_id,
+        job.payload_dict,
+        matched_rule
+    )
+
+    # process_merge_request_review 内部捕获异常并将审查标记为失败，这里按最终状态决定任务是否重试
+    review = MergeRequestReview.objects.filter(pk=job.review_id).values('status', 'error_message').first()
+    if review and review['status'] == 'failed':
+        raise ReviewExecutionError(review['error_message'] or '审查执行失败')
+
+
+class ReviewWorker:
+    """
+    单个 worker 进程：循环认领任务并执行，执行期间由心跳线程续约
+    """
+
+    def __init__(self, worker_id, poll_interval=None):
+        self.worker_id = worker_id
+        self.poll_interval = poll_interval or getattr(settings, 'REVIEW_WORKER_POLL_INTERVAL', 5)
+        self.queue = ReviewJobQueue(request_id=worker_id)
+        self._stopping = False
+
+    def run(self):
+        """worker 主循环，收到 SIGTERM 后执行完当前任务再退出"""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        logger.info(f"[{self.worker_id}] Review worker 启动 - PID:{os.getpid()}, 后端:{self.queue.backend.name}")
+
+        while not self._stopping:
+            close_old_connections()
+            try:
+                job = self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"[{self.worker_id}] 认领任务失败: {e}", exc_info=True)
+                time.sleep(self.poll_interval)
+                continue
+
+            if job is None:
+                self.queue.wait_for_job(self.poll_interval)
+                continue
+
+            self._run_job(job)
+
+        logger.info(f"[{self.worker_id}] Review worker 已退出")
+
+    def _run_job(self, job):
+        """执行任务并维护租约"""
+        logger.info(f"[{self.worker_id}] 开始执行 Job#{job.pk} (第 {job.attempts} 次) - 项目:{job.project_id}, MR:{job.merge_request_iid}")
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop,
+            args=(job, stop_heartbeat),
+            daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            execute_review_job(job)
+        except Exception as e:
+            stop_heartbeat.set()
+            heartbeat.join()
+            if self.queue.is_cancel_requested(job):
+                self.queue.supersede(job, self.worker_id)
+                logger.info(f"[{self.worker_id}] Job#{job.pk} 已被新提交取代")
+                return
+            logger.error(
+                f"[{self.worker_id}] Job#{job.pk} 执行异常: {e}",
+                exc_info=not isinstance(e, ReviewExecutionError)
+            )
+            self.queue.fail(job, self.worker_id, e)
+            return
+
+        stop_heartbeat.set()
+        heartbeat.join()
+        if self.queue.is_cancel_requested(job):
+            self.queue.supersede(job, self.worker_id)
+            logger.info(f"[{self.worker_id}] Job#{job.pk} 已被新提交取代")
+            return
+        self.queue.complete(job, self.worker_id)
+        logger.info(f"[{self.worker_id}] Job#{job.pk} 执行完成")
+
+    def _heartbeat_loop(self, job, stop_event):
+        """
+        按可见性超时的三分之一间隔续约，并定期检查取消请求
+        收到取消请求时终止正在执行的 Claude CLI 进程
+        """
+        from .claude_cli_service import ClaudeCliService
+
+        renew_interval = max(self.queue.visibility_timeout / 3, 1)
+        check_interval = min(getattr(settings, 'REVIEW_CANCEL_CHECK_INTERVAL', 5), renew_interval)
+        last_renewed = time.monotonic()
+        cancelled = False
+        try:
+            while not stop_event.wait(check_interval):
+                if not cancelled and self.queue.is_cancel_requested(job):
+                    cancelled = True
+                    logger.info(f"[{self.worker_id}] Job#{job.pk} 收到取消请求，终止审查进程")
+                if cancelled:
+                    # CLI 可能尚未启动，持续尝试直到审查流程自行退出
+                    ClaudeCliService.cancel(job.request_id)
+
+                if time.monotonic() - last_renewed >= renew_interval:
+                    if not self.queue.heartbeat(job, self.worker_id):
+                        logger.warning(f"[{self.worker_id}] Job#{job.pk} 租约已丢失")
+                        break
+                    last_renewed = time.monotonic()
+        finally:
+            connections.close_all()
+
+    def _handle_stop(self, signum, frame):
+        logger.info(f"[{self.worker_id}] 收到停止信号，当前任务完成后退出")
+        self._stopping = True
+
+
+def _worker_entrypoint(worker_id, poll_interval):
+    """子进程入口：重置继承自父进程的连接"""
+    connections.close_all()
+    reset_redis_client()
+    reset_http_session()
+    reset_gitlab_clients()
+    ReviewWorker(worker_id, poll_interval).run()
+
+
+class ReviewWorkerPool:
+    """
+    worker 进程池监督者
+
+    - 启动并守护固定数量的 worker 进程，异常退出时自动拉起
+    - 在主进程中以独立线程运行周期性维护任务（如租约过期恢复）
+    """
+
+    def __init__(self, concurrency=None, poll_interval=None):
+        self.concurrency = concurrency or getattr(settings, 'REVIEW_WORKER_CONCURRENCY', 2)
+        self.poll_interval = poll_interval or getattr(settings, 'REVIEW_WORKER_POLL_INTERVAL', 5)
+        self.hostname = socket.gethostname()
+        self.processes = {}
+        self.periodic_tasks = []
+        self._stopping = threading.Event()
+        self._context = multiprocessing.get_context('fork')
+
+        self.register_periodic('recover_expired_jobs', self._recover_expired_jobs, self.poll_interval * 6)
+        self.register_periodic(
+            'evict_repository_cache',
+            self._evict_repository_cache,
+            getattr(settings, 'REPOSITORY_CACHE_EVICTION_INTERVAL', 1800)
+        )
+        if getattr(settings, 'WEBHOOK_ASYNC_ENABLED', True):
+            self.register_periodic(
+                'consume_webhook_spool',
+                self._consume_webhook_spool,
+                getattr(settings, 'WEBHOOK_SPOOL_POLL_INTERVAL', 1)
+            )
+        if getattr(settings, 'NOTIFICATION_OUTBOX_ENABLED', True):
+            self.register_periodic(
+                'send_notifications',
+                self._send_notifications,
+                getattr(settings, 'NOTIFICATION_OUTBOX_POLL_INTERVAL', 2)
+            )
+        self.register_periodic(
+            'archive_expired_records',
+            self._archive_expired_records,
+            getattr(settings, 'RETENTION_INTERVAL', 3600)
+        )
+        if getattr(settings, 'REPOSITORY_WARM_ENABLED', True):
+            self.register_periodic(
+                'warm_pushed_repositories',
+                self._warm_pushed_repositories,
+                getattr(settings, 'REPOSITORY_WARM_REQUEST_INTERVAL', 10)
+            )
+            self.register_periodic(
+                'warm_repositories',
+                self._warm_repositories,
+                getattr(settings, 'REPOSITORY_WARM_INTERVAL', 900)
+            )
+
+    def register_periodic(self, name, func, interval):
+        """
+        注册在主进程中周期执行的维护任务
+
+        Args:
+            name: 任务名称
+            func: 无参可调用对象
+            interval: 执行间隔（秒）
+        """
+        self.periodic_tasks.append((name, func, interval))
+
+    def run(self):
+        """启动进程池并阻塞直到收到停止信号"""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        connections.close_all()
+        for index in range(self.concurrency):
+            self._spawn(index)
+
+        for name, func, interval in self.periodic_tasks:
+            threading.Thread(
+                target=self._periodic_loop,
+                args=(name, func, interval),
+                name=f"periodic-{name}",
+                daemon=True
+            ).start()
+
+        logger.info(f"Review worker pool 已启动 - 并发数:{self.concurrency}, 周期任务:{[t[0] for t in self.periodic_tasks]}")
+
+        while not self._stopping.wait(1):
+            for index, process in list(self.processes.items()):
+                if not process.is_alive():
+                    logger.warning(f"Worker {process.name} 异常退出 (exitcode={process.exitcode})，重新启动")
+                    self._spawn(index)
+
+        self._shutdown()
+
+    def _spawn(self, index):
+        worker_id = f"{self.hostname}:{os.getpid()}:w{index}"
+        process = self._context.Process(
+            target=_worker_entrypoint,
+            args=(worker_id, self.poll_interval),
+            name=worker_id,
+            daemon=False
+        )
+        process.start()
+        self.processes[index] = process
+
+    def _periodic_loop(self, name, func, interval):
+        while not self._stopping.wait(interval):
+            try:
+                close_old_connections()
+                func()
+            except Exception as e:
+                logger.error(f"周期任务 {name} 执行失败: {e}", exc_info=True)
+        connections.close_all()
+
+    def _recover_expired_jobs(self):
+        recovered = ReviewJobQueue(request_id='supervisor').recover_expired()
+        if recovered:
+            logger.warning(f"恢复了 {recovered} 个租约过期的审查任务")
+
+    def _evict_repository_cache(self):
+        from .repository_cache import RepositoryCacheManager
+        RepositoryCacheManager(request_id='supervisor').run()
+
+    def _consume_webhook_spool(self):
+        from apps.webhook.spool import WebhookSpoolConsumer
+        WebhookSpoolConsumer(request_id='supervisor').drain()
+
+    def _send_notifications(self):
+        from apps.response.outbox import NotificationOutboxSender
+        NotificationOutboxSender(request_id='supervisor').drain()
+
+    def _archive_expired_records(self):
+        from apps.webhook.retention import RecordArchiver
+        RecordArchiver(request_id='supervisor').run()
+
+    def _warm_pushed_repositories(self):
+        from .repository_warmer import RepositoryWarmer
+        RepositoryWarmer(request_id='supervisor').process_requests()
+
+    def _warm_repositories(self):
+        from .repository_warmer import RepositoryWarmer
+        RepositoryWarmer(request_id='supervisor').warm_all()
+
+    def _handle_stop(self, signum, frame):
+        logger.info("Review worker pool 收到停止信号")
+        self._stopping.set()
+
+    def _shutdown(self):
+        """通知所有 worker 优雅退出"""
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes.values():
+            process.join()
+        logger.info("Review worker pool 已停止")
@@ -5,3 +5,7 @@ class WebhookConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.webhook'
     verbose_name = 'Webhook Management'
+
+    def ready(self):
+        # 注册全文索引与项目统计计数的增量更新信号
+        from . import search, stats  # noqa: F401
@@ -0,0 +1,119 @@
+"""
+Webhook Deduplication
+GitLab 在请求超时后会重试投递同一事件（X-Gitlab-Event-UUID 相同），重复投递在写入任何数据之前直接返回
+
+事件 UUID 先记入进程内 LRU（带过期时间），配置 Redis 时再以 SET NX EX 记入 Redis，
+多个 gunicorn 进程之间共享去重结果；Redis 不可用时仅按进程内记录去重
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from apps.common.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = 'code_review:webhook_event'
+
+# 按优先级读取的幂等请求头
+IDEMPOTENCY_HEADERS = ('HTTP_X_GITLAB_EVENT_UUID', 'HTTP_IDEMPOTENCY_KEY')
+
+
+class TTLCache:
+    """
+    带过期时间的 LRU 集合
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key, ttl):
+        """
+        记录 key
+
+        Returns:
+            bool: key 不存在（或已过期）时返回 True
+        """
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is not None and expires_at > now:
+                self._entries.move_to_end(key)
+                return False
+
+            self._entries[key] = now + ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+
+def _get_local_cache():
+    global _local_cache
+    if _local_cache is None:
+        with _local_cache_lock:
+            if _local_cache is None:
+                _local_cache = TTLCache(getattr(settings, 'WEBHOOK_DEDUP_MAX_ENTRIES', 10000))
+    return _local_cache
+
+
+def get_event_uuid(request):
+    """读取请求的事件 UUID / 幂等键，没有时返回 None"""
+    for header in IDEMPOTENCY_HEADERS:
+        value = (request.META.get(header) or '').strip()
+        if value:
+            return value
+    return None
+
+
+def claim_event(event_uuid):
+    """
+    登记一次事件投递
+
+    Args:
+        event_uuid: 事件 UUID
+
+    Returns:
+        bool: 首次投递返回 True，过期时间（WEBHOOK_DEDUP_TTL）内的重复投递返回 False
+    """
+    ttl = getattr(settings, 'WEBHOOK_DEDUP_TTL', 86400)
+    if not _get_local_cache().add(event_uuid, ttl):
+        return False
+
+    client = get_redis_client()
+    if client is None:
+        return True
+
+    try:
+        return bool(client.set(f"{REDIS_KEY_PREFIX}:{event_uuid}", 1, nx=True, ex=ttl))
+    except Exception as e:
+        logger.warning(f"Redis webhook 去重记录失败，仅按进程内记录去重: {e}")
+        return True
+
+
+def release_event(event_uuid):
+    """
+    事件未能接收或处理失败时撤销登记，允许 GitLab 重试
+
+    调用场景：同步处理返回 5xx、队列消费者放弃处理（请求移入 failed/）
+    """
+    _get_local_cache().discard(event_uuid)
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.delete(f"{REDIS_KEY_PREFIX}:{event_uuid}")
+        except Exception as e:
+            logger.warning(f"Redis webhook 去重记录撤销失败: {e}")
@@ -0,0 +1,48 @@
+"""
+归档并删除过期的 webhook 日志与审查记录
+
+使用方法:
+    python manage.py archive_records
+    python manage.py archive_records --log-days 30 --review-days 180 --dry-run
+"""
+from django.core.management.base import BaseCommand
+
+from apps.webhook.retention import RecordArchiver
+
+
+class Command(BaseCommand):
+    help = '将过期的 webhook 日志与已结束的审查记录写入压缩归档文件后删除，并保留聚合统计'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log-days',
+            type=int,
+            default=None,
+            help='webhook 日志保留天数（默认使用 WEBHOOK_LOG_RETENTION_DAYS，0 表示不清理）',
+        )
+        parser.add_argument(
+            '--review-days',
+            type=int,
+            default=None,
+            help='审查记录保留天数（默认使用 REVIEW_RETENTION_DAYS，0 表示不清理）',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只统计待归档的记录数，不归档不删除',
+        )
+
+    def handle(self, *args, **options):
+        archiver = RecordArchiver(request_id='archive')
+        result = archiver.run(
+            log_days=options['log_days'],
+            review_days=options['review_days'],
+            dry_run=options['dry_run']
+        )
+
+        action = '待归档' if options['dry_run'] else '已归档'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} webhook 日志 {result['webhook_logs']} 条，审查记录 {result['merge_request_reviews']} 条"
+        ))
+        if not options['dry_run']:
+            self.stdout.write(f"归档目录: {archiver.archive_path}")
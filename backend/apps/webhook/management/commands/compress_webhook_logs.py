@@ -0,0 +1,116 @@
+"""
+将已有 webhook 日志的 payload / 原始请求体转换为压缩存储（WEBHOOK_LOG_COMPRESSION）
+
+使用方法:
+    python manage.py compress_webhook_logs
+    python manage.py compress_webhook_logs --dry-run
+    python manage.py compress_webhook_logs --vacuum
+"""
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.common.compression import CODEC_NONE, resolve_codec
+from apps.webhook.models import WebhookLog
+
+
+class Command(BaseCommand):
+    help = '压缩已有 webhook 日志的 payload，只保留一份规范副本并统计回收的空间'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='每个事务处理的记录数（默认 500，避免长时间持有 SQLite 写锁）',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只统计可回收的空间，不修改数据库',
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='完成后执行 VACUUM，将空闲页归还给文件系统（仅 SQLite）',
+        )
+
+    def handle(self, *args, **options):
+        if resolve_codec(getattr(settings, 'WEBHOOK_LOG_COMPRESSION', 'zlib')) == CODEC_NONE:
+            raise CommandError('WEBHOOK_LOG_COMPRESSION 为 none，未启用压缩')
+
+        dry_run = options['dry_run']
+        batch_size = max(1, options['batch_size'])
+        if dry_run:
+            self.stdout.write(self.style.WARNING('运行在 DRY RUN 模式，不会实际修改数据'))
+
+        converted = 0
+        bytes_before = bytes_after = 0
+        last_id = 0
+        while True:
+            rows = list(
+                WebhookLog.objects.filter(id__gt=last_id, payload_blob__isnull=True)
+                .order_by('id')
+                .values_list('id', 'payload', 'request_body_raw')[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            with transaction.atomic():
+                for log_id, payload, request_body_raw in rows:
+                    payload = payload or ''
+                    request_body_raw = request_body_raw or ''
+                    fields = WebhookLog.build_payload_fields(
+                        request_body_raw,
+                        None if self._is_duplicate(payload, request_body_raw) else (payload or '{}')
+                    )
+
+                    bytes_before += len(payload.encode('utf-8')) + len(request_body_raw.encode('utf-8'))
+                    bytes_after += len(fields['payload_blob']) + len(fields['request_body_raw'].encode('utf-8'))
+                    converted += 1
+
+                    if not dry_run:
+                        WebhookLog.objects.filter(id=log_id, payload_blob__isnull=True).update(**fields)
+
+            self.stdout.write(f'已处理至 ID {last_id}，累计 {converted} 条')
+
+        action = '可回收' if dry_run else '已回收'
+        ratio = bytes_after / bytes_before if bytes_before else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{converted} 条日志 - 压缩前 {bytes_before / 1024 / 1024:.2f} MB，'
+            f'压缩后 {bytes_after / 1024 / 1024:.2f} MB（{ratio:.1%}），'
+            f'{action} {(bytes_before - bytes_after) / 1024 / 1024:.2f} MB'
+        ))
+
+        if options['vacuum'] and not dry_run:
+            self._vacuum()
+
+    @staticmethod
+    def _is_duplicate(payload, request_body_raw):
+        """payload 与原始请求体内容相同（或 payload 为空）时只保留原始请求体"""
+        if not payload:
+            return True
+        if not request_body_raw:
+            return False
+        try:
+            return json.loads(request_body_raw) == json.loads(payload)
+        except ValueError:
+            return False
+
+    def _vacuum(self):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.WARNING('VACUUM 仅支持 SQLite，已跳过'))
+            return
+
+        db_path = connection.settings_dict['NAME']
+        size_before = os.path.getsize(db_path)
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM')
+        size_after = os.path.getsize(db_path)
+        self.stdout.write(self.style.SUCCESS(
+            f'VACUUM 完成 - 数据库文件 {size_before / 1024 / 1024:.2f} MB -> {size_after / 1024 / 1024:.2f} MB'
+        ))
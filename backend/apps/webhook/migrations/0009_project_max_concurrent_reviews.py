@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook', '0008_add_log_level_and_skip_reason'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='max_concurrent_reviews',
+            field=models.PositiveIntegerField(blank=True, help_text='项目审查并发上限，留空使用全局默认值', null=True),
+        ),
+    ]
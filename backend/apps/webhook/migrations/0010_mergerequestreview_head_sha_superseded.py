@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook', '0009_project_max_concurrent_reviews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mergerequestreview',
+            name='head_sha',
+            field=models.CharField(blank=True, help_text='触发审查时 MR 的 HEAD 提交', max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mergerequestreview',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('superseded', 'Superseded')], db_index=True, default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook', '0010_mergerequestreview_head_sha_superseded'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhooklog',
+            name='payload_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='webhooklog',
+            name='payload_codec',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook', '0011_webhooklog_payload_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectDailyStat',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('project_id', models.IntegerField()),
+                ('date', models.DateField()),
+                ('webhook_count', models.IntegerField(default=0)),
+                ('event_types', models.TextField(default='{}')),
+                ('merge_request_iids', models.TextField(default='[]')),
+                ('member_emails', models.TextField(default='[]')),
+                ('review_count', models.IntegerField(default=0)),
+                ('review_statuses', models.TextField(default='{}')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'project_daily_stats',
+                'ordering': ['-date'],
+                'unique_together': {('project_id', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook', '0012_project_daily_stat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mergerequestreview',
+            index=models.Index(fields=['project_id', 'created_at'], name='merge_reque_project_6fb48f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='webhooklog',
+            index=models.Index(fields=['project_id', 'created_at'], name='webhook_log_project_073395_idx'),
+        ),
+    ]
@@ -0,0 +1,154 @@
+import json
+import logging
+import zlib
+
+from django.db import DatabaseError, migrations
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard 为可选依赖
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+LOG_INDEX_TABLE = 'webhook_logs_fts'
+REVIEW_INDEX_TABLE = 'merge_request_reviews_fts'
+
+LOG_INDEX_COLUMNS = ('project_name', 'event_type', 'user_name', 'branches', 'payload')
+REVIEW_INDEX_COLUMNS = ('project_name', 'merge_request_title', 'author_name', 'merge_request_iid', 'branches')
+
+MAX_INDEXED_COMMITS = 20
+MAX_FIELD_LENGTH = 2000
+
+
+def _decode_payload(payload, payload_blob, payload_codec, request_body_raw):
+    text = payload or ''
+    if not text and payload_blob is not None:
+        data = bytes(payload_blob)
+        if payload_codec == 'zlib':
+            text = zlib.decompress(data).decode('utf-8')
+        elif payload_codec == 'zstd' and zstandard is not None:
+            text = zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    text = text or request_body_raw or '{}'
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+
+def _payload_text(payload):
+    if not isinstance(payload, dict):
+        return ''
+
+    attributes = payload.get('object_attributes') or {}
+    project = payload.get('project') or {}
+    user = payload.get('user') or {}
+    last_commit = attributes.get('last_commit') or {}
+
+    parts = [
+        attributes.get('title'),
+        attributes.get('description'),
+        payload.get('ref'),
+        payload.get('after'),
+        project.get('path_with_namespace'),
+        user.get('username'),
+        payload.get('user_username'),
+        last_commit.get('id'),
+        last_commit.get('message'),
+    ]
+    for commit in (payload.get('commits') or [])[:MAX_INDEXED_COMMITS]:
+        if isinstance(commit, dict):
+            parts.append(commit.get('message'))
+
+    return '\n'.join(str(part)[:MAX_FIELD_LENGTH] for part in parts if part)
+
+
+def _branches(source_branch, target_branch):
+    return f"{source_branch or ''} {target_branch or ''}".strip()
+
+
+def _insert(cursor, table, columns, rows):
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO {table}(rowid, {', '.join(columns)}) "
+        f"VALUES (%s, {', '.join('%s' for _ in columns)})",
+        rows
+    )
+
+
+def create_search_index(apps, schema_editor):
+    """创建 FTS5 全文索引并写入已有记录（仅 SQLite）"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        try:
+            for table, columns in ((LOG_INDEX_TABLE, LOG_INDEX_COLUMNS), (REVIEW_INDEX_TABLE, REVIEW_INDEX_COLUMNS)):
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({', '.join(columns)}, tokenize='trigram')"
+                )
+        except DatabaseError as e:
+            logger.warning(f"SQLite 不支持 FTS5 trigram 分词，搜索将回退到 icontains 查询: {e}")
+            return
+
+        WebhookLog = apps.get_model('webhook', 'WebhookLog')
+        last_id = 0
+        while True:
+            rows = list(
+                WebhookLog.objects.filter(id__gt=last_id).order_by('id').values_list(
+                    'id', 'project_name', 'event_type', 'user_name', 'source_branch', 'target_branch',
+                    'payload', 'payload_blob', 'payload_codec', 'request_body_raw'
+                )[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            _insert(cursor, LOG_INDEX_TABLE, LOG_INDEX_COLUMNS, [
+                (
+                    row_id, project_name or '', event_type or '', user_name or '',
+                    _branches(source_branch, target_branch), _payload_text(_decode_payload(*payload_columns))
+                )
+                for row_id, project_name, event_type, user_name, source_branch, target_branch, *payload_columns
+                in rows
+            ])
+
+        MergeRequestReview = apps.get_model('webhook', 'MergeRequestReview')
+        last_id = 0
+        while True:
+            rows = list(
+                MergeRequestReview.objects.filter(id__gt=last_id).order_by('id').values_list(
+                    'id', 'project_name', 'merge_request_title', 'author_name', 'merge_request_iid',
+                    'source_branch', 'target_branch'
+                )[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            _insert(cursor, REVIEW_INDEX_TABLE, REVIEW_INDEX_COLUMNS, [
+                (
+                    row_id, project_name or '', title or '', author_name or '', str(iid or ''),
+                    _branches(source_branch, target_branch)
+                )
+                for row_id, project_name, title, author_name, iid, source_branch, target_branch in rows
+            ])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in (LOG_INDEX_TABLE, REVIEW_INDEX_TABLE):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook', '0013_project_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
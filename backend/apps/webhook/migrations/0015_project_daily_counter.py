@@ -0,0 +1,113 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:11
+
+import json
+from collections import Counter
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def _load_json(value, default):
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return default
+
+
+def build_counters(apps, schema_editor):
+    """由归档统计（ProjectDailyStat）与在线记录生成按天计数"""
+    ProjectDailyStat = apps.get_model('webhook', 'ProjectDailyStat')
+    WebhookLog = apps.get_model('webhook', 'WebhookLog')
+    MergeRequestReview = apps.get_model('webhook', 'MergeRequestReview')
+    ProjectDailyCounter = apps.get_model('webhook', 'ProjectDailyCounter')
+
+    counts = Counter()
+
+    def add(project_id, date, metric, key, amount=1):
+        counts[(project_id, date, metric, '' if key is None else str(key)[:255])] += amount
+
+    for stat in ProjectDailyStat.objects.all().iterator():
+        for event_type, count in _load_json(stat.event_types, {}).items():
+            add(stat.project_id, stat.date, 'webhook', event_type, count)
+        for iid in _load_json(stat.merge_request_iids, []):
+            add(stat.project_id, stat.date, 'merge_request', iid)
+        for email in _load_json(stat.member_emails, []):
+            add(stat.project_id, stat.date, 'member', email)
+        for review_status, count in _load_json(stat.review_statuses, {}).items():
+            add(stat.project_id, stat.date, 'review', review_status, count)
+
+    last_id = 0
+    while True:
+        rows = list(
+            WebhookLog.objects.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'project_id', 'created_at', 'event_type', 'merge_request_iid', 'user_email'
+            )[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        for _, project_id, created_at, event_type, iid, email in rows:
+            date = created_at.date()
+            add(project_id, date, 'webhook', event_type)
+            if event_type == 'merge_request':
+                add(project_id, date, 'merge_request', iid)
+            add(project_id, date, 'member', email)
+
+    last_id = 0
+    while True:
+        rows = list(
+            MergeRequestReview.objects.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'project_id', 'created_at', 'status'
+            )[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        for _, project_id, created_at, review_status in rows:
+            add(project_id, created_at.date(), 'review', review_status)
+
+    ProjectDailyCounter.objects.bulk_create(
+        [
+            ProjectDailyCounter(project_id=project_id, date=date, metric=metric, key=key, count=count)
+            for (project_id, date, metric, key), count in counts.items()
+        ],
+        batch_size=BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook', '0014_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectDailyCounter',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('project_id', models.IntegerField()),
+                ('date', models.DateField()),
+                ('metric', models.CharField(max_length=20)),
+                ('key', models.CharField(blank=True, default='', max_length=255)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'project_daily_counters',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='projectdailycounter',
+            index=models.Index(fields=['metric', 'date'], name='project_dai_metric_2b7d31_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='projectdailycounter',
+            unique_together={('project_id', 'date', 'metric', 'key')},
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='ProjectDailyStat',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 13:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook', '0015_project_daily_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='repository_warmed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 import json
 
+from apps.common.compression import compress_text, decompress_text
+
 
 class Project(models.Model):
     """
@@ -18,6 +21,7 @@ class Project(models.Model):
     review_enabled = models.BooleanField(default=False, db_index=True)
     auto_review_on_mr = models.BooleanField(default=True)
     gitlab_comment_notifications_enabled = models.BooleanField(default=True)
+    max_concurrent_reviews = models.PositiveIntegerField(null=True, blank=True, help_text="项目审查并发上限，留空使用全局默认值")
 
     # Webhook事件触发配置 - SQLite兼容的JSON字段
     # 存储此项目启用的WebhookEventRule ID列表
@@ -34,6 +38,8 @@ class Project(models.Model):
     created_at = models.DateTimeField(default=timezone.now, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_webhook_at = models.DateTimeField(null=True, blank=True)
+    # 首次预热项目镜像的时间：只对从未预热过的项目做一次首次预热，镜像被淘汰后不再重新预热
+    repository_warmed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'projects'
@@ -126,9 +132,14 @@ class WebhookLog(models.Model):
     source_branch = models.CharField(max_length=255)
     target_branch = models.CharField(max_length=255)
 
-    # SQLite兼容的JSON字段
+    # SQLite兼容的JSON字段（原始请求体即为 JSON 时留空，读取时从 request_body_raw 解析）
     payload = models.TextField(default='{}')
 
+    # 压缩存储的 payload（WEBHOOK_LOG_COMPRESSION），存在时 payload 留空；
+    # request_body_raw 为空表示原始请求体与其相同
+    payload_blob = models.BinaryField(null=True, blank=True)
+    payload_codec = models.CharField(max_length=10, blank=True, default='')
+
     # HTTP请求元数据
     request_headers = models.TextField(default='{}')  # JSON格式存储请求头
     request_body_raw = models.TextField(default='')   # 原始请求体
@@ -161,6 +172,7 @@ class WebhookLog(models.Model):
         indexes = [
             models.Index(fields=['event_type', 'created_at']),
             models.Index(fields=['project_id', 'merge_request_iid']),
+            models.Index(fields=['project_id', 'created_at']),
             models.Index(fields=['request_id']),
             models.Index(fields=['remote_addr']),
         ]
@@ -168,13 +180,63 @@ class WebhookLog(models.Model):
     def __str__(self):
         return f"{self.event_type} - {self.project_name} - MR#{self.merge_request_iid}"
 
+    @staticmethod
+    def build_payload_fields(request_body_raw, payload_json=None):
+        """
+        按 WEBHOOK_LOG_COMPRESSION 生成 payload 相关字段，只保存一份规范副本
+
+        Args:
+            request_body_raw: 原始请求体
+            payload_json: 与原始请求体不一致时的 payload JSON，一致时为 None
+
+        Returns:
+            dict: payload / payload_blob / payload_codec / request_body_raw 字段值
+        """
+        canonical = request_body_raw if payload_json is None else payload_json
+        codec, blob = compress_text(canonical, getattr(settings, 'WEBHOOK_LOG_COMPRESSION', 'zlib'))
+        if blob is None:
+            return {
+                'payload': payload_json or '',
+                'payload_blob': None,
+                'payload_codec': '',
+                'request_body_raw': request_body_raw,
+            }
+        return {
+            'payload': '',
+            'payload_blob': blob,
+            'payload_codec': codec,
+            'request_body_raw': '' if payload_json is None else request_body_raw,
+        }
+
+    def _payload_blob_text(self):
+        """解压后的 payload_blob，按实例缓存"""
+        if self.payload_blob is None:
+            return ''
+        cached = self.__dict__.get('_payload_blob_cache')
+        if cached is not None and cached[0] is self.payload_blob:
+            return cached[1]
+        text = decompress_text(self.payload_codec, self.payload_blob)
+        self.__dict__['_payload_blob_cache'] = (self.payload_blob, text)
+        return text
+
     # JSON字段的getter和setter方法
+    @property
+    def payload_text(self):
+        """payload 的 JSON 文本，按 payload、payload_blob、request_body_raw 的顺序读取"""
+        return self.payload or self._payload_blob_text() or self.request_body_raw or '{}'
+
+    @property
+    def request_body_text(self):
+        """原始请求体，与 payload 相同时从 payload_blob 读取"""
+        return self.request_body_raw or self._payload_blob_text()
+
     @property
     def payload_dict(self):
         try:
-            return json.loads(self.payload)
+            value = json.loads(self.payload_text)
         except (json.JSONDecodeError, TypeError):
             return {}
+        return value if isinstance(value, dict) else {}
 
     @payload_dict.setter
     def payload_dict(self, value):
@@ -205,6 +267,7 @@ class MergeRequestReview(models.Model):
     target_branch = models.CharField(max_length=255)
     author_name = models.CharField(max_length=255)
     author_email = models.EmailField()
+    head_sha = models.CharField(max_length=64, null=True, blank=True, help_text="触发审查时 MR 的 HEAD 提交")
 
     # Review results
     review_content = models.TextField()
@@ -220,6 +283,7 @@ class MergeRequestReview(models.Model):
             ('processing', 'Processing'),
             ('completed', 'Completed'),
             ('failed', 'Failed'),
+            ('superseded', 'Superseded'),
         ],
         default='pending',
         db_index=True
@@ -255,6 +319,7 @@ class MergeRequestReview(models.Model):
         indexes = [
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['project_id', 'merge_request_iid']),
+            models.Index(fields=['project_id', 'created_at']),
             models.Index(fields=['request_id']),
             models.Index(fields=['is_mock', 'created_at']),
         ]
@@ -286,6 +351,36 @@ class MergeRequestReview(models.Model):
         self.notification_result = json.dumps(value, ensure_ascii=False)
 
 
+class ProjectDailyCounter(models.Model):
+    """
+    项目按天统计计数
+    写入 webhook 日志与审查记录时增量更新，统计接口只读取计数行；日志与审查归档删除后计数保留
+    """
+    # metric -> key 的含义
+    METRIC_WEBHOOK = 'webhook'              # key: 事件类型
+    METRIC_MERGE_REQUEST = 'merge_request'  # key: MR IID
+    METRIC_MEMBER = 'member'                # key: 用户邮箱
+    METRIC_REVIEW = 'review'                # key: 审查状态，状态变化时旧状态减一、新状态加一
+
+    id = models.AutoField(primary_key=True)
+    project_id = models.IntegerField()
+    date = models.DateField()
+    metric = models.CharField(max_length=20)
+    key = models.CharField(max_length=255, blank=True, default='')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'project_daily_counters'
+        ordering = ['-date']
+        unique_together = ['project_id', 'date', 'metric', 'key']
+        indexes = [
+            models.Index(fields=['metric', 'date']),
+        ]
+
+    def __str__(self):
+        return f"Project {self.project_id} - {self.date} - {self.metric}:{self.key} = {self.count}"
+
+
 class ProjectNotificationSetting(models.Model):
     """项目选择的通知通道配置"""
 
@@ -0,0 +1,150 @@
+"""
+Record Retention
+超过保留天数的 webhook 日志与已结束的审查记录写入按日分区的压缩归档文件后删除，
+项目统计计数（ProjectDailyCounter）在写入时已累计，删除记录后统计接口的累计值保持不变
+
+归档文件：RETENTION_ARCHIVE_PATH/<表名>/<YYYY-MM>/<YYYY-MM-DD>.jsonl.zst（未安装 zstandard 时为 .jsonl.gz）
+每批记录先追加到归档文件并 fsync，再在短事务中删除，避免长时间持有 SQLite 写锁
+"""
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common.compression import compress_archive_chunk
+from .models import MergeRequestReview, WebhookLog
+
+logger = logging.getLogger(__name__)
+
+# 只归档已结束的审查，进行中的审查仍可能被 worker 更新
+FINISHED_REVIEW_STATUSES = ('completed', 'failed', 'superseded')
+
+
+class RecordArchiver:
+    """
+    webhook 日志与审查记录的归档清理
+    """
+
+    # 批次之间让出写锁的时间（秒）
+    BATCH_PAUSE = 0.05
+
+    def __init__(self, request_id=None, archive_path=None, batch_size=None):
+        self.request_id = request_id
+        self.archive_path = archive_path or settings.RETENTION_ARCHIVE_PATH
+        self.batch_size = batch_size or getattr(settings, 'RETENTION_BATCH_SIZE', 500)
+
+    def run(self, log_days=None, review_days=None, dry_run=False):
+        """
+        归档并删除过期记录
+
+        Args:
+            log_days: webhook 日志保留天数（默认 WEBHOOK_LOG_RETENTION_DAYS，0 表示不清理）
+            review_days: 审查记录保留天数（默认 REVIEW_RETENTION_DAYS，0 表示不清理）
+            dry_run: 只统计，不归档不删除
+
+        Returns:
+            dict: {'webhook_logs': 数量, 'merge_request_reviews': 数量}
+        """
+        if log_days is None:
+            log_days = getattr(settings, 'WEBHOOK_LOG_RETENTION_DAYS', 90)
+        if review_days is None:
+            review_days = getattr(settings, 'REVIEW_RETENTION_DAYS', 365)
+
+        result = {'webhook_logs': 0, 'merge_request_reviews': 0}
+        if log_days > 0:
+            result['webhook_logs'] = self._archive(
+                WebhookLog.objects.filter(created_at__lt=timezone.now() - timedelta(days=log_days)),
+                serialize=self._serialize_webhook_log,
+                dry_run=dry_run
+            )
+        if review_days > 0:
+            result['merge_request_reviews'] = self._archive(
+                MergeRequestReview.objects.filter(
+                    created_at__lt=timezone.now() - timedelta(days=review_days),
+                    status__in=FINISHED_REVIEW_STATUSES
+                ),
+                serialize=self._serialize_review,
+                dry_run=dry_run
+            )
+
+        if any(result.values()):
+            action = '待归档' if dry_run else '已归档'
+            logger.info(
+                f"[{self.request_id}] 过期记录{action} - webhook 日志:{result['webhook_logs']}, "
+                f"审查记录:{result['merge_request_reviews']}"
+            )
+        return result
+
+    def _archive(self, queryset, serialize, dry_run):
+        """按 ID 顺序分批归档 queryset 中的记录"""
+        model = queryset.model
+        table = model._meta.db_table
+        archived = 0
+        last_id = 0
+
+        while True:
+            rows = list(queryset.filter(id__gt=last_id).order_by('id')[:self.batch_size])
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            if dry_run:
+                archived += len(rows)
+                continue
+
+            self._write_archive(table, rows, serialize)
+
+            with transaction.atomic():
+                # 归档文件写入期间记录可能已变化，只删除仍满足条件的记录
+                ids = set(queryset.filter(id__in=[row.id for row in rows]).values_list('id', flat=True))
+                model.objects.filter(id__in=ids).delete()
+            archived += len(ids)
+
+            time.sleep(self.BATCH_PAUSE)
+
+        return archived
+
+    def _write_archive(self, table, rows, serialize):
+        """按 created_at 日期分组追加到归档文件"""
+        codec = getattr(settings, 'RETENTION_ARCHIVE_COMPRESSION', 'zstd')
+        by_day = defaultdict(list)
+        for row in rows:
+            by_day[row.created_at.date()].append(
+                json.dumps(serialize(row), cls=DjangoJSONEncoder, ensure_ascii=False)
+            )
+
+        for day, lines in by_day.items():
+            suffix, chunk = compress_archive_chunk(('\n'.join(lines) + '\n').encode('utf-8'), codec)
+            directory = os.path.join(self.archive_path, table, day.strftime('%Y-%m'))
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{day.isoformat()}{suffix}"), 'ab') as f:
+                f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+    @staticmethod
+    def _model_fields(instance, exclude=()):
+        return {
+            field.attname: getattr(instance, field.attname)
+            for field in instance._meta.concrete_fields
+            if field.attname not in exclude
+        }
+
+    def _serialize_webhook_log(self, log):
+        data = self._model_fields(log, exclude=('payload', 'payload_blob', 'payload_codec', 'request_body_raw'))
+        data['payload'] = log.payload_dict
+        data['request_headers'] = log.request_headers_dict
+        # 原始请求体与 payload 相同时不重复归档
+        if log.request_body_raw:
+            data['request_body_raw'] = log.request_body_raw
+        return data
+
+    def _serialize_review(self, review):
+        return self._model_fields(review)
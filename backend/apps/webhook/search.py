@@ -0,0 +1,187 @@
+"""
+Search Index
+webhook 日志与审查记录的全文索引：SQLite FTS5 trigram 分词，支持大小写不敏感的任意子串匹配
+
+记录创建时（post_save）增量写入索引，删除时（post_delete）同步移除；
+非 SQLite 数据库或 FTS5 不可用时回退到原有的 icontains 查询
+"""
+import logging
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+from .models import MergeRequestReview, WebhookLog
+
+logger = logging.getLogger(__name__)
+
+LOG_INDEX_TABLE = 'webhook_logs_fts'
+REVIEW_INDEX_TABLE = 'merge_request_reviews_fts'
+
+LOG_INDEX_COLUMNS = ('project_name', 'event_type', 'user_name', 'branches', 'payload')
+REVIEW_INDEX_COLUMNS = ('project_name', 'merge_request_title', 'author_name', 'merge_request_iid', 'branches')
+
+# trigram 分词要求查询词至少 3 个字符
+MIN_TERM_LENGTH = 3
+
+# 索引的 push 提交说明数量与单个字段长度上限
+MAX_INDEXED_COMMITS = 20
+MAX_FIELD_LENGTH = 2000
+
+_available = None
+
+
+def search_index_available():
+    """当前数据库是否已建立全文索引"""
+    global _available
+    if _available is None:
+        _available = connection.vendor == 'sqlite' and LOG_INDEX_TABLE in connection.introspection.table_names()
+    return _available
+
+
+def extract_payload_text(payload):
+    """提取 payload 中参与搜索的字段：标题、描述、分支、路径、用户名、提交说明与 SHA"""
+    if not isinstance(payload, dict):
+        return ''
+
+    attributes = payload.get('object_attributes') or {}
+    project = payload.get('project') or {}
+    user = payload.get('user') or {}
+    last_commit = attributes.get('last_commit') or {}
+
+    parts = [
+        attributes.get('title'),
+        attributes.get('description'),
+        payload.get('ref'),
+        payload.get('after'),
+        project.get('path_with_namespace'),
+        user.get('username'),
+        payload.get('user_username'),
+        last_commit.get('id'),
+        last_commit.get('message'),
+    ]
+    for commit in (payload.get('commits') or [])[:MAX_INDEXED_COMMITS]:
+        if isinstance(commit, dict):
+            parts.append(commit.get('message'))
+
+    return '\n'.join(str(part)[:MAX_FIELD_LENGTH] for part in parts if part)
+
+
+def log_document(project_name, event_type, user_name, source_branch, target_branch, payload):
+    return (
+        project_name or '',
+        event_type or '',
+        user_name or '',
+        f"{source_branch or ''} {target_branch or ''}".strip(),
+        extract_payload_text(payload),
+    )
+
+
+def review_document(project_name, merge_request_title, author_name, merge_request_iid, source_branch, target_branch):
+    return (
+        project_name or '',
+        merge_request_title or '',
+        author_name or '',
+        str(merge_request_iid or ''),
+        f"{source_branch or ''} {target_branch or ''}".strip(),
+    )
+
+
+def insert_documents(cursor, table, columns, rows):
+    """
+    写入索引
+
+    Args:
+        rows: [(rowid, document), ...]
+    """
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO {table}(rowid, {', '.join(columns)}) "
+        f"VALUES (%s, {', '.join('%s' for _ in columns)})",
+        [(rowid, *document) for rowid, document in rows]
+    )
+
+
+def filter_logs(queryset, search):
+    """按搜索词过滤 webhook 日志"""
+    term = search.strip()
+    if search_index_available() and len(term) >= MIN_TERM_LENGTH:
+        return queryset.filter(id__in=_match(LOG_INDEX_TABLE, term))
+
+    condition = (
+        Q(project_name__icontains=term) |
+        Q(event_type__icontains=term) |
+        Q(user_name__icontains=term)
+    )
+    if not search_index_available():
+        # 无索引时保持原有行为：扫描未压缩的 payload
+        condition |= Q(payload__icontains=term) | Q(request_body_raw__icontains=term)
+    return queryset.filter(condition)
+
+
+def filter_reviews(queryset, search):
+    """按搜索词过滤审查记录"""
+    term = search.strip()
+    if search_index_available() and len(term) >= MIN_TERM_LENGTH:
+        return queryset.filter(id__in=_match(REVIEW_INDEX_TABLE, term))
+
+    return queryset.filter(
+        Q(project_name__icontains=term) |
+        Q(merge_request_title__icontains=term) |
+        Q(author_name__icontains=term) |
+        Q(merge_request_iid__icontains=term)
+    )
+
+
+def _match(table, term):
+    # 整个搜索词作为一个短语，双引号转义
+    phrase = '"' + term.replace('"', '""') + '"'
+    return RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", (phrase,))
+
+
+def _on_log_saved(sender, instance, created, **kwargs):
+    if not created or not search_index_available():
+        return
+    try:
+        # 保存点隔离索引写入失败，不影响外层事务
+        with transaction.atomic(), connection.cursor() as cursor:
+            insert_documents(cursor, LOG_INDEX_TABLE, LOG_INDEX_COLUMNS, [(instance.id, log_document(
+                instance.project_name, instance.event_type, instance.user_name,
+                instance.source_branch, instance.target_branch, instance.payload_dict
+            ))])
+    except DatabaseError as e:
+        logger.warning(f"webhook 日志 {instance.id} 写入搜索索引失败: {e}")
+
+
+def _on_review_saved(sender, instance, created, **kwargs):
+    if not created or not search_index_available():
+        return
+    try:
+        # 保存点隔离索引写入失败，不影响外层事务
+        with transaction.atomic(), connection.cursor() as cursor:
+            insert_documents(cursor, REVIEW_INDEX_TABLE, REVIEW_INDEX_COLUMNS, [(instance.id, review_document(
+                instance.project_name, instance.merge_request_title, instance.author_name,
+                instance.merge_request_iid, instance.source_branch, instance.target_branch
+            ))])
+    except DatabaseError as e:
+        logger.warning(f"审查记录 {instance.id} 写入搜索索引失败: {e}")
+
+
+def _on_deleted(table):
+    def handler(sender, instance, **kwargs):
+        if not search_index_available():
+            return
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [instance.id])
+        except DatabaseError as e:
+            logger.warning(f"从搜索索引 {table} 移除记录 {instance.id} 失败: {e}")
+    return handler
+
+
+post_save.connect(_on_log_saved, sender=WebhookLog, dispatch_uid='search_index_log_save')
+post_save.connect(_on_review_saved, sender=MergeRequestReview, dispatch_uid='search_index_review_save')
+post_delete.connect(_on_deleted(LOG_INDEX_TABLE), sender=WebhookLog, dispatch_uid='search_index_log_delete', weak=False)
+post_delete.connect(
+    _on_deleted(REVIEW_INDEX_TABLE), sender=MergeRequestReview, dispatch_uid='search_index_review_delete', weak=False
+)
@@ -4,6 +4,7 @@ from django.conf import settings
 from django.utils import timezone
 import pytz
 from .models import WebhookLog, MergeRequestReview, Project, ProjectNotificationSetting, ProjectWebhookEventPrompt
+from .stats import get_project_rollup
 from apps.llm.models import NotificationChannel, WebhookEventRule
 
 
@@ -52,25 +53,24 @@ class ProjectSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['_id', 'created_at', 'updated_at', 'last_webhook_at']
 
+    def _get_rollup(self, obj):
+        """项目累计统计计数，同一项目只查询一次"""
+        cache = self.__dict__.setdefault('_rollups', {})
+        if obj.project_id not in cache:
+            cache[obj.project_id] = get_project_rollup(obj.project_id)
+        return cache[obj.project_id]
+
     def get_commits_count(self, obj):
         """Get commit count from webhook logs"""
-        return WebhookLog.objects.filter(
-            project_id=obj.project_id,
-            event_type='push'
-        ).count()
+        return self._get_rollup(obj)['event_types'].get('push', 0)
 
     def get_mr_count(self, obj):
         """Get merge request count from webhook logs"""
-        return WebhookLog.objects.filter(
-            project_id=obj.project_id,
-            event_type='merge_request'
-        ).values('merge_request_iid').distinct().count()
+        return self._get_rollup(obj)['merge_request_count']
 
     def get_members_count(self, obj):
         """Get unique members count from webhook logs"""
-        return WebhookLog.objects.filter(
-            project_id=obj.project_id
-        ).values('user_email').distinct().count()
+        return self._get_rollup(obj)['member_count']
 
     def get_last_activity(self, obj):
         """Get formatted last activity time"""
@@ -161,6 +161,7 @@ class ProjectUpdateSerializer(serializers.ModelSerializer):
             'exclude_file_types',
             'ignore_file_patterns',
             'gitlab_comment_notifications_enabled',
+            'max_concurrent_reviews',
         ]
 
 
@@ -219,10 +220,12 @@ class WebhookLogSerializer(serializers.ModelSerializer):
     # 使用本地时区字段
     created_at = LocalDateTimeField(read_only=True)
     processed_at = LocalDateTimeField(read_only=True)
-    
+    payload = serializers.CharField(source='payload_text', read_only=True)
+    request_body_raw = serializers.CharField(source='request_body_text', read_only=True)
+
     class Meta:
         model = WebhookLog
-        fields = '__all__'
+        exclude = ['payload_blob', 'payload_codec']
         read_only_fields = ['_id', 'created_at', 'processed_at']
 
 
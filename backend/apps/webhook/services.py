@@ -7,14 +7,13 @@ from urllib.parse import urlparse, urlunparse
 
 from django.conf import settings
 from django.utils import timezone
-from django.db import models
 
 import pytz
 
 try:
-    from apps.llm.models import GitLabConfig
+    from apps.llm.config_cache import get_active_gitlab_config
 except Exception:  # pragma: no cover - fallback when config model unavailable
-    GitLabConfig = None
+    get_active_gitlab_config = None
 
 from .models import Project, WebhookLog, MergeRequestReview
 
@@ -115,10 +114,10 @@ class ProjectService:
     @staticmethod
     def _get_gitlab_base_url():
         """Resolve GitLab base URL from config or settings."""
-        if GitLabConfig:
-            config = GitLabConfig.objects.filter(is_active=True).values_list('server_url', flat=True).first()
-            if config:
-                return config
+        if get_active_gitlab_config:
+            config = get_active_gitlab_config()
+            if config and config.server_url:
+                return config.server_url
 
         return None
 
@@ -295,22 +294,15 @@ class ProjectService:
         enabled = Project.objects.filter(review_enabled=True).count()
         disabled = total - enabled
 
-        # Weekly statistics
-        week_ago = timezone.now() - timedelta(days=7)
-        weekly_reviews = MergeRequestReview.objects.filter(
-            created_at__gte=week_ago,
-            status='completed'
-        ).count()
-
-        # Recent events (last 24 hours)
-        day_ago = timezone.now() - timedelta(hours=24)
-        recent_events = WebhookLog.objects.filter(
-            created_at__gte=day_ago
-        ).count()
+        # 时间窗口统计读取按天计数（滚动窗口，窗口起点所在日期按比例计入）
+        from .stats import get_window_totals
+        windows = get_window_totals()
+        weekly_reviews = windows[7]['completed_reviews']
+        recent_events = windows[1]['webhooks']
 
         # Active projects (projects with recent webhook events)
         active_projects = Project.objects.filter(
-            last_webhook_at__gte=week_ago
+            last_webhook_at__gte=timezone.now() - timedelta(days=7)
         ).count()
 
         return {
@@ -320,7 +312,9 @@ class ProjectService:
             'review_disabled': disabled,
             'weekly_reviews': weekly_reviews,
             'recent_events': recent_events,
-            'recent_events_24h': recent_events
+            'recent_events_24h': recent_events,
+            'monthly_reviews': windows[30]['completed_reviews'],
+            'monthly_events': windows[30]['webhooks']
         }
 
     @staticmethod
@@ -339,44 +333,36 @@ class ProjectService:
         except Project.DoesNotExist:
             return None
 
-        # Time ranges
-        week_ago = timezone.now() - timedelta(days=7)
-        day_ago = timezone.now() - timedelta(hours=24)
+        # 累计与时间窗口统计均读取按天计数（含已归档记录）
+        from .stats import get_project_rollup, get_window_totals
+        rollup = get_project_rollup(project_id)
+        windows = get_window_totals(project_id=project_id)
 
         # Webhook statistics
-        total_webhooks = WebhookLog.objects.filter(project_id=project_id).count()
-        recent_webhooks = WebhookLog.objects.filter(
-            project_id=project_id,
-            created_at__gte=week_ago
-        ).count()
+        total_webhooks = rollup['webhook_count']
+        recent_webhooks = windows[7]['webhooks']
 
         # Merge request statistics
-        total_mrs = WebhookLog.objects.filter(
-            project_id=project_id,
-            event_type='merge_request'
-        ).values('merge_request_iid').distinct().count()
+        total_mrs = rollup['merge_request_count']
 
         # Review statistics
-        total_reviews = MergeRequestReview.objects.filter(project_id=project_id).count()
-        completed_reviews = MergeRequestReview.objects.filter(
-            project_id=project_id,
-            status='completed'
-        ).count()
-        weekly_reviews = MergeRequestReview.objects.filter(
-            project_id=project_id,
-            created_at__gte=week_ago,
-            status='completed'
-        ).count()
+        total_reviews = rollup['review_count']
+        completed_reviews = rollup['review_statuses'].get('completed', 0)
+        weekly_reviews = windows[7]['completed_reviews']
 
         # Member statistics
-        unique_members = WebhookLog.objects.filter(
-            project_id=project_id
-        ).values('user_email').distinct().count()
+        unique_members = rollup['member_count']
 
         # Event type distribution
-        event_types = WebhookLog.objects.filter(
-            project_id=project_id
-        ).values('event_type').annotate(count=models.Count('event_type'))
+        event_types = [
+            {'event_type': event_type, 'count': count}
+            for event_type, count in rollup['event_types'].items()
+            if count
+        ]
+
+        # Review queue statistics
+        from apps.review.scheduler import FairReviewScheduler
+        queue_stats = FairReviewScheduler().get_project_queue_stats(project_id)
 
         return {
             'project': {
@@ -389,6 +375,8 @@ class ProjectService:
             'webhooks': {
                 'total': total_webhooks,
                 'recent': recent_webhooks,
+                'today': windows[1]['webhooks'],
+                'monthly': windows[30]['webhooks'],
                 'event_types': list(event_types)
             },
             'merge_requests': {
@@ -398,11 +386,13 @@ class ProjectService:
                 'total': total_reviews,
                 'completed': completed_reviews,
                 'weekly': weekly_reviews,
+                'monthly': windows[30]['completed_reviews'],
                 'completion_rate': (completed_reviews / total_reviews * 100) if total_reviews > 0 else 0
             },
             'members': {
                 'unique_count': unique_members
-            }
+            },
+            'queue': queue_stats
         }
 
     @staticmethod
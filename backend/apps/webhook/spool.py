@@ -0,0 +1,212 @@
+"""
+Webhook Spool
+Webhook 快速确认：接收端只把原始请求写入本地磁盘队列即返回，日志记录、规则匹配与审查调度由 worker 进程池中的消费任务完成
+
+目录结构（WEBHOOK_SPOOL_PATH）：
+    tmp/         写入中的文件，写完后原子 rename 到 incoming/
+    incoming/    待处理，文件名以纳秒时间戳开头，按名称排序即按接收顺序处理
+    processing/  已被消费者认领（rename 保证只有一个消费者认领成功）
+    failed/      处理时抛出异常（或返回 5xx）的请求，保留以便排查
+
+请求移入 failed/ 时撤销其事件 UUID 的去重登记（dedup.release_event），GitLab 重试投递同一事件时会被重新接收；
+去重记录只保存在进程内（未配置 Redis）时，接收端进程中的登记在 WEBHOOK_DEDUP_TTL 过期前仍然有效
+"""
+import json
+import logging
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIRS = ('tmp', 'incoming', 'processing', 'failed')
+
+# 已确认存在的队列目录，避免每个请求都执行 mkdir
+_prepared_paths = set()
+
+
+class SpooledWebhookRequest:
+    """
+    从队列文件还原的请求，提供 process_webhook_request 需要的 data/META/body
+    """
+
+    def __init__(self, envelope):
+        self.META = dict(envelope.get('meta') or {})
+        self.body = (envelope.get('body') or '').encode('utf-8')
+        try:
+            data = json.loads(self.body) if self.body else {}
+        except ValueError:
+            data = {}
+        self.data = data if isinstance(data, dict) else {}
+
+
+class WebhookSpool:
+    """
+    基于本地目录的 webhook 请求队列
+    """
+
+    def __init__(self, base_path=None):
+        self.base_path = base_path or settings.WEBHOOK_SPOOL_PATH
+        if self.base_path not in _prepared_paths:
+            for name in SPOOL_DIRS:
+                os.makedirs(os.path.join(self.base_path, name), exist_ok=True)
+            _prepared_paths.add(self.base_path)
+
+    def _path(self, directory, name=''):
+        return os.path.join(self.base_path, directory, name)
+
+    def append(self, request):
+        """
+        写入请求的原始内容
+
+        Args:
+            request: Django/DRF 请求
+
+        Returns:
+            str: 请求ID
+        """
+        request_id = str(uuid.uuid4())
+        meta = {
+            key: value for key, value in request.META.items()
+            if key.startswith('HTTP_') and isinstance(value, str)
+        }
+        meta['REMOTE_ADDR'] = request.META.get('REMOTE_ADDR')
+        envelope = {
+            'request_id': request_id,
+            'received_at': timezone.now().isoformat(),
+            'meta': meta,
+            'body': request.body.decode('utf-8', errors='replace'),
+        }
+
+        name = f"{time.time_ns():020d}-{request_id}.json"
+        tmp_path = self._path('tmp', name)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(envelope, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path('incoming', name))
+        return request_id
+
+    def claim(self, limit):
+        """
+        认领最早的若干个请求
+
+        Returns:
+            list[str]: processing/ 下的文件路径
+        """
+        claimed = []
+        for name in sorted(os.listdir(self._path('incoming'))):
+            if len(claimed) >= limit:
+                break
+            if not name.endswith('.json'):
+                continue
+            target = self._path('processing', name)
+            try:
+                os.rename(self._path('incoming', name), target)
+            except FileNotFoundError:
+                # 已被其他消费者认领
+                continue
+            # rename 保留写入时间，刷新为认领时间用于判断处理超时
+            os.utime(target)
+            claimed.append(target)
+        return claimed
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def ack(self, path):
+        """处理完成，删除文件"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def fail(self, path):
+        """处理失败，移入 failed/"""
+        try:
+            os.replace(path, self._path('failed', os.path.basename(path)))
+        except FileNotFoundError:
+            pass
+
+    def requeue_stale(self, timeout):
+        """
+        将认领后超时未完成的请求放回 incoming/（消费者进程崩溃等情况）
+
+        Returns:
+            int: 放回的请求数量
+        """
+        deadline = time.time() - timeout
+        requeued = 0
+        for name in os.listdir(self._path('processing')):
+            path = self._path('processing', name)
+            try:
+                if os.path.getmtime(path) > deadline:
+                    continue
+                os.rename(path, self._path('incoming', name))
+                requeued += 1
+            except FileNotFoundError:
+                continue
+        return requeued
+
+    def stats(self):
+        """各目录中的请求数量"""
+        return {name: len(os.listdir(self._path(name))) for name in SPOOL_DIRS if name != 'tmp'}
+
+
+class WebhookSpoolConsumer:
+    """
+    Webhook 队列消费者，在 worker 进程池中周期执行
+    """
+
+    # 每轮最多处理的请求数量
+    BATCH_SIZE = 100
+
+    def __init__(self, request_id=None, spool=None):
+        self.request_id = request_id
+        self.spool = spool or WebhookSpool()
+
+    def drain(self):
+        """
+        处理队列中的请求直到队列为空
+
+        Returns:
+            (processed_count, failed_count)
+        """
+        from .dedup import get_event_uuid, release_event
+        from .views import process_webhook_request
+
+        timeout = getattr(settings, 'WEBHOOK_SPOOL_PROCESSING_TIMEOUT', 300)
+        requeued = self.spool.requeue_stale(timeout)
+        if requeued:
+            logger.warning(f"[{self.request_id}] {requeued} 个 webhook 请求处理超时，已重新入队")
+
+        processed = failed = 0
+        while True:
+            paths = self.spool.claim(self.BATCH_SIZE)
+            if not paths:
+                break
+            for path in paths:
+                request = None
+                try:
+                    envelope = self.spool.load(path)
+                    request = SpooledWebhookRequest(envelope)
+                    response = process_webhook_request(request, request_id=envelope.get('request_id'))
+                    if response.status_code >= 500:
+                        raise RuntimeError(f"处理返回 {response.status_code}: {getattr(response, 'data', '')}")
+                except Exception as e:
+                    logger.error(f"[{self.request_id}] webhook 请求处理失败，已移入 failed/: {path} - {e}", exc_info=True)
+                    self.spool.fail(path)
+                    failed += 1
+                    # 放弃处理的事件允许 GitLab 重试投递
+                    event_uuid = get_event_uuid(request) if request is not None else None
+                    if event_uuid:
+                        release_event(event_uuid)
+                else:
+                    self.spool.ack(path)
+                    processed += 1
+
+        if processed or failed:
+            logger.info(f"[{self.request_id}] webhook 队列处理完成 - 成功:{processed}, 失败:{failed}")
+        return processed, failed
@@ -0,0 +1,194 @@
+"""
+Project Stats Rollup
+项目按天统计计数（ProjectDailyCounter）：写入 webhook 日志与审查记录时增量更新，
+项目统计（累计与最近 24 小时 / 7 天 / 30 天滚动窗口）只读取 O(天数) 行计数，不再对日志表做 COUNT / DISTINCT 扫描
+
+审查状态变化（save 或 update_review_status）时旧状态计数减一、新状态加一，
+计数始终反映每条审查的当前状态；归档删除记录不影响计数
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from .models import MergeRequestReview, ProjectDailyCounter, WebhookLog
+
+logger = logging.getLogger(__name__)
+
+
+def incr(project_id, date, metric, key, amount=1):
+    """原子地增加计数，不存在时创建"""
+    key = '' if key is None else str(key)[:255]
+    counters = ProjectDailyCounter.objects.filter(project_id=project_id, date=date, metric=metric, key=key)
+    if counters.update(count=F('count') + amount):
+        return
+    try:
+        # 保存点：并发创建失败时不影响外层事务
+        with transaction.atomic():
+            ProjectDailyCounter.objects.create(project_id=project_id, date=date, metric=metric, key=key, count=amount)
+    except IntegrityError:
+        counters.update(count=F('count') + amount)
+
+
+def record_webhook_log(log):
+    """记录一条新的 webhook 日志"""
+    date = log.created_at.date()
+    incr(log.project_id, date, ProjectDailyCounter.METRIC_WEBHOOK, log.event_type)
+    if log.event_type == 'merge_request':
+        incr(log.project_id, date, ProjectDailyCounter.METRIC_MERGE_REQUEST, log.merge_request_iid)
+    incr(log.project_id, date, ProjectDailyCounter.METRIC_MEMBER, log.user_email)
+
+
+def record_review_status(project_id, created_at, old_status, new_status):
+    """
+    记录审查状态变化（按审查创建日期计入）
+
+    Args:
+        old_status: 原状态，新建审查为 None
+    """
+    date = created_at.date()
+    if old_status is not None:
+        incr(project_id, date, ProjectDailyCounter.METRIC_REVIEW, old_status, -1)
+    incr(project_id, date, ProjectDailyCounter.METRIC_REVIEW, new_status)
+
+
+def update_review_status(queryset, status, **fields):
+    """
+    批量更新审查状态并同步统计计数，替代 queryset.update(status=...)
+
+    逐条以原状态为条件更新，保证计数与实际发生的状态变化一致
+
+    Args:
+        queryset: 待更新的审查
+        status: 新状态
+        fields: 同时更新的其他字段
+
+    Returns:
+        int: 更新的记录数
+    """
+    updated = 0
+    for pk, old_status, project_id, created_at in queryset.values_list('id', 'status', 'project_id', 'created_at'):
+        with transaction.atomic():
+            if not MergeRequestReview.objects.filter(pk=pk, status=old_status).update(status=status, **fields):
+                continue
+            if old_status != status:
+                record_review_status(project_id, created_at, old_status, status)
+        updated += 1
+    return updated
+
+
+def get_project_rollup(project_id):
+    """
+    汇总项目的全部统计计数
+
+    Returns:
+        dict: webhook_count / event_types / merge_request_count / member_count / review_count / review_statuses
+    """
+    result = {
+        'webhook_count': 0,
+        'event_types': defaultdict(int),
+        'merge_request_count': 0,
+        'member_count': 0,
+        'review_count': 0,
+        'review_statuses': defaultdict(int),
+    }
+    rows = (
+        ProjectDailyCounter.objects.filter(project_id=project_id)
+        .values('metric', 'key')
+        .annotate(total=Sum('count'))
+        .order_by()
+    )
+    for row in rows:
+        metric, key, total = row['metric'], row['key'], row['total']
+        if metric == ProjectDailyCounter.METRIC_WEBHOOK:
+            result['webhook_count'] += total
+            result['event_types'][key] += total
+        elif metric == ProjectDailyCounter.METRIC_MERGE_REQUEST:
+            result['merge_request_count'] += 1
+        elif metric == ProjectDailyCounter.METRIC_MEMBER:
+            result['member_count'] += 1
+        elif metric == ProjectDailyCounter.METRIC_REVIEW:
+            result['review_count'] += total
+            result['review_statuses'][key] += total
+    return result
+
+
+def get_window_totals(windows=(1, 7, 30), project_id=None):
+    """
+    汇总最近 N×24 小时的 webhook 数量与已完成审查数量（滚动窗口），所有窗口在一条查询中求和
+
+    计数按天存放：窗口内的完整日期（今天及之前 N-1 天）全部计入，窗口起点所在的那一天
+    按未过去的比例计入（如现在是 06:00，24 小时窗口计入今天全部与昨天的 3/4），结果为近似值
+
+    Args:
+        windows: 窗口天数列表
+        project_id: 只统计指定项目（默认全部项目）
+
+    Returns:
+        dict: {天数: {'webhooks': 数量, 'completed_reviews': 数量}}
+    """
+    now = timezone.now()
+    today = now.date()
+    elapsed = (now - datetime.combine(today, time.min, tzinfo=now.tzinfo)).total_seconds()
+    tail_ratio = max(0.0, 1 - elapsed / 86400)
+
+    aggregates = {}
+    for days in windows:
+        tail = today - timedelta(days=days)
+        for name, condition in (
+            ('webhooks', Q(metric=ProjectDailyCounter.METRIC_WEBHOOK)),
+            ('completed_reviews', Q(metric=ProjectDailyCounter.METRIC_REVIEW, key='completed')),
+        ):
+            aggregates[f'{name}_{days}'] = Sum('count', filter=condition & Q(date__gt=tail))
+            aggregates[f'{name}_{days}_tail'] = Sum('count', filter=condition & Q(date=tail))
+
+    counters = ProjectDailyCounter.objects.filter(
+        metric__in=[ProjectDailyCounter.METRIC_WEBHOOK, ProjectDailyCounter.METRIC_REVIEW],
+        date__gte=today - timedelta(days=max(windows)),
+    )
+    if project_id is not None:
+        counters = counters.filter(project_id=project_id)
+    totals = counters.aggregate(**aggregates)
+
+    def window_total(name, days):
+        return (totals[f'{name}_{days}'] or 0) + round((totals[f'{name}_{days}_tail'] or 0) * tail_ratio)
+
+    return {
+        days: {
+            'webhooks': window_total('webhooks', days),
+            'completed_reviews': window_total('completed_reviews', days),
+        }
+        for days in windows
+    }
+
+
+def _on_log_saved(sender, instance, created, **kwargs):
+    if created:
+        record_webhook_log(instance)
+
+
+def _on_review_pre_save(sender, instance, update_fields=None, **kwargs):
+    # 读取数据库中的当前状态：内存中的实例可能已被 update_review_status 等批量更新过期
+    instance._stats_old_status = None
+    if instance.pk is None or (update_fields is not None and 'status' not in update_fields):
+        return
+    instance._stats_old_status = (
+        MergeRequestReview.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    )
+
+
+def _on_review_saved(sender, instance, created, **kwargs):
+    old_status = getattr(instance, '_stats_old_status', None)
+    if created:
+        record_review_status(instance.project_id, instance.created_at, None, instance.status)
+    elif old_status is not None and old_status != instance.status:
+        record_review_status(instance.project_id, instance.created_at, old_status, instance.status)
+
+
+post_save.connect(_on_log_saved, sender=WebhookLog, dispatch_uid='project_stats_log_save')
+pre_save.connect(_on_review_pre_save, sender=MergeRequestReview, dispatch_uid='project_stats_review_pre_save')
+post_save.connect(_on_review_saved, sender=MergeRequestReview, dispatch_uid='project_stats_review_save')
@@ -1,8 +1,9 @@
+import hmac
 import json
 import logging
-import threading
 import uuid
 import time
+from django.conf import settings
 from django.utils import timezone
 from django.db import models, transaction
 from rest_framework import status
@@ -20,13 +21,24 @@ from .serializers import (
     ProjectNotificationUpdateSerializer
 )
 from .services import ProjectService
+from .dedup import claim_event, get_event_uuid, release_event
+from .search import filter_logs, filter_reviews
+from .stats import update_review_status
+from .spool import WebhookSpool
 from django.core.exceptions import ImproperlyConfigured
 from apps.review.services import GitlabService, ReviewService
-from apps.llm.models import LLMConfig
+from apps.review.job_queue import ReviewJobQueue
+from apps.review.repository_warmer import RepositoryWarmer
+from apps.llm.config_cache import get_active_llm_config
+from apps.llm.rule_index import get_rule_index
 from apps.common.logging_utils import get_logger, TimerContext
+from apps.common.pagination import bounded_count, encode_cursor, keyset_page
 
 logger = logging.getLogger(__name__)
 
+# 处理结果只更新状态字段，不重写请求内容
+WEBHOOK_LOG_SKIP_FIELDS = ['processed', 'processed_at', 'log_level', 'skip_reason']
+WEBHOOK_LOG_ERROR_FIELDS = ['processed', 'processed_at', 'log_level', 'error_message']
 
 
 @api_view(['POST'])
@@ -35,14 +47,63 @@ def gitlab_webhook(request):
     GitLab Webhook endpoint
     Handles incoming webhook events from GitLab
 
+    快速确认：校验 X-Gitlab-Token、按 X-Gitlab-Event-UUID 去重后将原始请求写入本地队列并立即返回，
+    日志记录、规则匹配与审查调度由 worker 进程池中的消费任务完成（WEBHOOK_ASYNC_ENABLED=False 时同步处理）
+    """
+    if not verify_webhook_token(request):
+        logger.warning(f"Webhook token 校验失败 - {request.META.get('REMOTE_ADDR')}")
+        return Response(
+            {'status': 'error', 'message': 'Invalid webhook token'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    # GitLab 超时重试的重复投递在写入任何数据之前直接返回
+    event_uuid = get_event_uuid(request) if getattr(settings, 'WEBHOOK_DEDUP_ENABLED', True) else None
+    if event_uuid and not claim_event(event_uuid):
+        logger.info(f"重复的 webhook 投递，已忽略 - X-Gitlab-Event-UUID: {event_uuid}")
+        return Response({'status': 'duplicate', 'event_uuid': event_uuid})
+
+    if getattr(settings, 'WEBHOOK_ASYNC_ENABLED', True):
+        try:
+            request_id = WebhookSpool().append(request)
+            return Response({'status': 'accepted', 'request_id': request_id})
+        except Exception as e:
+            logger.error(f"Webhook 请求写入队列失败，改为同步处理: {e}", exc_info=True)
+
+    response = process_webhook_request(request)
+    if event_uuid and response.status_code >= 500:
+        # 处理失败时允许 GitLab 重试
+        release_event(event_uuid)
+    return response
+
+
+def verify_webhook_token(request):
+    """
+    校验 GitLab 配置的 Secret Token（X-Gitlab-Token），未配置 WEBHOOK_SECRET_TOKEN 时不校验
+    """
+    expected = getattr(settings, 'WEBHOOK_SECRET_TOKEN', '')
+    if not expected:
+        return True
+    provided = request.META.get('HTTP_X_GITLAB_TOKEN', '')
+    return hmac.compare_digest(provided.encode('utf-8'), expected.encode('utf-8'))
+
+
+def process_webhook_request(request, request_id=None):
+    """
+    处理 webhook 请求：记录日志、匹配规则并调度审查
+
     优化版本：确保所有请求都被记录到webhook_logs表中，使用结构化日志
+
+    Args:
+        request: Django 请求，或从队列还原的 SpooledWebhookRequest
+        request_id: 请求ID（快速确认时已返回给 GitLab）
     """
     # 生成请求ID用于日志追踪
-    request_id = str(uuid.uuid4())
+    request_id = request_id or str(uuid.uuid4())
     structured_logger = get_logger('webhook', request_id)
 
     # 立即创建初始日志记录，确保请求被记录
-    webhook_log = create_initial_webhook_log(request)
+    webhook_log = create_initial_webhook_log(request, request_id=request_id)
 
     if webhook_log:
         structured_logger.info("Webhook事件接收成功", request_id=webhook_log.request_id)
@@ -71,18 +132,6 @@ def gitlab_webhook(request):
                 mr_iid=payload.get('object_attributes', {}).get('iid')
             )
 
-            # 更新日志记录中的事件类型（如果之前是unknown）
-            if webhook_log and webhook_log.event_type == 'unknown' and event_type != 'unknown':
-                webhook_log.event_type = event_type
-                webhook_log.save(update_fields=['event_type'])
-                structured_logger.log_database_operation(
-                    operation="update",
-                    table="webhook_logs",
-                    success=True,
-                    record_id=webhook_log.id,
-                    field="event_type"
-                )
-
             # Check or create project
             try:
                 project, created = ProjectService.get_or_create_project(project_data)
@@ -153,14 +202,22 @@ def gitlab_webhook(request):
         )
 
 
-def create_initial_webhook_log(request, payload=None, event_type=None):
+def create_initial_webhook_log(request, payload=None, event_type=None, request_id=None):
     """
     立即创建webhook日志记录，确保所有请求都被记录
     在任何业务逻辑处理之前调用
+
+    单次 INSERT：原始请求体即为 payload 的 JSON 时只保存原始请求体，payload 读取时再解析
     """
     try:
         # 生成唯一的请求ID用于追踪
-        request_id = str(uuid.uuid4())
+        request_id = request_id or str(uuid.uuid4())
+
+        # 先读取原始请求体：请求流被 request.data 解析后无法再读取
+        try:
+            request_body_raw = request.body.decode('utf-8')
+        except Exception:
+            request_body_raw = ''
 
         # 提取请求数据
         if payload is None:
@@ -176,10 +233,13 @@ def create_initial_webhook_log(request, payload=None, event_type=None):
         headers = {}
         for key, value in request.META.items():
             if key.startswith('HTTP_'):
-                # 将HTTP_HEADER_NAME��换为Header-Name格式
+                # 将HTTP_HEADER_NAME转换为Header-Name格式
                 header_name = key[5:].replace('_', '-').title()
                 headers[header_name] = value
 
+        # 原始请求体与 payload 一致时不再重复保存 payload
+        payload_json = None if _is_payload_body(request_body_raw, payload) else json.dumps(payload)
+
         # 提取项目信息
         project = payload.get('project', {})
         user = payload.get('user', {})
@@ -196,22 +256,12 @@ def create_initial_webhook_log(request, payload=None, event_type=None):
             user_email=user.get('email', ''),
             source_branch=object_attributes.get('source_branch', ''),
             target_branch=object_attributes.get('target_branch', ''),
+            request_headers=json.dumps(headers),
+            **WebhookLog.build_payload_fields(request_body_raw, payload_json),
             remote_addr=request.META.get('REMOTE_ADDR'),
             user_agent=request.META.get('HTTP_USER_AGENT', ''),
             processed=False  # 初始状态为未处理
         )
-
-        # 设置JSON字段
-        webhook_log.payload_dict = payload
-        webhook_log.request_headers_dict = headers
-
-        # 保存原始请求体（如果可能的话）
-        try:
-            webhook_log.request_body_raw = request.body.decode('utf-8')
-        except Exception:
-            webhook_log.request_body_raw = str(payload)
-
-        webhook_log.save()
         logger.info(f"Webhook log created: {request_id} - {event_type}")
         return webhook_log
 
@@ -219,7 +269,7 @@ def create_initial_webhook_log(request, payload=None, event_type=None):
         logger.error(f"Failed to create initial webhook log: {str(e)}", exc_info=True)
         # 即使创建失败也要尝试创建一个最小化的记录
         try:
-            fallback_log = WebhookLog.objects.create(
+            return WebhookLog.objects.create(
                 request_id=str(uuid.uuid4()),
                 event_type=event_type or 'error',
                 project_id=0,
@@ -227,16 +277,24 @@ def create_initial_webhook_log(request, payload=None, event_type=None):
                 user_name='system',
                 user_email='',
                 processed=False,
+                **WebhookLog.build_payload_fields('', json.dumps(payload or {})),
                 error_message=f"Log creation failed: {str(e)}"
             )
-            fallback_log.payload_dict = payload or {}
-            fallback_log.save()
-            return fallback_log
         except Exception as fallback_error:
             logger.error(f"Critical: Failed to create fallback webhook log: {str(fallback_error)}")
             return None
 
 
+def _is_payload_body(body, payload):
+    """原始请求体是否就是 payload 的 JSON"""
+    if not body:
+        return False
+    try:
+        return json.loads(body) == payload
+    except ValueError:
+        return False
+
+
 def create_webhook_log(payload, event_type):
     """保持向后兼容的创建webhook日志函数"""
     try:
@@ -244,7 +302,7 @@ def create_webhook_log(payload, event_type):
         user = payload.get('user', {})
         object_attributes = payload.get('object_attributes', {})
 
-        webhook_log = WebhookLog.objects.create(
+        return WebhookLog.objects.create(
             event_type=event_type,
             project_id=project.get('id', 0),
             project_name=project.get('name', ''),
@@ -252,12 +310,9 @@ def create_webhook_log(payload, event_type):
             user_name=user.get('name', ''),
             user_email=user.get('email', ''),
             source_branch=object_attributes.get('source_branch', ''),
-            target_branch=object_attributes.get('target_branch', '')
+            target_branch=object_attributes.get('target_branch', ''),
+            **WebhookLog.build_payload_fields('', json.dumps(payload))
         )
-        # Set payload using the property
-        webhook_log.payload_dict = payload
-        webhook_log.save()
-        return webhook_log
     except Exception as e:
         logger.error(f"Error creating webhook log: {str(e)}")
         return None
@@ -282,8 +337,6 @@ def handle_webhook_event(payload, webhook_log, project_id):
     Returns:
         Response: DRF Response 对象
     """
-    from apps.llm.models import WebhookEventRule
-
     try:
         # 提取项目数据
         project_data = payload.get('project', {})
@@ -301,13 +354,22 @@ def handle_webhook_event(payload, webhook_log, project_id):
                 webhook_log.processed_at = timezone.now()
                 webhook_log.log_level = 'WARNING'
                 webhook_log.skip_reason = "Review disabled for this project"
-                webhook_log.save()
+                webhook_log.save(update_fields=WEBHOOK_LOG_SKIP_FIELDS)
 
             return Response({
                 'status': 'skipped',
                 'message': 'Code review is disabled for this project. Enable it in project settings.'
             })
 
+        # push 事件：登记镜像预热，后续 MR 审查只需增量拉取
+        if event_type == 'push' and getattr(settings, 'REPOSITORY_WARM_ENABLED', True):
+            try:
+                RepositoryWarmer(request_id=webhook_log.request_id if webhook_log else None).request_from_push(
+                    payload, project_id
+                )
+            except Exception as warm_error:
+                logger.warning(f"Failed to request repository warm-up for project {project_id}: {warm_error}")
+
         # 2. 获取项目及其启用的事件规则
         try:
             project = Project.objects.get(project_id=project_id)
@@ -321,25 +383,17 @@ def handle_webhook_event(payload, webhook_log, project_id):
                     webhook_log.processed_at = timezone.now()
                     webhook_log.log_level = 'WARNING'
                     webhook_log.skip_reason = "No webhook event rules enabled for this project"
-                    webhook_log.save()
+                    webhook_log.save(update_fields=WEBHOOK_LOG_SKIP_FIELDS)
 
                 return Response({
                     'status': 'skipped',
                     'message': 'Project has no webhook event rules enabled. Configure event rules in project settings.'
                 })
 
-            # 3. 匹配事件规则
-            enabled_rules = WebhookEventRule.objects.filter(
-                id__in=enabled_event_ids,
-                is_active=True
-            )
-
-            matched_rule = None
-            for rule in enabled_rules:
-                if rule.matches_payload(payload):
-                    matched_rule = rule
-                    logger.info(f"✅ Webhook payload matched rule: {rule.name} (ID: {rule.id}) for project {project_id}")
-                    break
+            # 3. 匹配事件规则（编译索引：按 object_kind/action 取候选规则后检查剩余条件）
+            matched_rule = get_rule_index().match(payload, rule_ids=set(enabled_event_ids))
+            if matched_rule:
+                logger.info(f"✅ Webhook payload matched rule: {matched_rule.name} (ID: {matched_rule.id}) for project {project_id}")
 
             if not matched_rule:
                 logger.info(f"⏸️  Webhook payload did not match any enabled rules for project {project_id}. Skipping.")
@@ -349,7 +403,7 @@ def handle_webhook_event(payload, webhook_log, project_id):
                     webhook_log.processed_at = timezone.now()
                     webhook_log.log_level = 'WARNING'
                     webhook_log.skip_reason = "No matching webhook event rule found"
-                    webhook_log.save()
+                    webhook_log.save(update_fields=WEBHOOK_LOG_SKIP_FIELDS)
 
                 return Response({
                     'status': 'skipped',
@@ -370,7 +424,7 @@ def handle_webhook_event(payload, webhook_log, project_id):
                     webhook_log.processed_at = timezone.now()
                     webhook_log.log_level = 'WARNING'
                     webhook_log.skip_reason = f"Review not implemented for event type: {event_type}"
-                    webhook_log.save()
+                    webhook_log.save(update_fields=WEBHOOK_LOG_SKIP_FIELDS)
 
                 return Response({
                     'status': 'skipped',
@@ -384,7 +438,7 @@ def handle_webhook_event(payload, webhook_log, project_id):
                 webhook_log.processed_at = timezone.now()
                 webhook_log.log_level = 'ERROR'
                 webhook_log.error_message = f'Project {project_id} not found'
-                webhook_log.save()
+                webhook_log.save(update_fields=WEBHOOK_LOG_ERROR_FIELDS)
             return Response(
                 {'status': 'error', 'message': f'Project {project_id} not found'},
                 status=status.HTTP_404_NOT_FOUND
@@ -398,7 +452,7 @@ def handle_webhook_event(payload, webhook_log, project_id):
             webhook_log.processed_at = timezone.now()
             webhook_log.log_level = 'ERROR'
             webhook_log.error_message = str(e)
-            webhook_log.save()
+            webhook_log.save(update_fields=WEBHOOK_LOG_ERROR_FIELDS)
 
         return Response(
             {'status': 'error', 'message': str(e)},
@@ -426,8 +480,23 @@ def _start_merge_request_review(payload, webhook_log, project_id, project_name,
 
         logger.info(f"Starting MR review: Project {project_id}, MR #{merge_request_iid}, Rule: {matched_rule.name}")
 
-        # 创建审查记录
         request_id = webhook_log.request_id if webhook_log else str(uuid.uuid4())
+        head_sha = object_attributes.get('last_commit', {}).get('id')
+        queue = ReviewJobQueue(request_id=request_id)
+
+        # 没有新提交的 MR 更新（修改标题、标签、描述等）沿用已覆盖该提交的任务，不重复审查
+        existing_job = queue.find_active(project_id, merge_request_iid, head_sha, payload)
+        if existing_job is not None:
+            logger.info(
+                f"MR {project_id}!{merge_request_iid} 的提交 {head_sha[:8]} 已有审查任务 Job#{existing_job.id}，不再重复入队"
+            )
+            if webhook_log:
+                webhook_log.processed = True
+                webhook_log.processed_at = timezone.now()
+                webhook_log.save(update_fields=['processed', 'processed_at'])
+            return Response({'status': 'success', 'message': 'Review job already queued', 'job_id': existing_job.id})
+
+        # 创建审查记录
         review = MergeRequestReview.objects.create(
             project_id=project_id,
             project_name=project_name,
@@ -437,36 +506,29 @@ def _start_merge_request_review(payload, webhook_log, project_id, project_name,
             target_branch=object_attributes.get('target_branch', ''),
             author_name=object_attributes.get('last_commit', {}).get('author', {}).get('name', ''),
             author_email=object_attributes.get('last_commit', {}).get('author', {}).get('email', ''),
+            head_sha=head_sha,
             status='pending',
             request_id=request_id,
             review_content=''
         )
 
-        # 启动审查线程（传递 matched_rule）
-        def launch_review_thread():
-            thread = threading.Thread(
-                target=process_merge_request_review,
-                args=(project_id, merge_request_iid, review.pk, payload, matched_rule)
-            )
-            thread.daemon = True
-            thread.start()
-
-        transaction.on_commit(launch_review_thread)
+        # 写入持久化任务队列，由 worker 进程认领执行（传递 matched_rule）
+        queue.enqueue(review, payload, matched_rule)
 
         # 标记 webhook 日志为已处理
         if webhook_log:
             webhook_log.processed = True
             webhook_log.processed_at = timezone.now()
-            webhook_log.save()
+            webhook_log.save(update_fields=['processed', 'processed_at'])
 
-        return Response({'status': 'success', 'message': 'Review process started'})
+        return Response({'status': 'success', 'message': 'Review job queued'})
 
     except Exception as e:
         logger.error(f"Error starting MR review: {str(e)}", exc_info=True)
 
         if webhook_log:
             webhook_log.error_message = str(e)
-            webhook_log.save()
+            webhook_log.save(update_fields=['error_message'])
 
         return Response(
             {'status': 'error', 'message': str(e)},
@@ -479,7 +541,7 @@ def _start_merge_request_review(payload, webhook_log, project_id, project_name,
 
 def process_merge_request_review(project_id, merge_request_iid, review_id, payload, matched_rule=None):
     """
-    Process merge request review in a separate thread
+    Process merge request review (executed by review worker processes)
     新版本：整合报告生成器和多渠道通知分发器，使用结构化日志
 
     Args:
@@ -518,9 +580,16 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
             'url': mr_data.get('url', ''),
         }
 
-        # 更新审查记录状态
+        # 更新审查记录状态（已被新提交取代的审查不再执行）
+        started = update_review_status(
+            MergeRequestReview.objects.filter(pk=review_id).exclude(status='superseded'),
+            'processing',
+            updated_at=timezone.now()
+        )
+        if not started:
+            structured_logger.info("审查已被同一 MR 的新提交取代，跳过执行")
+            return
         review.status = 'processing'
-        review.save()
         structured_logger.log_database_operation(
             operation="update",
             table="merge_request_reviews",
@@ -570,7 +639,7 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
         structured_logger.info(f"获取到 {file_count} 个文件变更，{changes_count} 行代码变更")
 
         # 判断是否使用Mock模式（基于 LLMConfig）
-        llm_config = LLMConfig.objects.filter(is_active=True).first()
+        llm_config = get_active_llm_config()
         if not llm_config:
             structured_logger.error("未找到有效的 LLM 配置，请在管理后台创建并启用 LLM 配置")
             review.status = 'failed'
@@ -602,74 +671,11 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
             # 真实 Claude CLI 模式
             from apps.llm.services import LLMService
             from apps.review.report_generator import ReportGenerator
-            from apps.review.repository_manager import RepositoryManager
-
-            # 初始化仓库管理器
-            repo_manager = RepositoryManager(request_id=request_id)
-
-            # 从 GitLab 配置获取访问令牌（使用已导入的 GitlabService）
-            # GitlabService 已经在文件顶部从 apps.review.services 导入
-            # 它的 _load_config 方法会从 GitLabConfig 数据库表加载配置
-            gitlab_svc = gitlab_service
-            access_token = gitlab_svc.private_token  # 使用 private_token 属性
+            from apps.review.result_cache import ReviewResultCache
 
-            # 获取项目 URL，并将 host 替换为配置的 GitLab 服务器地址
-            project_url = ProjectService.build_clone_url(project_data, base_url=getattr(gitlab_svc, 'server_url', None))
-
-            structured_logger.info(
-                "准备克隆项目",
-                raw_url=project_data.get('git_http_url') or project_data.get('http_url'),
-                normalized_url=project_url
-            )
-
-            # 克隆或更新仓库
-            with TimerContext(structured_logger, "clone_or_update_repository"):
-                success, repo_path, clone_error = repo_manager.get_or_clone_repository(
-                    project_url=project_url,
-                    project_id=project_id,
-                    access_token=access_token
-                )
-
-            if not success:
-                structured_logger.error(f"仓库克隆失败: {clone_error}")
-                review.status = 'failed'
-                review.error_message = f'仓库克隆失败: {clone_error}'
-                review.save()
-                return
-
-            structured_logger.info(f"仓库路径: {repo_path}")
-
-            # 切换到 MR 分支
             source_branch = mr_data.get('source_branch', '')
             target_branch = mr_data.get('target_branch', 'main')
 
-            with TimerContext(structured_logger, "checkout_merge_request"):
-                success, checkout_error = repo_manager.checkout_merge_request(
-                    repo_path=repo_path,
-                    mr_iid=merge_request_iid,
-                    source_branch=source_branch,
-                    target_branch=target_branch
-                )
-
-            if not success:
-                structured_logger.error(f"分支切换失败: {checkout_error}")
-                review.status = 'failed'
-                review.error_message = f'分支切换失败: {checkout_error}'
-                review.save()
-                return
-
-            # 获取提交范围
-            success, commit_range, range_error = repo_manager.get_commit_range(
-                repo_path=repo_path,
-                target_branch=target_branch
-            )
-
-            if not success:
-                structured_logger.warning(f"获取提交范围失败: {range_error}，使用默认范围")
-                commit_range = "HEAD~1..HEAD"
-
-            structured_logger.info(f"提交范围: {commit_range}")
-
             # 更新 MR 信息
             mr_info.update({
                 'source_branch': source_branch,
@@ -696,7 +702,6 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
                 except Exception as e:
                     structured_logger.warning(f"获取自定义 Prompt 失败: {e}，使用系统默认")
 
-            # 调用 LLM 进行代码审查（使用 Claude CLI）
             try:
                 llm_service = LLMService(request_id=request_id)
             except ImproperlyConfigured as exc:
@@ -705,26 +710,89 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
                 review.error_message = str(exc)
                 review.save()
                 return
-            llm_start_time = time.time()
-
-            llm_result = llm_service.review_code(
-                code_context=None,  # 不再需要
-                mr_info=mr_info,
-                repo_path=repo_path,
-                commit_range=commit_range,
-                custom_prompt=custom_prompt  # 传递自定义 prompt
+
+            # 查找审查结果缓存：diff、prompt 与模型配置均相同时直接复用，无需克隆仓库和调用 Claude CLI
+            result_cache = ReviewResultCache(request_id=request_id)
+            cache_key = result_cache.build_key(
+                changes,
+                llm_service.build_review_prompt(mr_info, custom_prompt),
+                llm_service.get_config_fingerprint()
             )
+            llm_result = result_cache.get(cache_key)
+            llm_duration = 0
 
-            llm_duration = time.time() - llm_start_time
+            if llm_result is not None:
+                structured_logger.info("命中审查结果缓存，跳过仓库准备与 Claude CLI 调用")
+            else:
+                from apps.review.repository_manager import RepositoryManager
 
-            # 检查审查结果
-            if isinstance(llm_result, str):
-                # 错误消息
-                structured_logger.error(f"代码审查失败: {llm_result}")
-                review.status = 'failed'
-                review.error_message = llm_result
-                review.save()
-                return
+                # 租用项目工作树，审查结束后立即归还供同项目的其他审查使用
+                repo_manager = RepositoryManager(request_id=request_id)
+                try:
+                    repo_path, commit_range, repo_error = _prepare_review_repository(
+                        repo_manager,
+                        gitlab_service,
+                        project_data,
+                        project_id,
+                        merge_request_iid,
+                        source_branch,
+                        target_branch,
+                        structured_logger,
+                        changed_paths=[
+                            path
+                            for change in changes.get('changes', [])
+                            for path in {change.get('new_path'), change.get('old_path')}
+                            if path
+                        ]
+                    )
+
+                    if _is_review_superseded(review_id):
+                        structured_logger.info("审查已被同一 MR 的新提交取代，停止执行")
+                        return
+
+                    if repo_error:
+                        review.status = 'failed'
+                        review.error_message = repo_error
+                        review.save()
+                        return
+
+                    # 调用 LLM 进行代码审查（使用 Claude CLI）
+                    llm_start_time = time.time()
+
+                    llm_result = llm_service.review_code(
+                        code_context=None,  # 不再需要
+                        mr_info=mr_info,
+                        repo_path=repo_path,
+                        commit_range=commit_range,
+                        custom_prompt=custom_prompt  # 传递自定义 prompt
+                    )
+
+                    llm_duration = time.time() - llm_start_time
+                finally:
+                    repo_manager.release_repository()
+
+                # 执行期间被新提交取代时，Claude CLI 进程已被终止，结果直接丢弃
+                if _is_review_superseded(review_id):
+                    structured_logger.info("审查已被同一 MR 的新提交取代，丢弃审查结果")
+                    return
+
+                # 检查审查结果
+                if isinstance(llm_result, str):
+                    # 错误消息
+                    structured_logger.error(f"代码审查失败: {llm_result}")
+                    review.status = 'failed'
+                    review.error_message = llm_result
+                    review.save()
+                    return
+
+                result_cache.set(
+                    cache_key,
+                    llm_result,
+                    llm_provider=llm_service.provider,
+                    llm_model=llm_service.model,
+                    project_id=project_id,
+                    merge_request_iid=merge_request_iid
+                )
 
             # 成功获取审查结果（字典格式）
             llm_provider = 'claude-cli'
@@ -757,6 +825,10 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
                 success=True
             )
 
+        if _is_review_superseded(review_id):
+            structured_logger.info("审查已被同一 MR 的新提交取代，不再保存结果和发送通知")
+            return
+
         # 更新审查记录
         review.review_content = report_data['content']
         review.review_score = report_data['metadata'].get('score', 0)
@@ -767,7 +839,20 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
         review.is_mock = is_mock_mode
         review.status = 'completed'
         review.completed_at = timezone.now()
-        review.save()
+
+        from apps.response.notification_dispatcher import NotificationDispatcher
+        notification_dispatcher = NotificationDispatcher(request_id=request_id)
+        outbox_enabled = getattr(settings, 'NOTIFICATION_OUTBOX_ENABLED', True)
+
+        if outbox_enabled:
+            # 审查结果与待发通知在同一事务中提交，由发件箱发送器异步投递，worker 不等待渠道响应
+            from apps.response.outbox import summarize_review_notifications
+            with transaction.atomic():
+                queued = notification_dispatcher.enqueue(review, report_data, mr_info, project_id=project_id)
+                review.notification_result = json.dumps(summarize_review_notifications(review.id), ensure_ascii=False)
+                review.save()
+        else:
+            review.save()
 
         structured_logger.log_database_operation(
             operation="update",
@@ -779,10 +864,19 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
 
         structured_logger.info(f"报告生成完成 - 评分:{review.review_score}, 模型:{llm_model}")
 
-        # 分发通知到各个渠道
-        from apps.response.notification_dispatcher import NotificationDispatcher
-        notification_dispatcher = NotificationDispatcher(request_id=request_id)
+        if outbox_enabled:
+            structured_logger.info(f"通知已写入发件箱 - 渠道数:{len(queued)}")
+            structured_logger.log_business_metric(
+                "mr_review_completed",
+                value={
+                    "score": review.review_score,
+                    "files": file_count,
+                    "notifications_queued": len(queued)
+                }
+            )
+            return
 
+        # 未启用发件箱时直接分发通知到各个渠道
         with TimerContext(structured_logger, "notification_dispatch"):
             notification_result = notification_dispatcher.dispatch(
                 report_data,
@@ -799,7 +893,7 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
             total_channels=notification_result.get('total_channels', 0),
             success_channels=notification_result.get('success_channels', 0),
             failed_channels=notification_result.get('failed_channels', 0),
-            duration=notification_result.get('results', [{}])[0].get('response_time', 0)
+            duration=notification_result.get('elapsed_time', 0)
         )
 
         structured_logger.log_business_metric(
@@ -807,7 +901,7 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
             value={
                 "score": review.review_score,
                 "files": file_count,
-                "duration": notification_result.get('results', [{}])[0].get('response_time', 0),
+                "duration": notification_result.get('elapsed_time', 0),
                 "notification_success": notification_result.get('success', False)
             }
         )
@@ -823,13 +917,86 @@ def process_merge_request_review(project_id, merge_request_iid, review_id, paylo
         )
 
         try:
-            review.status = 'failed'
-            review.error_message = str(e)
-            review.save()
+            if not _is_review_superseded(review_id):
+                review.status = 'failed'
+                review.error_message = str(e)
+                review.save()
         except:
             pass
 
 
+def _prepare_review_repository(repo_manager, gitlab_service, project_data, project_id, merge_request_iid,
+                               source_branch, target_branch, structured_logger, changed_paths=None):
+    """
+    准备审查所需的本地仓库：更新项目镜像、租用工作树、切换到 MR 分支并计算提交范围
+    提供 changed_paths 时工作树只稀疏检出变更所在目录
+    调用方负责在审查结束后调用 repo_manager.release_repository() 归还工作树
+
+    Returns:
+        (repo_path, commit_range, error_message)
+    """
+    # 从 GitLab 配置获取访问令牌（GitlabService 的 _load_config 方法会从 GitLabConfig 数据库表加载配置）
+    access_token = gitlab_service.private_token  # 使用 private_token 属性
+
+    # 获取项目 URL，并将 host 替换为配置的 GitLab 服务器地址
+    project_url = ProjectService.build_clone_url(project_data, base_url=getattr(gitlab_service, 'server_url', None))
+
+    structured_logger.info(
+        "准备克隆项目",
+        raw_url=project_data.get('git_http_url') or project_data.get('http_url'),
+        normalized_url=project_url
+    )
+
+    # 克隆或更新仓库
+    with TimerContext(structured_logger, "clone_or_update_repository"):
+        success, repo_path, clone_error = repo_manager.get_or_clone_repository(
+            project_url=project_url,
+            project_id=project_id,
+            access_token=access_token,
+            merge_request_iid=merge_request_iid,
+            target_branch=target_branch
+        )
+
+    if not success:
+        structured_logger.error(f"仓库克隆失败: {clone_error}")
+        return None, None, f'仓库克隆失败: {clone_error}'
+
+    structured_logger.info(f"仓库路径: {repo_path}")
+
+    # 切换到 MR 分支
+    with TimerContext(structured_logger, "checkout_merge_request"):
+        success, checkout_error = repo_manager.checkout_merge_request(
+            repo_path=repo_path,
+            mr_iid=merge_request_iid,
+            source_branch=source_branch,
+            target_branch=target_branch,
+            changed_paths=changed_paths
+        )
+
+    if not success:
+        structured_logger.error(f"分支切换失败: {checkout_error}")
+        return repo_path, None, f'分支切换失败: {checkout_error}'
+
+    # 获取提交范围
+    success, commit_range, range_error = repo_manager.get_commit_range(
+        repo_path=repo_path,
+        target_branch=target_branch
+    )
+
+    if not success:
+        structured_logger.warning(f"获取提交范围失败: {range_error}，使用默认范围")
+        commit_range = "HEAD~1..HEAD"
+
+    structured_logger.info(f"提交范围: {commit_range}")
+    structured_logger.log_business_metric("repository_fetch", value=repo_manager.fetch_stats)
+    return repo_path, commit_range, None
+
+
+def _is_review_superseded(review_id):
+    """审查是否已被同一 MR 的新提交取代"""
+    return MergeRequestReview.objects.filter(pk=review_id, status='superseded').exists()
+
+
 def build_code_context(changes):
     """
     构建代码上下文用于LLM审查
@@ -947,6 +1114,7 @@ def update_project(request, project_id):
         - auto_review_on_mr: Auto review on MR (boolean)
         - exclude_file_types: Array of file types to exclude
         - ignore_file_patterns: Array of file patterns to ignore
+        - max_concurrent_reviews: Per-project review concurrency cap (null for default, 0 pauses reviews)
     """
     try:
         project = Project.objects.get(project_id=project_id)
@@ -1372,30 +1540,28 @@ def project_webhook_logs(request, project_id):
 
     Query parameters:
         - limit: Limit number of results (default: 20)
-        - offset: Offset for pagination (default: 0)
+        - cursor: 上一页返回的 next_cursor（游标分页）
+        - offset: Offset for pagination（兼容旧客户端，传入时使用偏移分页）
+        - with_total: 是否返回总数（默认 true，超过 PAGINATION_COUNT_LIMIT 时为估计值）
     """
     try:
         limit = request.query_params.get('limit', 20)
-        offset = request.query_params.get('offset', 0)
 
         try:
             limit = int(limit)
-            offset = int(offset)
         except (ValueError, TypeError):
             limit = 20
-            offset = 0
 
-        # Get total count
-        total_count = WebhookLog.objects.filter(project_id=project_id).count()
-
-        # Get paginated logs
-        logs = WebhookLog.objects.filter(project_id=project_id).order_by('-created_at')[offset:offset + limit]
+        try:
+            logs, page = _paginate(WebhookLog.objects.filter(project_id=project_id), request, limit)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         serializer = WebhookLogSerializer(logs, many=True)
 
         return Response({
             'status': 'success',
             'count': len(serializer.data),
-            'total': total_count,
+            **page,
             'logs': serializer.data
         })
 
@@ -1463,7 +1629,9 @@ def list_reviews(request):
         - project_id: Filter by project ID
         - status: Filter by status (pending, processing, completed, failed)
         - limit: Limit number of results (default: 20)
-        - offset: Offset for pagination (default: 0)
+        - cursor: 上一页返回的 next_cursor（游标分页）
+        - offset: Offset for pagination（兼容旧客户端，传入时使用偏移分页）
+        - with_total: 是否返回总数（默认 true，超过 PAGINATION_COUNT_LIMIT 时为估计值）
         - search: Search in project name, MR title, or author name
     """
     try:
@@ -1472,15 +1640,12 @@ def list_reviews(request):
         status_filter = request.query_params.get('status')
         search = request.query_params.get('search')
         limit = request.query_params.get('limit', 20)
-        offset = request.query_params.get('offset', 0)
 
-        # Convert limit and offset to integers
+        # Convert limit to integer
         try:
             limit = int(limit)
-            offset = int(offset)
         except (ValueError, TypeError):
             limit = 20
-            offset = 0
 
         # Start with all reviews
         reviews = MergeRequestReview.objects.all()
@@ -1493,19 +1658,13 @@ def list_reviews(request):
             reviews = reviews.filter(status=status_filter)
 
         if search:
-            reviews = reviews.filter(
-                models.Q(project_name__icontains=search) |
-                models.Q(merge_request_title__icontains=search) |
-                models.Q(author_name__icontains=search) |
-                models.Q(merge_request_iid__icontains=search)
-            )
-
-        # Get total count for pagination
-        total_count = reviews.count()
+            reviews = filter_reviews(reviews, search)
 
         # Apply ordering and pagination
-        reviews = reviews.order_by('-created_at')
-        reviews = reviews[offset:offset + limit]
+        try:
+            reviews, page = _paginate(reviews, request, limit)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # 预先查询项目信息以获取 project_url
         project_ids = list(set(review.project_id for review in reviews))
@@ -1542,7 +1701,7 @@ def list_reviews(request):
         return Response({
             'status': 'success',
             'count': len(formatted_reviews),
-            'total': total_count,
+            **page,
             'results': formatted_reviews
         })
 
@@ -1554,6 +1713,41 @@ def list_reviews(request):
         )
 
 
+def _paginate(queryset, request, limit):
+    """
+    按 (created_at, id) 倒序分页
+
+    传入 offset 时沿用偏移分页并返回精确总数；否则使用游标分页，深分页代价与首页相同，
+    总数按 PAGINATION_COUNT_LIMIT 限制扫描范围，with_total=false 时不计数
+
+    Returns:
+        (items, page)，page 包含 total / total_exact / next_cursor
+
+    Raises:
+        ValueError: 游标无效
+    """
+    limit = max(1, min(limit, 200))
+    offset = request.query_params.get('offset')
+
+    if offset is not None:
+        try:
+            offset = max(0, int(offset))
+        except (ValueError, TypeError):
+            offset = 0
+        total = queryset.count()
+        items = list(queryset.order_by('-created_at', '-id')[offset:offset + limit])
+        next_cursor = None
+        if items and offset + len(items) < total:
+            next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+        return items, {'total': total, 'total_exact': True, 'next_cursor': next_cursor}
+
+    items, next_cursor = keyset_page(queryset, request.query_params.get('cursor'), limit)
+    page = {'total': None, 'total_exact': False, 'next_cursor': next_cursor}
+    if request.query_params.get('with_total', 'true').lower() != 'false':
+        page['total'], page['total_exact'] = bounded_count(queryset)
+    return items, page
+
+
 @api_view(['GET'])
 def list_logs(request):
     """
@@ -1564,7 +1758,9 @@ def list_logs(request):
         - event_type: Filter by event type
         - level: Filter by log level (INFO, WARNING, ERROR)
         - limit: Limit number of results (default: 20)
-        - offset: Offset for pagination (default: 0)
+        - cursor: 上一页返回的 next_cursor（游标分页）
+        - offset: Offset for pagination（兼容旧客户端，传入时使用偏移分页）
+        - with_total: 是否返回总数（默认 true，超过 PAGINATION_COUNT_LIMIT 时为估计值）
         - search: Search in project name, event type, or message
     """
     try:
@@ -1574,15 +1770,12 @@ def list_logs(request):
         level = request.query_params.get('level')
         search = request.query_params.get('search')
         limit = request.query_params.get('limit', 20)
-        offset = request.query_params.get('offset', 0)
 
-        # Convert limit and offset to integers
+        # Convert limit to integer
         try:
             limit = int(limit)
-            offset = int(offset)
         except (ValueError, TypeError):
             limit = 20
-            offset = 0
 
         # Start with all logs
         logs = WebhookLog.objects.all()
@@ -1600,19 +1793,13 @@ def list_logs(request):
             logs = logs.filter(log_level=level)
 
         if search:
-            logs = logs.filter(
-                models.Q(project_name__icontains=search) |
-                models.Q(event_type__icontains=search) |
-                models.Q(user_name__icontains=search) |
-                models.Q(payload__icontains=search)
-            )
-
-        # Get total count for pagination
-        total_count = logs.count()
+            logs = filter_logs(logs, search)
 
         # Apply ordering and pagination
-        logs = logs.order_by('-created_at')
-        logs = logs[offset:offset + limit]
+        try:
+            logs, page = _paginate(logs, request, limit)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Serialize data
         serializer = WebhookLogSerializer(logs, many=True)
@@ -1696,7 +1883,7 @@ def list_logs(request):
         return Response({
             'status': 'success',
             'count': len(formatted_logs),
-            'total': total_count,
+            **page,
             'results': formatted_logs
         })
 
@@ -69,6 +69,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            # 审查 worker 为多进程写入，适当放宽锁等待时间
+            'timeout': int(os.environ.get('SQLITE_TIMEOUT', 20)),
+        },
     }
 }
 
@@ -255,9 +259,188 @@ CLAUDE_CLI_DEFAULT_PROMPT = os.environ.get(
 REPOSITORY_CACHE_DAYS = int(os.environ.get('REPOSITORY_CACHE_DAYS', 7))  # 保留天数
 REPOSITORY_MAX_SIZE_GB = int(os.environ.get('REPOSITORY_MAX_SIZE_GB', 50))  # 最大存储空间
 
+# 仓库缓存统计与淘汰的执行间隔（秒），由审查 worker 进程池周期执行
+REPOSITORY_CACHE_EVICTION_INTERVAL = int(os.environ.get('REPOSITORY_CACHE_EVICTION_INTERVAL', 1800))
+
+# 是否在后台预热启用审查的项目镜像（定期刷新 + push 事件后拉取推送的分支）
+# 定期刷新 REPOSITORY_CACHE_DAYS 内被审查使用过的项目，并首次预热从未预热过的项目，缓存达到 REPOSITORY_MAX_SIZE_GB 时停止
+REPOSITORY_WARM_ENABLED = os.environ.get('REPOSITORY_WARM_ENABLED', 'True') == 'True'
+
+# 定期刷新近期使用过的项目镜像的间隔（秒）
+REPOSITORY_WARM_INTERVAL = int(os.environ.get('REPOSITORY_WARM_INTERVAL', 900))
+
+# 处理 push 事件预热请求的轮询间隔（秒）
+REPOSITORY_WARM_REQUEST_INTERVAL = int(os.environ.get('REPOSITORY_WARM_REQUEST_INTERVAL', 10))
+
+# 每个项目的工作树池大小（同一项目可并行审查的 MR 数量）
+REPOSITORY_WORKTREE_POOL_SIZE = int(os.environ.get('REPOSITORY_WORKTREE_POOL_SIZE', 4))
+
+# 工作树全部被占用时等待空闲槽位的最长时间（秒）
+REPOSITORY_WORKTREE_LEASE_TIMEOUT = int(os.environ.get('REPOSITORY_WORKTREE_LEASE_TIMEOUT', 600))
+
+# 拉取模式：targeted（只拉取 MR head 与目标分支）或 all（拉取全部分支）
+REPOSITORY_FETCH_MODE = os.environ.get('REPOSITORY_FETCH_MODE', 'targeted')
+
+# targeted 模式首次拉取的历史深度
+REPOSITORY_FETCH_DEPTH = int(os.environ.get('REPOSITORY_FETCH_DEPTH', 50))
+
+# 找不到 merge-base 时每次加深的提交数（逐次翻倍），超过次数后拉取完整历史
+REPOSITORY_DEEPEN_STEP = int(os.environ.get('REPOSITORY_DEEPEN_STEP', 200))
+REPOSITORY_MAX_DEEPEN_ATTEMPTS = int(os.environ.get('REPOSITORY_MAX_DEEPEN_ATTEMPTS', 2))
+
+# 部分克隆：新建镜像时只下载提交与目录树（--filter=blob:none），文件内容按需获取
+REPOSITORY_PARTIAL_CLONE = os.environ.get('REPOSITORY_PARTIAL_CLONE', 'True') == 'True'
+
+# 稀疏检出：工作树只检出 MR 变更文件所在目录
+REPOSITORY_SPARSE_CHECKOUT = os.environ.get('REPOSITORY_SPARSE_CHECKOUT', 'True') == 'True'
+
+# 稀疏检出时额外检出的上下文目录（逗号分隔，如 "docs,config"）
+REPOSITORY_SPARSE_CONTEXT_DIRS = [d for d in os.environ.get('REPOSITORY_SPARSE_CONTEXT_DIRS', '').split(',') if d.strip()]
+
+# 变更目录超过该数量时改为完整检出
+REPOSITORY_SPARSE_MAX_DIRS = int(os.environ.get('REPOSITORY_SPARSE_MAX_DIRS', 200))
+
 # Ensure repository directory exists
 os.makedirs(REPOSITORY_BASE_PATH, exist_ok=True)
 
+# ===== Review Job Queue Configuration =====
+# Redis 连接地址（可选，docker-compose 默认提供）
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+# 队列后端：database（仅轮询数据库）或 redis（数据库持久化 + Redis 唤醒 worker）
+REVIEW_QUEUE_BACKEND = os.environ.get('REVIEW_QUEUE_BACKEND', 'database')
+
+# Worker 进程数量
+REVIEW_WORKER_CONCURRENCY = int(os.environ.get('REVIEW_WORKER_CONCURRENCY', 2))
+
+# 空闲时轮询间隔（秒）
+REVIEW_WORKER_POLL_INTERVAL = int(os.environ.get('REVIEW_WORKER_POLL_INTERVAL', 5))
+
+# 任务可见性超时（秒）：worker 在此时间内未续约，任务会被重新入队
+REVIEW_JOB_VISIBILITY_TIMEOUT = int(os.environ.get('REVIEW_JOB_VISIBILITY_TIMEOUT', 600))
+
+# 任务最大尝试次数
+REVIEW_JOB_MAX_ATTEMPTS = int(os.environ.get('REVIEW_JOB_MAX_ATTEMPTS', 3))
+
+# 任务到期超过该秒数仍无 worker 认领时，/health/ 返回 503（提示未启动 run_review_workers）
+REVIEW_WORKER_STALL_THRESHOLD = int(os.environ.get('REVIEW_WORKER_STALL_THRESHOLD', 300))
+
+# 全局同时执行的审查任务上限（0 表示不限制，仅受 worker 数量约束）
+REVIEW_GLOBAL_MAX_CONCURRENCY = int(os.environ.get('REVIEW_GLOBAL_MAX_CONCURRENCY', 4))
+
+# 单个项目同时执行的审查任务上限（项目可通过 max_concurrent_reviews 单独覆盖）
+REVIEW_PROJECT_MAX_CONCURRENCY = int(os.environ.get('REVIEW_PROJECT_MAX_CONCURRENCY', 2))
+
+# 同一 MR 的审查防抖时间（秒）：窗口内的连续推送只审查最新的一次
+REVIEW_COALESCE_DEBOUNCE_SECONDS = int(os.environ.get('REVIEW_COALESCE_DEBOUNCE_SECONDS', 20))
+
+# 执行中任务检查取消请求的间隔（秒）
+REVIEW_CANCEL_CHECK_INTERVAL = int(os.environ.get('REVIEW_CANCEL_CHECK_INTERVAL', 5))
+
+# ===== Review Result Cache Configuration =====
+# 相同 diff + prompt + 模型配置的审查结果直接复用，不再调用 Claude CLI
+REVIEW_RESULT_CACHE_ENABLED = os.environ.get('REVIEW_RESULT_CACHE_ENABLED', 'True') == 'True'
+
+# 缓存有效期（小时）
+REVIEW_RESULT_CACHE_TTL_HOURS = int(os.environ.get('REVIEW_RESULT_CACHE_TTL_HOURS', 168))
+
+# 最大缓存条目数，超出后按最近使用时间淘汰
+REVIEW_RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('REVIEW_RESULT_CACHE_MAX_ENTRIES', 5000))
+
+# ===== Active Config Cache Configuration =====
+# 各进程比对配置版本戳的间隔（秒），配置变更后其他进程最迟在该间隔内生效
+CONFIG_CACHE_CHECK_INTERVAL = int(os.environ.get('CONFIG_CACHE_CHECK_INTERVAL', 5))
+
+# ===== Webhook Receiver Configuration =====
+# GitLab Webhook 的 Secret Token，非空时校验 X-Gitlab-Token 请求头
+WEBHOOK_SECRET_TOKEN = os.environ.get('WEBHOOK_SECRET_TOKEN', '')
+
+# 快速确认：接收端只写入本地队列立即返回，由 review worker 进程池异步处理
+WEBHOOK_ASYNC_ENABLED = os.environ.get('WEBHOOK_ASYNC_ENABLED', 'True') == 'True'
+
+# 队列目录（接收端与 worker 需共享该目录，docker-compose 中两者均挂载 ./backend）
+WEBHOOK_SPOOL_PATH = os.environ.get(
+    'WEBHOOK_SPOOL_PATH',
+    os.path.join(BASE_DIR, 'data', 'webhook_spool')
+)
+
+# 队列轮询间隔（秒）
+WEBHOOK_SPOOL_POLL_INTERVAL = float(os.environ.get('WEBHOOK_SPOOL_POLL_INTERVAL', 1))
+
+# 认领后超过该时间（秒）未完成的请求重新入队
+WEBHOOK_SPOOL_PROCESSING_TIMEOUT = int(os.environ.get('WEBHOOK_SPOOL_PROCESSING_TIMEOUT', 300))
+
+# 按 X-Gitlab-Event-UUID 丢弃 GitLab 重试产生的重复投递
+WEBHOOK_DEDUP_ENABLED = os.environ.get('WEBHOOK_DEDUP_ENABLED', 'True') == 'True'
+
+# 去重记录保留时间（秒）
+WEBHOOK_DEDUP_TTL = int(os.environ.get('WEBHOOK_DEDUP_TTL', 86400))
+
+# 进程内去重记录的最大条目数（配置 Redis 时跨进程去重）
+WEBHOOK_DEDUP_MAX_ENTRIES = int(os.environ.get('WEBHOOK_DEDUP_MAX_ENTRIES', 10000))
+
+# webhook 日志 payload 压缩算法：zlib、zstd（需安装 zstandard）或 none
+WEBHOOK_LOG_COMPRESSION = os.environ.get('WEBHOOK_LOG_COMPRESSION', 'zlib')
+
+# 列表接口总数计数上限，超过时返回估计值（total_exact=false）
+PAGINATION_COUNT_LIMIT = int(os.environ.get('PAGINATION_COUNT_LIMIT', 10000))
+
+# ===== Data Retention Configuration =====
+# webhook 日志保留天数，过期记录归档后删除（0 表示不清理）
+WEBHOOK_LOG_RETENTION_DAYS = int(os.environ.get('WEBHOOK_LOG_RETENTION_DAYS', 90))
+
+# 审查记录保留天数，只归档已结束的审查（0 表示不清理）
+REVIEW_RETENTION_DAYS = int(os.environ.get('REVIEW_RETENTION_DAYS', 365))
+
+# 归档文件目录（按表名/月份/日期分区）
+RETENTION_ARCHIVE_PATH = os.environ.get(
+    'RETENTION_ARCHIVE_PATH',
+    os.path.join(BASE_DIR, 'data', 'archive')
+)
+
+# 归档文件压缩算法：zstd（需安装 zstandard，否则回退到 gzip）、zlib（gzip）或 none
+RETENTION_ARCHIVE_COMPRESSION = os.environ.get('RETENTION_ARCHIVE_COMPRESSION', 'zstd')
+
+# 每个事务归档的记录数
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 500))
+
+# 周期归档间隔（秒）
+RETENTION_INTERVAL = int(os.environ.get('RETENTION_INTERVAL', 3600))
+
+# ===== Notification Dispatch Configuration =====
+# 单个通知渠道的发送时限（秒），渠道配置中的 timeout 优先
+NOTIFICATION_CHANNEL_TIMEOUT = float(os.environ.get('NOTIFICATION_CHANNEL_TIMEOUT', 15))
+
+# 一次通知分发（所有渠道并发）的整体时限（秒），超时的渠道记为失败
+NOTIFICATION_DISPATCH_TIMEOUT = float(os.environ.get('NOTIFICATION_DISPATCH_TIMEOUT', 30))
+
+# 通知发件箱：审查完成时与结果同事务写入，由 review worker 进程池异步投递并失败重试
+NOTIFICATION_OUTBOX_ENABLED = os.environ.get('NOTIFICATION_OUTBOX_ENABLED', 'True') == 'True'
+
+# 发件箱轮询间隔（秒）与每批投递数量
+NOTIFICATION_OUTBOX_POLL_INTERVAL = float(os.environ.get('NOTIFICATION_OUTBOX_POLL_INTERVAL', 2))
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.environ.get('NOTIFICATION_OUTBOX_BATCH_SIZE', 20))
+
+# 每条通知的最大尝试次数，超过后转入死信
+NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_MAX_ATTEMPTS', 6))
+
+# 重试退避：首次重试延迟（秒），之后逐次翻倍，最长 NOTIFICATION_RETRY_MAX_DELAY
+NOTIFICATION_RETRY_BASE_DELAY = int(os.environ.get('NOTIFICATION_RETRY_BASE_DELAY', 30))
+NOTIFICATION_RETRY_MAX_DELAY = int(os.environ.get('NOTIFICATION_RETRY_MAX_DELAY', 3600))
+
+# 通知渠道令牌桶：每分钟补充的令牌数（0 表示不限流）与桶容量，渠道配置 rate_limit / rate_burst 优先
+# 任意一分钟内最多发送 容量 + 速率 条，默认值满足钉钉机器人 20 条/分钟的限制；令牌不足时积压的通知合并为摘要
+NOTIFICATION_CHANNEL_RATE_LIMIT = float(os.environ.get('NOTIFICATION_CHANNEL_RATE_LIMIT', 15))
+NOTIFICATION_CHANNEL_BURST = float(os.environ.get('NOTIFICATION_CHANNEL_BURST', 5))
+
+# 通知渠道共享 HTTP 连接池：缓存的主机数与每个主机保持的 keep-alive 连接数
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 10))
+
+# 连接失败或 429/503 响应的重试次数与退避系数（秒）
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2))
+HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', 0.5))
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = None
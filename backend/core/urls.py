@@ -18,6 +18,16 @@ START_TIME = time.time()
 
 def health_check(request):
     """Health check endpoint"""
+    from apps.review.job_queue import ReviewJobQueue
+
+    # 审查任务由独立的 worker 进程执行，未启动时任务会一直排队
+    stalled = ReviewJobQueue(request_id='health').count_stalled()
+    if stalled:
+        return JsonResponse({
+            'status': 'degraded',
+            'message': f'{stalled} 个审查任务长时间无 worker 认领，请确认已启动 python manage.py run_review_workers',
+            'stalled_review_jobs': stalled,
+        }, status=503)
     return JsonResponse({'status': 'ok', 'message': 'Code Review GPT is running'})
 
 